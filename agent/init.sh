@@ -12,6 +12,15 @@ initialize_env() {
 # Generate an OpenTelemetry configuration
 generate_config() {
 	local config_path="/databricks/otelcol/config.yaml"
+
+	# With OTELCOL_CONFIG_PYTHON set to a Python with databricks-opentelemetry-exporter
+	# installed, render a config sized to this node's cores, memory and role instead.
+	# It needs a collector build with the batch and memory_limiter processors.
+	if [[ -n "${OTELCOL_CONFIG_PYTHON:-}" ]]; then
+		"$OTELCOL_CONFIG_PYTHON" -m databricks_opentelemetry_exporter.collector --output "$config_path"
+		return
+	fi
+
 	cat <<EOF | envsubst >$config_path
 extensions:
   bearertokenauth:
@@ -46,6 +55,12 @@ receivers:
           metrics_path: /metrics/executors/prometheus
           static_configs:
             - targets: [${env:SPARK_LOCAL_IP}:40001]
+        # Self-telemetry of databricks_opentelemetry_exporter, when served
+        # with PrometheusMetricReader on port 9464
+        - job_name: databricks_opentelemetry_exporter
+          scrape_interval: 10s
+          static_configs:
+            - targets: [localhost:9464]
 
 exporters:
   otlphttp:
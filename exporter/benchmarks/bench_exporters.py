@@ -0,0 +1,280 @@
+"""
+Throughput, per-batch latency and peak memory of the exporters.
+
+    python benchmarks/bench_exporters.py --output results.json
+    python benchmarks/bench_exporters.py --exporters logs-json,traces-otlp \\
+        --batch-sizes 512 --threads 1,8 --targets fsync
+
+Every combination of exporter, target directory, batch size, record size,
+attribute count and thread count is one case. A case exports ``--batches``
+batches from ``--threads`` threads sharing one exporter, after one warm-up
+batch, and then once more under tracemalloc for peak memory.
+
+The targets are ``tmpfs`` (``--tmpfs-dir``, /dev/shm by default), which
+measures the exporter itself, and ``fsync`` (``--fsync-dir``, on disk),
+which writes with ``durability="per-batch"`` and measures the cost of
+making every batch durable.
+"""
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+import results
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+
+RESOURCE = Resource(
+    {"service.namespace": "acmecorp", "service.name": "databricks", "host.name": "node-1"}
+)
+SCOPE = InstrumentationScope("benchmark")
+
+# name: (signal, exporter keyword arguments)
+EXPORTERS = {
+    "logs-json": ("logs", {}),
+    "logs-json-gzip": ("logs", {"compression": "gzip"}),
+    "logs-otlp": ("logs", {"output_format": "otlp"}),
+    "logs-rolling": ("logs", {"rolling": True}),
+    "logs-parquet": ("logs", {"output_format": "parquet"}),
+    "traces-json": ("traces", {}),
+    "traces-otlp": ("traces", {"output_format": "otlp"}),
+    "traces-parquet": ("traces", {"output_format": "parquet"}),
+    "metrics-json": ("metrics", {}),
+    "metrics-otlp": ("metrics", {"output_format": "otlp"}),
+}
+
+
+def _attributes(count, record_size):
+    value = "v" * max(1, record_size // max(1, 4 * count))
+    return {f"attr.{i}": value for i in range(count)}
+
+
+def make_log_batch(batch_size, record_size, attributes):
+    attrs = _attributes(attributes, record_size)
+    body = "x" * record_size
+    now = time.time_ns()
+    return [
+        LogData(
+            LogRecord(
+                timestamp=now + i,
+                trace_id=0x5B8EFFF798038103D269B633813FC60C,
+                span_id=0xEEE19B7EC3C1B174,
+                trace_flags=1,
+                severity_text="INFO",
+                severity_number=SeverityNumber.INFO,
+                body=body,
+                resource=RESOURCE,
+                attributes=attrs,
+            ),
+            SCOPE,
+        )
+        for i in range(batch_size)
+    ]
+
+
+def make_span_batch(batch_size, record_size, attributes):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(resource=RESOURCE)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+    attrs = _attributes(attributes, record_size)
+    attrs["payload"] = "x" * record_size
+    for i in range(batch_size):
+        with tracer.start_as_current_span(f"span {i}", attributes=attrs):
+            pass
+    return exporter.get_finished_spans()
+
+
+def make_metrics_batch(batch_size, record_size, attributes):
+    """One ``MetricsData`` with ``batch_size`` counter series."""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(resource=RESOURCE, metric_readers=[reader])
+    counter = provider.get_meter(__name__).create_counter("requests")
+    attrs = _attributes(attributes, record_size)
+    for i in range(batch_size):
+        counter.add(i + 1, {**attrs, "series": i})
+    return reader.get_metrics_data()
+
+
+def make_exporter(name, directory, durability):
+    signal, kwargs = EXPORTERS[name]
+    if signal == "logs":
+        return DatabricksVolumeLogExporter(directory, durability=durability, **kwargs)
+    if signal == "traces":
+        return DatabricksVolumeTraceExporter(directory, durability=durability, **kwargs)
+    return DatabricksVolumeMetricsExporter(directory, durability=durability, **kwargs)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def _export_all(exporter, batch, batches, threads):
+    """Export ``batches`` batches from ``threads`` threads, returning latencies."""
+    latencies = []
+    lock = threading.Lock()
+    counts = [batches // threads + (i < batches % threads) for i in range(threads)]
+
+    def worker(count):
+        mine = []
+        for _ in range(count):
+            start = time.perf_counter()
+            exporter.export(batch)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in counts]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies
+
+
+def run_case(name, directory, durability, batch_size, record_size, attributes,
+             threads, batches):
+    signal = EXPORTERS[name][0]
+    make_batch = {
+        "logs": make_log_batch,
+        "traces": make_span_batch,
+        "metrics": make_metrics_batch,
+    }[signal]
+    batch = make_batch(batch_size, record_size, attributes)
+
+    case_dir = tempfile.mkdtemp(dir=directory)
+    try:
+        exporter = make_exporter(name, case_dir, durability)
+        exporter.export(batch)
+
+        start = time.perf_counter()
+        latencies = _export_all(exporter, batch, batches, threads)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        try:
+            _export_all(exporter, batch, max(threads, batches // 10), threads)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        exporter.shutdown()
+    finally:
+        shutil.rmtree(case_dir, ignore_errors=True)
+
+    return {
+        "records_per_sec": batches * batch_size / elapsed,
+        "batches_per_sec": batches / elapsed,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p90_ms": percentile(latencies, 90) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "latency_max_ms": max(latencies) * 1000,
+        "peak_memory_kib": peak / 1024,
+    }
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",")]
+
+
+def _names(choices):
+    def parse(value):
+        names = value.split(",")
+        for name in names:
+            if name not in choices:
+                raise argparse.ArgumentTypeError(
+                    f"Unsupported name: {name!r}, expected one of {list(choices)}"
+                )
+        return names
+
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--exporters", type=_names(EXPORTERS), default=list(EXPORTERS)
+    )
+    parser.add_argument(
+        "--targets", type=_names(("tmpfs", "fsync")), default=["tmpfs", "fsync"]
+    )
+    parser.add_argument(
+        "--tmpfs-dir",
+        default="/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    )
+    parser.add_argument("--fsync-dir", default=os.getcwd())
+    parser.add_argument("--batch-sizes", type=_ints, default=[64, 512])
+    parser.add_argument("--record-sizes", type=_ints, default=[100, 1000])
+    parser.add_argument("--attributes", type=_ints, default=[0, 8])
+    parser.add_argument("--threads", type=_ints, default=[1, 4])
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--output", help="save results as JSON")
+    args = parser.parse_args()
+
+    exporters = list(args.exporters)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        exporters = [name for name in exporters if not name.endswith("-parquet")]
+    targets = {
+        "tmpfs": (args.tmpfs_dir, "none"),
+        "fsync": (args.fsync_dir, "per-batch"),
+    }
+
+    output = []
+    print(
+        f"{'case':<64} {'records/sec':>12} {'p50 ms':>8} {'p99 ms':>8} {'peak KiB':>9}"
+    )
+    for name, target, batch_size, record_size, attributes, threads in itertools.product(
+        exporters,
+        args.targets,
+        args.batch_sizes,
+        args.record_sizes,
+        args.attributes,
+        args.threads,
+    ):
+        directory, durability = targets[target]
+        metrics = run_case(
+            name, directory, durability, batch_size, record_size,
+            attributes, threads, args.batches,
+        )
+        case = {
+            "exporter": name,
+            "target": target,
+            "batch_size": batch_size,
+            "record_size": record_size,
+            "attributes": attributes,
+            "threads": threads,
+        }
+        output.append({"case": case, "metrics": metrics})
+        label = (
+            f"{name} {target} batch={batch_size} size={record_size} "
+            f"attrs={attributes} threads={threads}"
+        )
+        print(
+            f"{label:<64} {metrics['records_per_sec']:>12,.0f} "
+            f"{metrics['latency_p50_ms']:>8.2f} {metrics['latency_p99_ms']:>8.2f} "
+            f"{metrics['peak_memory_kib']:>9,.0f}"
+        )
+
+    if args.output:
+        results.save(args.output, "exporters", vars(args), output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Records/sec of the JSON encoders versus the formatters they replaced.
+
+    python benchmarks/bench_formatters.py --records 20000 --attributes 8
+    python benchmarks/bench_formatters.py --output formatters.json
+"""
+import argparse
+import json
+import time
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import results
+from databricks_opentelemetry_exporter.logs.export import default_formatter
+from databricks_opentelemetry_exporter.util import encoding
+from databricks_opentelemetry_exporter.util.encoding import (
+    encode_log_batch,
+    encode_span_batch,
+)
+
+RESULTS = []
+
+RESOURCE = Resource(
+    {"service.namespace": "acmecorp", "service.name": "databricks", "host.name": "node-1"}
+)
+
+
+def legacy_log_formatter(record):
+    return record.to_json().replace("\n", "") + "\n"
+
+
+def legacy_span_formatter(span):
+    return json.dumps(span.to_json(), default=str) + "\n"
+
+
+def make_logs(count, attributes):
+    attrs = {f"attr.{i}": f"value-{i}" for i in range(attributes)}
+    return [
+        LogData(
+            LogRecord(
+                timestamp=1_700_000_000_000_000_000 + i,
+                trace_id=0x5B8EFFF798038103D269B633813FC60C,
+                span_id=0xEEE19B7EC3C1B174,
+                trace_flags=1,
+                severity_text="INFO",
+                severity_number=9,
+                body=f"Processed request {i}",
+                resource=RESOURCE,
+                attributes=attrs,
+            ),
+            None,
+        )
+        for i in range(count)
+    ]
+
+
+def make_spans(count, attributes):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(resource=RESOURCE)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+    attrs = {f"attr.{i}": f"value-{i}" for i in range(attributes)}
+    for i in range(count):
+        with tracer.start_as_current_span(f"span {i}", attributes=attrs):
+            pass
+    return exporter.get_finished_spans()
+
+
+def bench(name, func, items, batch_size, repeat):
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for batch in batches:
+            func(batch)
+        best = min(best, time.perf_counter() - start)
+    rate = len(items) / best
+    print(f"{name:<40} {rate:>12,.0f} records/sec")
+    RESULTS.append({"case": {"name": name}, "metrics": {"records_per_sec": rate}})
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--attributes", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="save results as JSON")
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if encoding.orjson else 'no'}")
+    logs = make_logs(args.records, args.attributes)
+    base = bench(
+        "logs: to_json().replace (legacy)",
+        lambda b: "".join(legacy_log_formatter(d.log_record) for d in b).encode(),
+        logs, args.batch_size, args.repeat,
+    )
+    bench(
+        "logs: default_formatter per record",
+        lambda b: "".join(default_formatter(d.log_record) for d in b).encode(),
+        logs, args.batch_size, args.repeat,
+    )
+    fast = bench("logs: encode_log_batch", encode_log_batch, logs, args.batch_size, args.repeat)
+    print(f"{'logs speedup':<40} {fast / base:>12.1f}x")
+
+    spans = make_spans(args.records, args.attributes)
+    base = bench(
+        "spans: json.dumps(to_json()) (legacy)",
+        lambda b: "".join(legacy_span_formatter(s) for s in b).encode(),
+        spans, args.batch_size, args.repeat,
+    )
+    fast = bench("spans: encode_span_batch", encode_span_batch, spans, args.batch_size, args.repeat)
+    print(f"{'spans speedup':<40} {fast / base:>12.1f}x")
+
+    if args.output:
+        results.save(args.output, "formatters", vars(args), RESULTS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+IDs/sec of util.uuids versus the uuid7 it replaced and uuid.uuid4.
+
+    python benchmarks/bench_uuids.py --count 200000
+    python benchmarks/bench_uuids.py --output uuids.json
+"""
+import argparse
+import random
+import time
+import uuid
+
+import results
+from databricks_opentelemetry_exporter.util.uuids import uuid7, uuid7_batch
+
+RESULTS = []
+
+
+def legacy_uuid7():
+    unix_ts_ms = int(time.time() * 1000)
+    rand_a = random.getrandbits(12)
+    rand_b = random.getrandbits(62)
+    uuid_int = (
+        (unix_ts_ms << 80) | (0b0111 << 76) | (rand_a << 64) | (0b10 << 62) | rand_b
+    )
+    uuid_hex = f"{uuid_int:032x}"
+    return f"{uuid_hex[:8]}-{uuid_hex[8:12]}-{uuid_hex[12:16]}-{uuid_hex[16:20]}-{uuid_hex[20:]}"
+
+
+def bench(name, func, count, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(count)
+        best = min(best, time.perf_counter() - start)
+    rate = count / best
+    print(f"{name:<40} {rate:>12,.0f} ids/sec")
+    RESULTS.append({"case": {"name": name}, "metrics": {"ids_per_sec": rate}})
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="save results as JSON")
+    args = parser.parse_args()
+
+    base = bench("uuid7 (legacy)", lambda n: [legacy_uuid7() for _ in range(n)], args.count, args.repeat)
+    bench("str(uuid.uuid4())", lambda n: [str(uuid.uuid4()) for _ in range(n)], args.count, args.repeat)
+    fast = bench("uuid7", lambda n: [uuid7() for _ in range(n)], args.count, args.repeat)
+    bulk = bench("uuid7_batch", uuid7_batch, args.count, args.repeat)
+    print(f"{'uuid7 speedup':<40} {fast / base:>12.1f}x")
+    print(f"{'uuid7_batch speedup':<40} {bulk / base:>12.1f}x")
+
+    if args.output:
+        results.save(args.output, "uuids", vars(args), RESULTS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Save benchmark results as JSON and compare two runs.
+
+Every benchmark script takes ``--output results.json``. The file holds the
+environment of the run and one entry per case, each with the ``case``
+parameters and the measured ``metrics``. Compare a run against a baseline
+with::
+
+    python benchmarks/results.py baseline.json results.json --threshold 10
+
+Metrics ending in ``_per_sec`` are better when higher, all others (latency,
+memory) when lower. The exit status is 1 when any metric of a case found in
+both runs got worse by more than ``--threshold`` percent.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+
+def environment():
+    """What a run's numbers depend on, saved along with them."""
+    import databricks_opentelemetry_exporter
+    from databricks_opentelemetry_exporter.util import encoding
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "version": databricks_opentelemetry_exporter.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "orjson": encoding.orjson is not None,
+    }
+
+
+def save(path, suite, params, results):
+    """Write ``results`` (dicts with ``case`` and ``metrics``) to ``path``."""
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "suite": suite,
+                "environment": environment(),
+                "params": params,
+                "results": results,
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+        f.write("\n")
+
+
+def _key(result):
+    return json.dumps(result["case"], sort_keys=True)
+
+
+def compare(baseline, current, threshold):
+    """``(case, metric, before, after, change %)`` of every regression."""
+    before = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get(_key(result))
+        if old is None:
+            continue
+        for metric, after in result["metrics"].items():
+            value = old["metrics"].get(metric)
+            if not value or after is None:
+                continue
+            change = (after - value) / value * 100
+            worse = -change if metric.endswith("_per_sec") else change
+            if worse > threshold:
+                regressions.append((result["case"], metric, value, after, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for case, metric, value, after, change in regressions:
+        params = " ".join(f"{k}={v}" for k, v in sorted(case.items()))
+        print(f"{params}: {metric} {value:,.3f} -> {after:,.3f} ({change:+.1f}%)")
+    print(f"{len(regressions)} regressions over {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,2 @@
-from .__version__ import __version__
\ No newline at end of file
+from .__version__ import __version__
+from .main import TelemetryConfig, init_telemetry
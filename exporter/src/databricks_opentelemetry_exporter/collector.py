@@ -0,0 +1,342 @@
+"""
+Collector config for a Databricks node, sized to the node.
+
+``agent/init.sh`` starts an OpenTelemetry collector on every node of a
+cluster. :func:`render` writes its config with limits derived from the
+node's cores, memory and Spark role, so the collector's CPU and memory
+overhead is bounded and predictable. It also runs as a module::
+
+    python -m databricks_opentelemetry_exporter.collector \\
+        --output /databricks/otelcol/config.yaml --disable process,paging
+
+Sizing (see :func:`collector_config`):
+
+* ``memory_limiter`` caps the collector at a share of node memory: 5% on
+  the driver, 2% on workers, within 128 MiB and 2 GiB. Its spike limit is
+  a fifth of that.
+* ``batch`` sends 256 points per core, within 512 and 8192, and at most
+  twice that.
+* The ``otlphttp`` sending queue holds at most a quarter of the memory
+  limit. It is drained by a consumer per 4 cores, between 2 and 10.
+* Host metrics are scraped every 10s on the driver and every 30s on
+  workers. Nodes with 4 cores or fewer scrape half as often.
+
+The Spark scrapers read the Spark UI, which only runs on the driver, so
+they are enabled there only. ``enable`` and ``disable`` take scraper names
+from :data:`SCRAPERS`.
+
+The rendered config uses the ``memory_limiter`` and ``batch`` processors,
+so the collector build has to include them. ``${env:...}`` placeholders
+are expanded by the collector when it loads the config.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from typing import NamedTuple, Sequence
+
+ROLES = ("driver", "worker")
+
+HOSTMETRICS_SCRAPERS = (
+    "cpu",
+    "memory",
+    "disk",
+    "load",
+    "filesystem",
+    "network",
+    "process",
+    "paging",
+    "processes",
+)
+
+# Prometheus job name: (metrics path, target, roles enabled by default)
+PROMETHEUS_JOBS = {
+    "spark_metrics": (
+        "/metrics/prometheus",
+        "${env:SPARK_LOCAL_IP}:40001",
+        ("driver",),
+    ),
+    "spark_aggregated_executor_metrics": (
+        "/metrics/executors/prometheus",
+        "${env:SPARK_LOCAL_IP}:40001",
+        ("driver",),
+    ),
+    # Self-telemetry of the exporters, served with PrometheusMetricReader
+    # (see databricks_opentelemetry_exporter.util.telemetry)
+    "databricks_opentelemetry_exporter": (
+        "/metrics",
+        "localhost:9464",
+        ROLES,
+    ),
+}
+
+SCRAPERS = HOSTMETRICS_SCRAPERS + tuple(PROMETHEUS_JOBS)
+
+MEMORY_FRACTION = {"driver": 0.05, "worker": 0.02}
+MIN_LIMIT_MIB = 128
+MAX_LIMIT_MIB = 2048
+
+# Rough in-memory size of a queued data point, for sizing the queue
+_POINT_BYTES = 512
+
+
+class Node(NamedTuple):
+    """What the collector config is sized for."""
+
+    cores: int
+    memory_mib: int
+    role: str
+
+
+def detect_node(environ=None) -> Node:
+    """
+    The node this runs on. The role comes from ``DB_IS_DRIVER``, which
+    Databricks sets for init scripts.
+    """
+    environ = os.environ if environ is None else environ
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    is_driver = environ.get("DB_IS_DRIVER", "").upper() == "TRUE"
+    return Node(
+        cores=os.cpu_count() or 1,
+        memory_mib=memory // (1024 * 1024),
+        role="driver" if is_driver else "worker",
+    )
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def default_scrapers(role: str) -> list:
+    """The scrapers enabled on a node with ``role``."""
+    return list(HOSTMETRICS_SCRAPERS) + [
+        job for job, (_, _, roles) in PROMETHEUS_JOBS.items() if role in roles
+    ]
+
+
+def collector_config(
+    node: Node,
+    enable: Sequence[str] = (),
+    disable: Sequence[str] = (),
+    debug: bool = False,
+) -> dict:
+    """
+    The collector config for ``node`` as a dict. ``debug`` adds the
+    ``debug`` exporter to the pipeline.
+    """
+    if node.role not in ROLES:
+        raise ValueError(
+            f"Unsupported role: {node.role!r}, expected one of {list(ROLES)}"
+        )
+    for name in list(enable) + list(disable):
+        if name not in SCRAPERS:
+            raise ValueError(
+                f"Unsupported scraper: {name!r}, expected one of {list(SCRAPERS)}"
+            )
+    defaults = default_scrapers(node.role)
+    scrapers = [
+        name
+        for name in SCRAPERS
+        if name not in disable and (name in enable or name in defaults)
+    ]
+    if not scrapers:
+        raise ValueError("At least one scraper must be enabled")
+
+    limit_mib = _clamp(
+        int(node.memory_mib * MEMORY_FRACTION[node.role]), MIN_LIMIT_MIB, MAX_LIMIT_MIB
+    )
+    batch_size = _clamp(256 * node.cores, 512, 8192)
+    queue_bytes = limit_mib * 1024 * 1024 // 4
+    queue_size = _clamp(queue_bytes // (batch_size * _POINT_BYTES), 10, 1000)
+    interval = 10 if node.role == "driver" else 30
+    if node.cores <= 4:
+        interval *= 2
+
+    receivers = {}
+    host_scrapers = {}
+    for name in HOSTMETRICS_SCRAPERS:
+        if name in scrapers:
+            host_scrapers[name] = {"cpu_average": True} if name == "load" else None
+    if host_scrapers:
+        receivers["hostmetrics"] = {
+            "collection_interval": f"{interval}s",
+            "scrapers": host_scrapers,
+        }
+    scrape_configs = [
+        {
+            "job_name": job,
+            "scrape_interval": f"{interval}s",
+            "metrics_path": path,
+            "static_configs": [{"targets": [target]}],
+        }
+        for job, (path, target, _) in PROMETHEUS_JOBS.items()
+        if job in scrapers
+    ]
+    if scrape_configs:
+        receivers["prometheus"] = {"config": {"scrape_configs": scrape_configs}}
+
+    exporters = {
+        "otlphttp": {
+            "endpoint": "${env:OTLP_HTTP_ENDPOINT}",
+            "auth": {"authenticator": "bearertokenauth"},
+            "sending_queue": {
+                "enabled": True,
+                "num_consumers": _clamp(node.cores // 4, 2, 10),
+                "queue_size": queue_size,
+            },
+            "retry_on_failure": {"enabled": True, "max_elapsed_time": "300s"},
+        },
+    }
+    if debug:
+        exporters["debug"] = None
+
+    return {
+        "extensions": {
+            "bearertokenauth": {"scheme": "Bearer", "token": "${env:DB_API_TOKEN}"},
+        },
+        "receivers": receivers,
+        "processors": {
+            "memory_limiter": {
+                "check_interval": "1s",
+                "limit_mib": limit_mib,
+                "spike_limit_mib": limit_mib // 5,
+            },
+            "attributes": {
+                "actions": [
+                    {"key": key, "value": f"${{env:{variable}}}", "action": "insert"}
+                    for key, variable in (
+                        ("databricks_cluster_id", "DB_CLUSTER_ID"),
+                        ("databricks_cluster_name", "DB_CLUSTER_NAME"),
+                        ("databricks_is_driver", "DB_IS_DRIVER"),
+                    )
+                ],
+            },
+            "batch": {
+                "send_batch_size": batch_size,
+                "send_batch_max_size": 2 * batch_size,
+                "timeout": "5s",
+            },
+        },
+        "exporters": exporters,
+        "service": {
+            "extensions": ["bearertokenauth"],
+            "pipelines": {
+                "metrics": {
+                    "receivers": list(receivers),
+                    # memory_limiter first, batch last
+                    "processors": ["memory_limiter", "attributes", "batch"],
+                    "exporters": list(exporters),
+                },
+            },
+        },
+    }
+
+
+_PLAIN = re.compile(r"^[A-Za-z0-9_/$][A-Za-z0-9_./${}:\-]*$")
+# Plain strings YAML would read as something else
+_NUMERIC = re.compile(r"^[-+0-9._:eE]+$")
+_RESERVED = {"true", "false", "yes", "no", "on", "off", "null", "~"}
+
+
+def _scalar(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if (
+        _PLAIN.match(value)
+        and not _NUMERIC.match(value)
+        and value.lower() not in _RESERVED
+    ):
+        return value
+    return json.dumps(value)
+
+
+def _lines(value, indent: int):
+    pad = " " * indent
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and item:
+                yield f"{pad}{key}:"
+                yield from _lines(item, indent + 2)
+            else:
+                yield f"{pad}{key}: {_scalar(item)}".rstrip()
+    else:
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                first, *rest = _lines(item, indent + 2)
+                yield f"{pad}- {first.lstrip()}"
+                yield from rest
+            else:
+                yield f"{pad}- {_scalar(item)}"
+
+
+def to_yaml(config: dict) -> str:
+    """Block-style YAML of a config made of dicts, lists and scalars."""
+    return "\n".join(_lines(config, 0)) + "\n"
+
+
+def render(
+    node: Node = None,
+    enable: Sequence[str] = (),
+    disable: Sequence[str] = (),
+    debug: bool = False,
+) -> str:
+    """The collector config YAML for ``node``, by default the detected one."""
+    node = node or detect_node()
+    header = (
+        f"# Generated by databricks_opentelemetry_exporter.collector for a {node.role}"
+        f" with {node.cores} cores and {node.memory_mib} MiB of memory\n"
+    )
+    return header + to_yaml(collector_config(node, enable, disable, debug))
+
+
+def _names(value: str) -> list:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m databricks_opentelemetry_exporter.collector",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument("--cores", type=int, help="default: detected")
+    parser.add_argument("--memory-mib", type=int, help="default: detected")
+    parser.add_argument("--role", choices=ROLES, help="default: from DB_IS_DRIVER")
+    parser.add_argument(
+        "--enable", type=_names, default=[], help="comma separated scrapers to add"
+    )
+    parser.add_argument(
+        "--disable", type=_names, default=[], help="comma separated scrapers to drop"
+    )
+    parser.add_argument("--debug", action="store_true", help="add the debug exporter")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    node = detect_node()
+    node = Node(
+        cores=args.cores or node.cores,
+        memory_mib=args.memory_mib or node.memory_mib,
+        role=args.role or node.role,
+    )
+    try:
+        config = render(node, args.enable, args.disable, args.debug)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        tmp = f"{args.output}.tmp"
+        with open(tmp, "w") as f:
+            f.write(config)
+        os.replace(tmp, args.output)
+    else:
+        sys.stdout.write(config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,578 @@
+"""
+Compaction of small exported files.
+
+Exporters without rolling leave one small ``{uuid7}`` file per batch, which
+makes listing and reading a volume slow. :func:`compact` merges every
+directory's files older than a cutoff into large files whose records are
+ordered by time (OTLP files keep their batches whole, in file order),
+optionally converting them to another compression or to Parquet. It also
+runs as a module::
+
+    python -m databricks_opentelemetry_exporter.compaction /Volumes/main/default/logs \\
+        --older-than-seconds 3600 --compression zstd
+
+Files are compacted within their own directory, so partitions stay intact.
+A compacted file is named after the oldest file it replaces, which keeps
+name order equal to time order. Metric snapshot files are left alone and
+no compacted file spans one, so the latest snapshot plus the files named
+after it still rebuild current state. JSON files are merged through
+sorted runs spilled to disk, so memory use doesn't grow with the group.
+
+Compaction is crash-safe. Each merged file is written under
+``{dir}/_compaction/`` and then follows these steps:
+
+1. a journal listing the file and its inputs is written atomically;
+2. the file's index sidecar, if any, is written;
+3. the file is renamed into ``{dir}``, which publishes it;
+4. the inputs are deleted;
+5. the journal is deleted.
+
+The next run of :func:`compact` completes or rolls back any journal it
+finds, so a crash never loses records. Readers may briefly see a record
+twice, between steps 3 and 4.
+
+Compaction is safe to run while exporters keep writing to the same
+directory. Exporters only ever create new files, and compaction only
+touches files older than ``older_than_seconds``, which by then are
+complete. Concurrent compactions of one directory serialize on a lock file.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from databricks_opentelemetry_exporter.formats import check_output_format
+from databricks_opentelemetry_exporter.reader import (
+    SIGNALS,
+    file_format,
+    read_json_records,
+    read_otlp_records,
+    read_parquet_records,
+    record_time,
+    signal_from_path,
+)
+from databricks_opentelemetry_exporter.util.compression import (
+    check_compression,
+    compression_from_path,
+    open_compressed,
+    open_decompressed,
+)
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+from databricks_opentelemetry_exporter.util.encoding import dumps
+from databricks_opentelemetry_exporter.util.index import (
+    FileIndex,
+    index_path,
+    read_index,
+    write_index,
+)
+
+COMPACTION_DIR = "_compaction"
+JOURNAL_SUFFIX = ".journal.json"
+
+# (input format, output format) pairs compaction can convert between
+_CONVERSIONS = {
+    ("json", "json"),
+    ("otlp", "otlp"),
+    ("parquet", "parquet"),
+    ("json", "parquet"),
+}
+
+# Compressions each output format can be written with
+OUTPUT_COMPRESSIONS = {
+    "json": ("gzip", "zstd", "none"),
+    "otlp": ("gzip", "zstd", "none"),
+    "parquet": ("snappy", "gzip", "zstd", "none"),
+}
+
+# Records sorted in memory at a time when merging JSON files
+_RUN_RECORDS = 100_000
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _fsync_directory(directory: str) -> None:
+    # Makes a rename durable; not possible on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_journal(work_dir: str, output: str, temp: str, inputs: List[str]) -> str:
+    path = os.path.join(work_dir, output + JOURNAL_SUFFIX)
+    fd, tmp_path = tempfile.mkstemp(dir=work_dir, prefix=".", suffix=".inprogress")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"output": output, "temp": temp, "inputs": inputs}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(work_dir)
+    return path
+
+
+def _delete_inputs(directory: str, inputs: Sequence[str]) -> None:
+    for name in inputs:
+        path = os.path.join(directory, name)
+        _remove(index_path(path))
+        _remove(path)
+
+
+def recover(directory: str) -> None:
+    """
+    Complete or roll back the compactions of ``directory`` (one directory, not
+    recursive) that were interrupted, based on their journals.
+    """
+    work_dir = os.path.join(directory, COMPACTION_DIR)
+    try:
+        names = sorted(os.listdir(work_dir))
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        path = os.path.join(work_dir, name)
+        try:
+            with open(path) as f:
+                journal = json.load(f)
+        except ValueError:
+            # Journals are replaced atomically; treat a corrupt one as unpublished
+            _remove(path)
+            continue
+        output = os.path.join(directory, journal["output"])
+        if os.path.exists(output):
+            _delete_inputs(directory, journal["inputs"])
+        else:
+            _remove(os.path.join(work_dir, journal["temp"]))
+            _remove(index_path(output))
+        _remove(path)
+    # Anything left was written before its journal, so never published
+    for name in names:
+        if name.endswith(".inprogress"):
+            _remove(os.path.join(work_dir, name))
+
+
+class _DirectoryLock:
+    """Non-blocking exclusive lock on a directory's compaction work dir."""
+
+    def __init__(self, work_dir: str):
+        self.path = os.path.join(work_dir, ".lock")
+        self._file = None
+
+    def __enter__(self) -> bool:
+        if fcntl is None:
+            return True
+        self._file = open(self.path, "a")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+        return True
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            self._file.close()
+
+
+class _Output:
+    """Format and naming of the files compacted from one kind of input."""
+
+    def __init__(self, input_format, input_compression, output_format, compression):
+        self.format = output_format or input_format
+        if (input_format, self.format) not in _CONVERSIONS:
+            raise ValueError(f"Can't convert {input_format} files to {self.format}")
+        if compression is None:
+            compression = input_compression
+        elif compression == "none":
+            compression = None
+        self.compression = compression
+        self.suffix = check_output_format(self.format)
+        if self.format != "parquet":
+            self.suffix += check_compression(compression)
+
+    def name_for(self, directory: str, inputs: Sequence[str]) -> str:
+        stem = inputs[0].split(".", 1)[0]
+        name = f"{stem}.compacted{self.suffix}"
+        n = 0
+        while name in inputs or os.path.exists(os.path.join(directory, name)):
+            n += 1
+            name = f"{stem}.compacted-{n}{self.suffix}"
+        return name
+
+
+def _time_key(record: Dict) -> int:
+    return record_time(record) or 0
+
+
+def _spill(run: List[Dict], path: str) -> str:
+    run.sort(key=_time_key)
+    with open(path, "xb") as f:
+        for record in run:
+            f.write(dumps(record) + b"\n")
+    return path
+
+
+def _merged_json_records(
+    paths: Sequence[str], work_dir: str, name: str
+) -> Iterator[Dict]:
+    """
+    Yield the records of ``paths`` in time order. Every ``_RUN_RECORDS``
+    records are sorted and spilled to a run file in ``work_dir``, and the
+    runs are merged as they are read back.
+    """
+    runs, run = [], []
+    try:
+        for path in paths:
+            for record in read_json_records(path):
+                run.append(record)
+                if len(run) >= _RUN_RECORDS:
+                    run_path = os.path.join(
+                        work_dir, f".{name}.run-{len(runs)}.inprogress"
+                    )
+                    runs.append(_spill(run, run_path))
+                    run = []
+        # Stable, and merge prefers earlier runs, so records without a
+        # timestamp keep their place among equals
+        run.sort(key=_time_key)
+        yield from heapq.merge(
+            *(read_json_records(path) for path in runs), run, key=_time_key
+        )
+    finally:
+        for path in runs:
+            _remove(path)
+
+
+def _indexing(records: Iterable[Dict], index: FileIndex) -> Iterator[Dict]:
+    for record in records:
+        index.add_records((record,))
+        yield record
+
+
+def _write_json(temp_path: str, records, output: _Output, level: int) -> None:
+    with open_compressed(temp_path, output.compression, level) as f:
+        nbytes = 0
+        for record in records:
+            line = dumps(record) + b"\n"
+            f.write(line)
+            nbytes += len(line)
+        DurabilityPolicy("per-batch").commit(f, nbytes)
+
+
+def _write_otlp(temp_path: str, paths, output: _Output, level: int) -> None:
+    # Framed messages concatenate into a valid file as they are
+    with open_compressed(temp_path, output.compression, level) as f:
+        nbytes = 0
+        for path in paths:
+            with open_decompressed(path) as source:
+                shutil.copyfileobj(source, f)
+            nbytes += os.path.getsize(path)
+        DurabilityPolicy("per-batch").commit(f, nbytes)
+
+
+def _write_parquet(temp_path: str, paths, records, output: _Output) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from databricks_opentelemetry_exporter.formats.parquet import (
+        LOG_SCHEMA,
+        SPAN_SCHEMA,
+        json_log_columns,
+        json_span_columns,
+    )
+
+    compression = output.compression or "zstd"
+    if records is None:
+        table = pa.concat_tables([pq.read_table(path) for path in paths])
+        names = table.schema.names
+        table = table.sort_by("start_time" if "start_time" in names else "timestamp")
+        pq.write_table(table, temp_path, compression=compression)
+    else:
+        # Already in time order; written a row group at a time
+        records = iter(records)
+        chunk = list(itertools.islice(records, _RUN_RECORDS))
+        if chunk and "resource_metrics" in chunk[0]:
+            raise ValueError("Metrics can't be compacted to Parquet")
+        if chunk and "context" in chunk[0]:
+            schema, columns = SPAN_SCHEMA, json_span_columns
+        else:
+            schema, columns = LOG_SCHEMA, json_log_columns
+        with pq.ParquetWriter(temp_path, schema, compression=compression) as writer:
+            while True:
+                writer.write_table(pa.table(columns(chunk), schema=schema))
+                chunk = list(itertools.islice(records, _RUN_RECORDS))
+                if not chunk:
+                    break
+    with open(temp_path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def _compact_group(
+    directory: str,
+    inputs: List[str],
+    output: _Output,
+    input_format: str,
+    compression_level: Optional[int],
+    signal: Optional[str],
+) -> str:
+    work_dir = os.path.join(directory, COMPACTION_DIR)
+    paths = [os.path.join(directory, name) for name in inputs]
+    name = output.name_for(directory, inputs)
+    temp = f".{name}.inprogress"
+    temp_path = os.path.join(work_dir, temp)
+    index = None
+    if any(read_index(path) is not None for path in paths):
+        index = FileIndex()
+
+    records = None
+    if input_format == "json":
+        records = _merged_json_records(paths, work_dir, name)
+        if index is not None:
+            records = _indexing(records, index)
+    if output.format == "json":
+        _write_json(temp_path, records, output, compression_level)
+    elif output.format == "otlp":
+        _write_otlp(temp_path, paths, output, compression_level)
+    else:
+        _write_parquet(temp_path, paths, records, output)
+
+    if index is not None and records is None:
+        # Only log and span files are indexed
+        if input_format == "parquet":
+            index.add_records(r for path in paths for r in read_parquet_records(path))
+        elif signal in ("logs", "traces"):
+            index.add_records(
+                r for path in paths for r in read_otlp_records(path, signal)
+            )
+        else:
+            index = None
+
+    journal = _write_journal(work_dir, name, temp, inputs)
+    output_path = os.path.join(directory, name)
+    if index is not None:
+        # After the journal, so recovery removes it if the file isn't published
+        write_index(output_path, index)
+    os.rename(temp_path, output_path)
+    _fsync_directory(directory)
+    _delete_inputs(directory, inputs)
+    os.unlink(journal)
+    return output_path
+
+
+def _candidates(directory: str, cutoff: float, target_file_bytes: int):
+    """
+    Group the compactable files of ``directory`` by (format, compression), as
+    (name, size, number of metric snapshots named before it) tuples.
+    """
+    kinds: Dict[tuple, List] = {}
+    snapshots = 0
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(("_", ".")):
+            # Hidden files are in progress
+            continue
+        if ".snapshot." in name:
+            # Metric snapshots must stay whole and in place
+            snapshots += 1
+            continue
+        input_format = file_format(name)
+        if input_format is None:
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime > cutoff or stat.st_size >= target_file_bytes:
+            continue
+        key = (input_format, compression_from_path(name))
+        kinds.setdefault(key, []).append((name, stat.st_size, snapshots))
+    return kinds
+
+
+def _groups(files, target_file_bytes: int) -> List[List[str]]:
+    """
+    Split ``files`` into groups of about ``target_file_bytes``, never across a
+    metric snapshot: a group is named after its oldest file, which has to sort
+    between the same snapshots as all of its records.
+    """
+    groups, group, size, segment = [], [], 0, None
+    for name, file_size, snapshots in files:
+        if group and (size + file_size > target_file_bytes or snapshots != segment):
+            groups.append(group)
+            group, size = [], 0
+        group.append(name)
+        size += file_size
+        segment = snapshots
+    if group:
+        groups.append(group)
+    return groups
+
+
+def compact_directory(
+    directory: str,
+    older_than_seconds: float = 3600,
+    target_file_bytes: int = 128 * 1024 * 1024,
+    output_format: str = None,
+    compression: str = None,
+    compression_level: int = None,
+    signal: str = None,
+) -> List[str]:
+    """
+    Compact the files directly in ``directory`` (not its subdirectories),
+    see :func:`compact`. Returns the paths of the compacted files written.
+    """
+    cutoff = time.time() - older_than_seconds
+    work_dir = os.path.join(directory, COMPACTION_DIR)
+    if not os.path.isdir(work_dir):
+        # Nothing to recover; don't create work dirs where there's nothing to do
+        if not _candidates(directory, cutoff, target_file_bytes):
+            return []
+        os.makedirs(work_dir, exist_ok=True)
+    signal = signal or signal_from_path(directory)
+    outputs = []
+    with _DirectoryLock(work_dir) as locked:
+        if not locked:
+            return []
+        recover(directory)
+        kinds = _candidates(directory, cutoff, target_file_bytes)
+        for (input_format, input_compression), files in kinds.items():
+            output = _Output(
+                input_format, input_compression, output_format, compression
+            )
+            converting = (output.format, output.compression) != (
+                input_format,
+                input_compression,
+            )
+            for group in _groups(files, target_file_bytes):
+                if len(group) < 2 and not converting:
+                    continue
+                outputs.append(
+                    _compact_group(
+                        directory,
+                        group,
+                        output,
+                        input_format,
+                        compression_level,
+                        signal,
+                    )
+                )
+    return outputs
+
+
+def compact(
+    directory: str,
+    older_than_seconds: float = 3600,
+    target_file_bytes: int = 128 * 1024 * 1024,
+    output_format: str = None,
+    compression: str = None,
+    compression_level: int = None,
+    signal: str = None,
+) -> List[str]:
+    """
+    Merge the small exported files under ``directory`` that were last
+    modified more than ``older_than_seconds`` ago into files of up to about
+    ``target_file_bytes``. Every directory is compacted separately,
+    partition directories included.
+
+    ``output_format`` and ``compression`` default to those of the inputs.
+    JSON log and span files can be converted to ``"parquet"``, where
+    ``compression`` is the column codec. ``compression="none"`` writes
+    uncompressed files. OTLP files need their ``signal``, from the argument or
+    a ``signal=`` partition, to index the compacted file. Indexes are only
+    written where the inputs had them.
+
+    Returns the paths of the compacted files written.
+    """
+    if output_format is not None:
+        check_output_format(output_format)
+    if signal is not None and signal not in SIGNALS:
+        raise ValueError(
+            f"Unsupported signal: {signal!r}, expected one of {list(SIGNALS)}"
+        )
+    outputs = []
+    for dirpath, dirnames, _ in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(("_", ".")))
+        outputs.extend(
+            compact_directory(
+                dirpath,
+                older_than_seconds,
+                target_file_bytes,
+                output_format,
+                compression,
+                compression_level,
+                signal,
+            )
+        )
+    return outputs
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m databricks_opentelemetry_exporter.compaction",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument("directory", help="export directory to compact")
+    parser.add_argument(
+        "--older-than-seconds",
+        type=float,
+        default=3600,
+        help="only compact files last modified before this (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--target-file-mb",
+        type=float,
+        default=128,
+        help="approximate size of compacted files (default: %(default)s)",
+    )
+    parser.add_argument("--output-format", choices=["json", "otlp", "parquet"])
+    parser.add_argument(
+        "--compression",
+        choices=OUTPUT_COMPRESSIONS["parquet"],
+        help="json and otlp output: gzip, zstd or none; parquet output also "
+        "snappy (default: that of the inputs)",
+    )
+    parser.add_argument("--compression-level", type=int)
+    parser.add_argument("--signal", choices=SIGNALS)
+    args = parser.parse_args(argv)
+    # Without --output-format the inputs may be of any format
+    compressions = OUTPUT_COMPRESSIONS[args.output_format or "json"]
+    if args.compression is not None and args.compression not in compressions:
+        parser.error(f"--compression {args.compression} needs --output-format parquet")
+
+    outputs = compact(
+        args.directory,
+        older_than_seconds=args.older_than_seconds,
+        target_file_bytes=int(args.target_file_mb * 1024 * 1024),
+        output_format=args.output_format,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        signal=args.signal,
+    )
+    for path in outputs:
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+Fan-out exporters: encode a batch once, ship it to several sinks.
+
+Sending logs or traces both to a volume and to an OTLP endpoint through one
+batch processor per destination queues, copies and encodes every record
+once per destination. :class:`FanoutLogExporter` and
+:class:`FanoutSpanExporter` take each batch once, encode it once per
+distinct ``encoding`` their sinks need and hand it to all sinks in
+parallel::
+
+    exporter = FanoutLogExporter([
+        DatabricksVolumeLogExporter(log_dir, output_format="otlp"),
+        OTLPHttpSink("http://localhost:4318", "logs"),
+    ])
+    logger_provider.add_log_record_processor(BatchLogRecordProcessor(exporter))
+
+The shared encodings are ``"otlp"``, the serialized
+``Export{Logs,Trace}ServiceRequest`` that is both the body of an OTLP/HTTP
+request and a message of a ``.binpb`` file, and ``"json"``, the compact
+JSON lines of :mod:`databricks_opentelemetry_exporter.util.encoding`. Volume
+exporters take the one matching their output (see their ``encoding``);
+other exporters, such as the SDK's OTLP exporters, encode batches
+themselves.
+
+Every sink has its own queue and worker thread, so a slow sink only holds
+up itself. ``export()`` encodes the batch, queues it for every sink and
+returns without waiting for them. A sink that still has ``max_pending``
+batches queued skips new batches until it catches up, which makes the
+result a failure; the other sinks export the batch regardless. Sends that
+fail are logged, and make the next ``force_flush()`` return False.
+"""
+import abc
+import gzip
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Sequence
+
+from opentelemetry.exporter.otlp.proto.common._log_encoder import encode_logs
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk._logs._internal.export import LogExporter, LogExportResult
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from databricks_opentelemetry_exporter.formats.otlp import SIGNALS
+from databricks_opentelemetry_exporter.util.encoding import (
+    encode_log_batch,
+    encode_span_batch,
+)
+
+_logger = logging.getLogger(__name__)
+
+ENCODINGS = ("json", "otlp")
+
+_ENCODERS = {
+    "logs": {
+        "json": encode_log_batch,
+        "otlp": lambda batch: encode_logs(batch).SerializeToString(),
+    },
+    "traces": {
+        "json": encode_span_batch,
+        "otlp": lambda spans: encode_spans(spans).SerializeToString(),
+    },
+}
+
+OTLP_COMPRESSIONS = (None, "gzip")
+
+
+class Sink(abc.ABC):
+    """
+    One destination of a fan-out exporter. :meth:`send` gets batches
+    encoded as ``encoding``, one of :data:`ENCODINGS`, or unencoded if it
+    is None. ``timeout_seconds`` bounds each send where the sink supports
+    it, e.g. the requests of :class:`OTLPHttpSink`.
+    """
+
+    encoding = None
+
+    def __init__(self, name: str, timeout_seconds: float = 10.0, max_pending: int = 8):
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.max_pending = max_pending
+
+    @abc.abstractmethod
+    def send(self, batch: Sequence, payload: bytes) -> None:
+        """Export ``batch``, encoded as ``payload`` if any; raises on failure."""
+
+    def force_flush(self, timeout_millis: float = 30_000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ExporterSink(Sink):
+    """
+    Any ``LogExporter`` or ``SpanExporter``. Volume exporters take the
+    shared encoding matching their output, others encode batches themselves.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        timeout_seconds: float = 10.0,
+        max_pending: int = 8,
+        name: str = None,
+    ):
+        super().__init__(name or type(exporter).__name__, timeout_seconds, max_pending)
+        self.exporter = exporter
+        self.encoding = getattr(exporter, "encoding", None)
+
+    def send(self, batch: Sequence, payload: bytes) -> None:
+        if payload is None:
+            result = self.exporter.export(batch)
+        else:
+            result = self.exporter.export_encoded(batch, payload)
+        if result.name != "SUCCESS":
+            raise RuntimeError(f"{self.name} failed to export the batch")
+
+    def force_flush(self, timeout_millis: float = 30_000) -> bool:
+        return self.exporter.force_flush(timeout_millis) is not False
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+
+class OTLPHttpSink(Sink):
+    """
+    POSTs batches to the OTLP/HTTP ``endpoint`` (e.g. ``http://localhost:4318``,
+    the collector configured by ``agent/init.sh``) as protobuf.
+    """
+
+    encoding = "otlp"
+
+    def __init__(
+        self,
+        endpoint: str,
+        signal: str,
+        headers: dict = None,
+        compression: str = None,
+        timeout_seconds: float = 10.0,
+        max_pending: int = 8,
+    ):
+        if signal not in SIGNALS:
+            raise ValueError(
+                f"Unsupported signal: {signal!r}, expected one of {list(SIGNALS)}"
+            )
+        if compression not in OTLP_COMPRESSIONS:
+            raise ValueError(
+                f"Unsupported compression: {compression!r}, "
+                f"expected one of {list(OTLP_COMPRESSIONS)}"
+            )
+        super().__init__(f"OTLP {endpoint}", timeout_seconds, max_pending)
+        self.url = endpoint.rstrip("/") + SIGNALS[signal]
+        self.compression = compression
+        self.headers = {"Content-Type": "application/x-protobuf"}
+        if compression:
+            self.headers["Content-Encoding"] = compression
+        self.headers.update(headers or {})
+        self._session = None
+
+    def send(self, batch: Sequence, payload: bytes) -> None:
+        import requests
+
+        if self._session is None:
+            # Only used from the sink's worker thread
+            self._session = requests.Session()
+        if self.compression == "gzip":
+            payload = gzip.compress(payload)
+        response = self._session.post(
+            self.url, data=payload, headers=self.headers, timeout=self.timeout_seconds
+        )
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+
+class _Worker:
+    """Runs one sink's queued sends in order on a thread of its own."""
+
+    def __init__(self, sink: Sink):
+        self.sink = sink
+        self.pending = 0
+        # Sends that failed since the last force_flush()
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"Fanout {sink.name}"
+        )
+
+    def submit(self, batch: Sequence, payload) -> bool:
+        """Queue ``batch``, returning False if the sink is too far behind."""
+        with self._lock:
+            if self.pending >= self.sink.max_pending:
+                return False
+            self.pending += 1
+        self._executor.submit(self._send, batch, payload)
+        return True
+
+    def _send(self, batch: Sequence, payload) -> None:
+        try:
+            self.sink.send(batch, payload)
+            failed = 0
+        except Exception as e:
+            _logger.error(f"Sink {self.sink.name} failed to export a batch: {str(e)}")
+            failed = 1
+        with self._lock:
+            self.pending -= 1
+            self.failed += failed
+
+    def take_failed(self) -> int:
+        with self._lock:
+            failed, self.failed = self.failed, 0
+        return failed
+
+    def wait(self, timeout_seconds: float) -> bool:
+        """Wait for the sends submitted so far."""
+        try:
+            self._executor.submit(lambda: None).result(timeout_seconds)
+            return True
+        except FutureTimeoutError:
+            return False
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _Fanout:
+    signal = None
+
+    def __init__(self, sinks: Sequence):
+        if not sinks:
+            raise ValueError("At least one sink must be provided")
+        self._workers = [
+            _Worker(sink if isinstance(sink, Sink) else ExporterSink(sink))
+            for sink in sinks
+        ]
+
+    @property
+    def sinks(self):
+        return [worker.sink for worker in self._workers]
+
+    def _encode(self, batch: Sequence) -> dict:
+        payloads = {}
+        for worker in self._workers:
+            encoding = worker.sink.encoding
+            if encoding is None or encoding in payloads:
+                continue
+            try:
+                payloads[encoding] = _ENCODERS[self.signal][encoding](batch)
+            except Exception as e:
+                # Fails only the sinks that need this encoding
+                payloads[encoding] = e
+        return payloads
+
+    def _export(self, batch: Sequence) -> bool:
+        """Queue ``batch`` for every sink, returning whether all of them took it."""
+        if not batch:
+            return True
+        payloads = self._encode(batch)
+        ok = True
+        for worker in self._workers:
+            sink = worker.sink
+            payload = payloads.get(sink.encoding)
+            if isinstance(payload, Exception):
+                _logger.error(
+                    f"Error encoding a batch as {sink.encoding} for sink "
+                    f"{sink.name}: {str(payload)}"
+                )
+                ok = False
+            elif not worker.submit(batch, payload):
+                _logger.error(f"Sink {sink.name} is falling behind, skipped a batch")
+                ok = False
+        return ok
+
+    def force_flush(self, timeout_millis: float = 30_000) -> bool:
+        """
+        Wait for the queued batches and flush every sink. False if that
+        timed out or a send failed since the last flush.
+        """
+        deadline = time.monotonic() + timeout_millis / 1000
+        ok = True
+        for worker in self._workers:
+            remaining = max(0.0, deadline - time.monotonic())
+            ok = worker.wait(remaining) and ok
+            ok = worker.sink.force_flush(remaining * 1000) and ok
+            ok = not worker.take_failed() and ok
+        return ok
+
+    def shutdown(self) -> None:
+        self.force_flush()
+        for worker in self._workers:
+            worker.shutdown()
+            try:
+                worker.sink.shutdown()
+            except Exception as e:
+                _logger.error(f"Error shutting down sink {worker.sink.name}: {str(e)}")
+
+
+class FanoutLogExporter(_Fanout, LogExporter):
+    """Exports every batch of log records to all ``sinks``."""
+
+    signal = "logs"
+
+    def export(self, batch: Sequence) -> LogExportResult:
+        if self._export(batch):
+            return LogExportResult.SUCCESS
+        return LogExportResult.FAILURE
+
+
+class FanoutSpanExporter(_Fanout, SpanExporter):
+    """Exports every batch of spans to all ``sinks``."""
+
+    signal = "traces"
+
+    def export(self, spans: Sequence) -> SpanExportResult:
+        if self._export(spans):
+            return SpanExportResult.SUCCESS
+        return SpanExportResult.FAILURE
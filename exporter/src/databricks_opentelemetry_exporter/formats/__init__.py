@@ -0,0 +1,31 @@
+# File name suffix for each on-disk output format
+OUTPUT_FORMAT_SUFFIXES = {
+    "json": ".json",
+    "otlp": ".binpb",
+    "parquet": ".parquet",
+}
+
+
+def check_output_format(output_format: str) -> str:
+    """Validate an output format name, returning its file name suffix."""
+    if output_format not in OUTPUT_FORMAT_SUFFIXES:
+        raise ValueError(
+            f"Unsupported output_format: {output_format!r}, "
+            f"expected one of {list(OUTPUT_FORMAT_SUFFIXES)}"
+        )
+    return OUTPUT_FORMAT_SUFFIXES[output_format]
+
+
+def check_resource_mode(resource_mode: str, output_format: str, formatter=None) -> None:
+    """
+    Validate a resource mode. ``"header"`` writes the resource once per file
+    and only applies to the built-in JSON encoding.
+    """
+    if resource_mode not in ("inline", "header"):
+        raise ValueError(
+            f"Unsupported resource_mode: {resource_mode!r}, expected 'inline' or 'header'"
+        )
+    if resource_mode == "header" and (output_format != "json" or formatter is not None):
+        raise ValueError(
+            "resource_mode='header' requires the default JSON output and no custom formatter"
+        )
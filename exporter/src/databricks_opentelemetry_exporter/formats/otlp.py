@@ -0,0 +1,99 @@
+"""
+Length-delimited OTLP protobuf files.
+
+Every exported batch is written as one ``Export{Logs,Trace,Metrics}ServiceRequest``
+message prefixed with its size as a 4-byte big-endian integer, the same
+framing the collector's ``fileexporter`` uses for ``format: proto``. Each
+message is exactly the body of an OTLP/HTTP request, so files can be
+replayed into an OTLP endpoint with :func:`replay` without conversion.
+
+The OTLP encoders pull in protobuf and the generated OTLP messages, so they
+are imported on first use rather than with this module.
+"""
+import struct
+from typing import Iterator, Sequence
+
+from databricks_opentelemetry_exporter.util.compression import open_decompressed
+
+_SIZE = struct.Struct(">I")
+
+# OTLP/HTTP path and request message for each signal
+SIGNALS = {
+    "logs": "/v1/logs",
+    "traces": "/v1/traces",
+    "metrics": "/v1/metrics",
+}
+
+
+def frame(message: bytes) -> bytes:
+    return _SIZE.pack(len(message)) + message
+
+
+def encode_log_batch(batch: Sequence) -> bytes:
+    """Encode a batch of ``LogData`` as one framed ``ExportLogsServiceRequest``."""
+    from opentelemetry.exporter.otlp.proto.common._log_encoder import encode_logs
+
+    return frame(encode_logs(batch).SerializeToString())
+
+
+def encode_span_batch(spans: Sequence) -> bytes:
+    """Encode a batch of ``ReadableSpan`` as one framed ``ExportTraceServiceRequest``."""
+    from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+    return frame(encode_spans(spans).SerializeToString())
+
+
+def encode_metrics_data(metrics_data) -> bytes:
+    """Encode ``MetricsData`` as one framed ``ExportMetricsServiceRequest``."""
+    from opentelemetry.exporter.otlp.proto.common.metrics_encoder import encode_metrics
+
+    return frame(encode_metrics(metrics_data).SerializeToString())
+
+
+def iter_messages(fileobj) -> Iterator[bytes]:
+    """Yield the serialized messages of a length-delimited stream."""
+    while True:
+        header = fileobj.read(_SIZE.size)
+        if not header:
+            return
+        if len(header) < _SIZE.size:
+            raise ValueError("Truncated message size in OTLP file")
+        (size,) = _SIZE.unpack(header)
+        message = fileobj.read(size)
+        if len(message) < size:
+            raise ValueError("Truncated message in OTLP file")
+        yield message
+
+
+def read_file(path: str, use_mmap: bool = False) -> Iterator[bytes]:
+    """Yield the serialized messages of a (possibly compressed) ``.binpb`` file."""
+    with open_decompressed(path, use_mmap=use_mmap) as f:
+        yield from iter_messages(f)
+
+
+def replay(
+    path: str,
+    endpoint: str,
+    signal: str,
+    headers: dict = None,
+    timeout: float = 10.0,
+) -> int:
+    """
+    POST every message in ``path`` to the OTLP/HTTP ``endpoint`` (e.g. the
+    collector configured by ``agent/init.sh``). Returns the number of messages
+    sent and raises on the first failed request.
+    """
+    import requests
+
+    url = endpoint.rstrip("/") + SIGNALS[signal]
+    request_headers = {"Content-Type": "application/x-protobuf"}
+    request_headers.update(headers or {})
+    sent = 0
+    with requests.Session() as session:
+        for message in read_file(path):
+            response = session.post(
+                url, data=message, headers=request_headers, timeout=timeout
+            )
+            response.raise_for_status()
+            sent += 1
+    return sent
@@ -0,0 +1,355 @@
+"""
+Columnar Parquet output for logs and spans.
+
+Records are buffered into Arrow columns with a fixed schema and written as
+Parquet row groups, so downstream Spark jobs read typed columns instead of
+parsing JSON. Attributes and resources are flattened into
+``map<string, string>`` columns; non-string values are JSON encoded.
+
+Requires the optional ``pyarrow`` dependency.
+"""
+from typing import Any, Dict, List, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    raise ImportError(
+        "Parquet output requires the 'pyarrow' package; "
+        "install databricks-opentelemetry-exporter[parquet]"
+    )
+
+from databricks_opentelemetry_exporter.reader import record_severity, to_time_ns
+from databricks_opentelemetry_exporter.util.encoding import dumps
+from databricks_opentelemetry_exporter.util.writer import RollingFileWriter
+
+_TIMESTAMP = pa.timestamp("ns", tz="UTC")
+_ATTRIBUTES = pa.map_(pa.string(), pa.string())
+
+LOG_SCHEMA = pa.schema(
+    [
+        ("timestamp", _TIMESTAMP),
+        ("observed_timestamp", _TIMESTAMP),
+        ("severity_number", pa.int32()),
+        ("severity_text", pa.string()),
+        ("body", pa.string()),
+        ("trace_id", pa.string()),
+        ("span_id", pa.string()),
+        ("trace_flags", pa.int32()),
+        ("attributes", _ATTRIBUTES),
+        ("resource", _ATTRIBUTES),
+        ("scope_name", pa.string()),
+        ("scope_version", pa.string()),
+    ]
+)
+
+SPAN_SCHEMA = pa.schema(
+    [
+        ("trace_id", pa.string()),
+        ("span_id", pa.string()),
+        ("parent_span_id", pa.string()),
+        ("name", pa.string()),
+        ("kind", pa.string()),
+        ("start_time", _TIMESTAMP),
+        ("end_time", _TIMESTAMP),
+        ("duration_ns", pa.int64()),
+        ("status_code", pa.string()),
+        ("status_description", pa.string()),
+        ("attributes", _ATTRIBUTES),
+        ("events", pa.string()),
+        ("links", pa.string()),
+        ("resource", _ATTRIBUTES),
+        ("scope_name", pa.string()),
+        ("scope_version", pa.string()),
+    ]
+)
+
+
+def _flatten(attributes) -> List[tuple]:
+    if not attributes:
+        return []
+    return [
+        (key, value if isinstance(value, str) else dumps(value).decode("utf-8"))
+        for key, value in attributes.items()
+    ]
+
+
+_resource_cache = (None, None)
+
+
+def _flatten_resource(resource) -> List[tuple]:
+    global _resource_cache
+    if resource is None:
+        return []
+    cached, value = _resource_cache
+    if cached is not resource:
+        value = _flatten(resource.attributes)
+        _resource_cache = (resource, value)
+    return value
+
+
+def _trace_id(trace_id) -> str:
+    return f"{trace_id:032x}" if trace_id else None
+
+
+def _span_id(span_id) -> str:
+    return f"{span_id:016x}" if span_id else None
+
+
+def log_columns(batch: Sequence) -> Dict[str, List[Any]]:
+    """Build ``LOG_SCHEMA`` columns from a batch of ``LogData``."""
+    columns = {name: [] for name in LOG_SCHEMA.names}
+    for data in batch:
+        record = data.log_record
+        scope = data.instrumentation_scope
+        body = record.body
+        severity = record.severity_number
+        columns["timestamp"].append(record.timestamp)
+        columns["observed_timestamp"].append(record.observed_timestamp)
+        columns["severity_number"].append(
+            getattr(severity, "value", severity)
+        )
+        columns["severity_text"].append(record.severity_text)
+        columns["body"].append(
+            body if body is None or isinstance(body, str) else dumps(body).decode("utf-8")
+        )
+        columns["trace_id"].append(_trace_id(record.trace_id))
+        columns["span_id"].append(_span_id(record.span_id))
+        columns["trace_flags"].append(
+            int(record.trace_flags) if record.trace_flags is not None else None
+        )
+        columns["attributes"].append(_flatten(record.attributes))
+        columns["resource"].append(_flatten_resource(record.resource))
+        columns["scope_name"].append(scope.name if scope else None)
+        columns["scope_version"].append(scope.version if scope else None)
+    return columns
+
+
+def span_columns(spans: Sequence) -> Dict[str, List[Any]]:
+    """Build ``SPAN_SCHEMA`` columns from a batch of ``ReadableSpan``."""
+    columns = {name: [] for name in SPAN_SCHEMA.names}
+    for span in spans:
+        context = span.context
+        scope = span.instrumentation_scope
+        start, end = span.start_time, span.end_time
+        columns["trace_id"].append(_trace_id(context.trace_id) if context else None)
+        columns["span_id"].append(_span_id(context.span_id) if context else None)
+        columns["parent_span_id"].append(
+            _span_id(span.parent.span_id) if span.parent else None
+        )
+        columns["name"].append(span.name)
+        columns["kind"].append(span.kind.name)
+        columns["start_time"].append(start)
+        columns["end_time"].append(end)
+        columns["duration_ns"].append(end - start if start and end else None)
+        columns["status_code"].append(span.status.status_code.name)
+        columns["status_description"].append(span.status.description)
+        columns["attributes"].append(_flatten(span.attributes))
+        columns["events"].append(
+            dumps(
+                [
+                    {
+                        "name": event.name,
+                        "timestamp": event.timestamp,
+                        "attributes": dict(event.attributes or {}),
+                    }
+                    for event in span.events
+                ]
+            ).decode("utf-8")
+            if span.events
+            else None
+        )
+        columns["links"].append(
+            dumps(
+                [
+                    {
+                        "trace_id": _trace_id(link.context.trace_id),
+                        "span_id": _span_id(link.context.span_id),
+                        "attributes": dict(link.attributes or {}),
+                    }
+                    for link in span.links
+                ]
+            ).decode("utf-8")
+            if span.links
+            else None
+        )
+        columns["resource"].append(_flatten_resource(span.resource))
+        columns["scope_name"].append(scope.name if scope else None)
+        columns["scope_version"].append(scope.version if scope else None)
+    return columns
+
+
+def _json_id(value) -> str:
+    # JSON records carry "0x" prefixed ids, or "" when unset
+    value = (value or "").removeprefix("0x")
+    return value if value.strip("0") else None
+
+
+def _json_body(body) -> str:
+    if body is None or isinstance(body, str):
+        return body
+    return dumps(body).decode("utf-8")
+
+
+def _json_resource(record) -> List[tuple]:
+    resource = record.get("resource") or {}
+    return _flatten(resource.get("attributes"))
+
+
+def json_log_columns(records: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Build ``LOG_SCHEMA`` columns from log records in the JSON output format,
+    as read back by :func:`~databricks_opentelemetry_exporter.reader.read_json_records`.
+    """
+    columns = {name: [] for name in LOG_SCHEMA.names}
+    for record in records:
+        columns["timestamp"].append(to_time_ns(record.get("timestamp")))
+        columns["observed_timestamp"].append(
+            to_time_ns(record.get("observed_timestamp"))
+        )
+        columns["severity_number"].append(record_severity(record))
+        columns["severity_text"].append(record.get("severity_text"))
+        columns["body"].append(_json_body(record.get("body")))
+        columns["trace_id"].append(_json_id(record.get("trace_id")))
+        columns["span_id"].append(_json_id(record.get("span_id")))
+        columns["trace_flags"].append(record.get("trace_flags"))
+        columns["attributes"].append(_flatten(record.get("attributes")))
+        columns["resource"].append(_json_resource(record))
+        columns["scope_name"].append(None)
+        columns["scope_version"].append(None)
+    return columns
+
+
+def json_span_columns(records: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Build ``SPAN_SCHEMA`` columns from span records in the JSON output format."""
+    columns = {name: [] for name in SPAN_SCHEMA.names}
+    for record in records:
+        context = record.get("context") or {}
+        status = record.get("status") or {}
+        start = to_time_ns(record.get("start_time"))
+        end = to_time_ns(record.get("end_time"))
+        columns["trace_id"].append(_json_id(context.get("trace_id")))
+        columns["span_id"].append(_json_id(context.get("span_id")))
+        columns["parent_span_id"].append(_json_id(record.get("parent_id")))
+        columns["name"].append(record.get("name"))
+        # str(SpanKind.SERVER) is "SpanKind.SERVER"
+        columns["kind"].append((record.get("kind") or "").rpartition(".")[2] or None)
+        columns["start_time"].append(start)
+        columns["end_time"].append(end)
+        columns["duration_ns"].append(end - start if start and end else None)
+        columns["status_code"].append(status.get("status_code"))
+        columns["status_description"].append(status.get("description"))
+        columns["attributes"].append(_flatten(record.get("attributes")))
+        columns["events"].append(
+            dumps(
+                [
+                    {
+                        "name": event.get("name"),
+                        "timestamp": to_time_ns(event.get("timestamp")),
+                        "attributes": event.get("attributes") or {},
+                    }
+                    for event in record["events"]
+                ]
+            ).decode("utf-8")
+            if record.get("events")
+            else None
+        )
+        columns["links"].append(
+            dumps(
+                [
+                    {
+                        "trace_id": _json_id(link["context"].get("trace_id")),
+                        "span_id": _json_id(link["context"].get("span_id")),
+                        "attributes": link.get("attributes") or {},
+                    }
+                    for link in record["links"]
+                ]
+            ).decode("utf-8")
+            if record.get("links")
+            else None
+        )
+        columns["resource"].append(_json_resource(record))
+        columns["scope_name"].append(None)
+        columns["scope_version"].append(None)
+    return columns
+
+
+class ParquetFileWriter(RollingFileWriter):
+    """
+    :class:`RollingFileWriter` that buffers rows and writes Parquet files.
+
+    Rows are buffered until ``row_group_size`` records are pending and then
+    written as one row group. Finalizing a file writes the remaining rows and
+    the Parquet footer. ``compression`` is the Parquet column codec.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        schema: "pa.Schema",
+        row_group_size: int = 64 * 1024,
+        compression: str = "zstd",
+        **kwargs,
+    ):
+        super().__init__(directory, suffix=".parquet", **kwargs)
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.parquet_compression = compression
+        self._parquet = None
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def _open(self):
+        super()._open()
+        self._parquet = pq.ParquetWriter(
+            self._file, self.schema, compression=self.parquet_compression
+        )
+
+    def _write_row_group(self):
+        if not self._buffered:
+            return
+        table = pa.Table.from_pydict(self._columns, schema=self.schema)
+        self._parquet.write_table(table)
+        self._reset_columns()
+        self._file.flush()
+        self.durability.after_write(self._file, self._file.tell() - self._bytes)
+        self._bytes = self._file.tell()
+
+    def _finalize(self):
+        try:
+            self._write_row_group()
+            self._parquet.close()
+        finally:
+            self._parquet = None
+            super()._finalize()
+
+    def write(self, data, records: int = 1) -> None:
+        raise TypeError("ParquetFileWriter accepts columns, use write_rows()")
+
+    def write_rows(
+        self, columns: Dict[str, List[Any]], records: int, update_index=None
+    ) -> None:
+        """
+        Buffer ``records`` rows given as ``{column: values}``.
+        ``update_index`` is called with the current file's ``FileIndex``.
+        """
+        with self._lock:
+            if self._closed:
+                raise ValueError("write to closed ParquetFileWriter")
+            if self._file is not None and self._expired():
+                self._finalize()
+            if self._file is None:
+                self._open()
+            for name, values in columns.items():
+                self._columns[name].extend(values)
+            self._buffered += records
+            self._records += records
+            if self._index is not None and update_index is not None:
+                update_index(self._index)
+            if self._buffered >= self.row_group_size:
+                self._write_row_group()
+            if self._full():
+                self._finalize()
@@ -1,9 +1,33 @@
 from typing import Callable, Sequence
 import os
 from pathlib import Path
-import threading
+import time
 
+from databricks_opentelemetry_exporter.formats import check_output_format, check_resource_mode
+from databricks_opentelemetry_exporter.formats import otlp
+from databricks_opentelemetry_exporter.spool import SpoolClient
+from databricks_opentelemetry_exporter.util.async_writer import AsyncBatchWriter
+from databricks_opentelemetry_exporter.util.compression import (
+    check_compression,
+    open_compressed,
+)
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+from databricks_opentelemetry_exporter.util.encoding import (
+    dumps,
+    encode_log_batch,
+    encode_resource_header,
+    group_by_resource,
+    log_record_to_dict,
+)
+from databricks_opentelemetry_exporter.util.index import FileIndex, write_index
+from databricks_opentelemetry_exporter.util.partitioning import (
+    PartitionedWriter,
+    Partitioner,
+)
+from databricks_opentelemetry_exporter.util.telemetry import ExporterTelemetry
 from databricks_opentelemetry_exporter.util.uuids import uuid7
+from databricks_opentelemetry_exporter.util.wal import WriteAheadQueue
+from databricks_opentelemetry_exporter.util.writer import RollingFileWriter
 
 from opentelemetry.sdk._logs import LogData, LogRecord
 from opentelemetry.sdk._logs._internal.export import (
@@ -12,37 +36,188 @@ from opentelemetry.sdk._logs._internal.export import (
 )
 
 def default_formatter(record: LogRecord) -> str:
-    return (
-        record.to_json().replace("\n", "")
-        #.replace(" ", "")
-         + "\n"
-    )
+    return dumps(log_record_to_dict(record)).decode("utf-8") + "\n"
 
 
 def create_databricks_volume_log_exporter(
     log_dir: str = None,
-    formatter: Callable[[LogRecord], str] = default_formatter,
+    formatter: Callable[[LogRecord], str] = None,
+    **kwargs,
 ) -> "DatabricksVolumeLogExporter":
     """
     Create an instance of DatabricksVolumeLogExporter.
 
     This function will only work on Databricks. It requires a volume to be mounted.
+    Extra keyword arguments (e.g. ``rolling=True``) are passed to the exporter.
     """
     if not log_dir:
         raise ValueError("log_dir must be provided")
     path = Path(log_dir)
     assert path.exists() & path.is_dir() & os.access(path, os.W_OK)
-    return DatabricksVolumeLogExporter(log_dir, formatter)
+    return DatabricksVolumeLogExporter(log_dir, formatter, **kwargs)
 
 
 class DatabricksVolumeLogExporter(LogExporter):
-    def __init__(self, log_dir: str, formatter: Callable[[LogRecord], str], disable_file_check: bool = False):
+    """
+    Implementation of :class:`LogExporter` that writes log records to files in a
+    Databricks Volume.
+
+    By default every batch goes to its own ``{uuid7()}.json`` file. With
+    ``rolling=True`` batches are appended to a long-lived file that is rolled
+    over once it reaches ``max_file_bytes``, ``max_file_records`` or
+    ``max_file_age_seconds``, and finalized on ``force_flush()``/``shutdown()``.
+
+    ``compression`` (``"gzip"`` or ``"zstd"``) streams records through a
+    compressor, producing ``.json.gz``/``.json.zst`` files that
+    ``spark.read.json`` reads natively.
+
+    Without a ``formatter`` each batch is encoded straight into one compact
+    JSON lines buffer (see :mod:`databricks_opentelemetry_exporter.util.encoding`).
+    A custom ``formatter`` is called once per record instead.
+
+    ``output_format="otlp"`` writes length-delimited OTLP protobuf
+    ``.binpb`` files instead of JSON (see
+    :mod:`databricks_opentelemetry_exporter.formats.otlp`).
+    ``output_format="parquet"`` buffers records into Parquet row groups with
+    a fixed schema; files are always rolled and ``compression`` selects the
+    Parquet codec (requires ``pyarrow``).
+
+    ``resource_mode="header"`` writes the resource once per file in a header
+    line instead of embedding it in every JSON record; use
+    :func:`databricks_opentelemetry_exporter.reader.read_json_records` to
+    re-join it on read.
+
+    With ``async_write=True`` ``export()`` only queues the batch and returns;
+    a writer thread encodes and writes queued batches (see
+    :class:`~databricks_opentelemetry_exporter.util.async_writer.AsyncBatchWriter`
+    for ``max_queue_size`` and ``queue_full_policy``). ``force_flush()`` and
+    ``shutdown()`` drain the queue.
+
+    ``durability`` (a mode name or a shared
+    :class:`~databricks_opentelemetry_exporter.util.durability.DurabilityPolicy`)
+    controls fsync: by default each per-batch file is fsynced before it is
+    closed, and rolled files are fsynced once when finalized.
+
+    ``partition_by`` writes files into Hive-style partition directories such
+    as ``signal=logs/date=YYYY-MM-DD/hour=HH/host=<host>/`` under ``log_dir``
+    (see :mod:`databricks_opentelemetry_exporter.util.partitioning`), based on
+    each record's timestamp.
+
+    With ``index=True`` every finished file gets an index sidecar with its
+    time range, severity counts, attribute keys and a trace id bloom filter;
+    :func:`databricks_opentelemetry_exporter.util.index.find_files` uses them
+    to skip files that can't match a lookup.
+
+    ``spool`` (``True``, a socket path or a
+    :class:`~databricks_opentelemetry_exporter.spool.SpoolClient`) sends
+    batches to the node's spool server, which writes the batches of all
+    processes on the node to shared rolled files. Batches are written
+    directly, as configured, whenever the spool is unavailable. Spooling
+    doesn't support Parquet output or ``index``.
+
+    ``wal`` (``True``, a local directory or a
+    :class:`~databricks_opentelemetry_exporter.util.wal.WriteAheadQueue`)
+    queues batches on local disk when writing them to the volume fails, and
+    retries them in the background, instead of failing the export. Retried
+    batches get a file of their own, without an index sidecar. Parquet
+    output doesn't support ``wal``.
+
+    The exporter records its latency, throughput, failures and queue sizes
+    with the meter of ``meter_provider``, by default the global one (see
+    :mod:`databricks_opentelemetry_exporter.util.telemetry`).
+    """
+
+    def __init__(
+        self,
+        log_dir: str,
+        formatter: Callable[[LogRecord], str] = None,
+        disable_file_check: bool = False,
+        rolling: bool = False,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_file_age_seconds: float = 300.0,
+        max_file_records: int = None,
+        compression: str = None,
+        compression_level: int = None,
+        output_format: str = "json",
+        resource_mode: str = "inline",
+        async_write: bool = False,
+        max_queue_size: int = 64,
+        queue_full_policy: str = "block",
+        durability=None,
+        partition_by=None,
+        index: bool = False,
+        spool=None,
+        wal=None,
+        meter_provider=None,
+    ):
+        check_resource_mode(resource_mode, output_format, formatter)
+        if spool and (output_format == "parquet" or index):
+            raise ValueError("spool doesn't support Parquet output or index")
+        if wal and output_format == "parquet":
+            raise ValueError("wal doesn't support Parquet output")
         self.log_dir = log_dir
         self.formatter = formatter
-        self._lock = threading.Lock()
-        # Remove unused self.file attribute
-        # _dir_checked can be removed since we check on init
-        
+        self.compression = compression
+        self.compression_level = compression_level
+        self.output_format = output_format
+        self.resource_mode = resource_mode
+        self.index = index
+        if durability is None:
+            durability = "on-roll" if rolling or output_format == "parquet" else "per-batch"
+        self.durability = DurabilityPolicy.of(durability)
+        self._spool = SpoolClient.of(spool)
+        self._wal = WriteAheadQueue.of(wal, durability=self.durability)
+        self._telemetry = ExporterTelemetry("logs", meter_provider)
+        if self._wal is not None:
+            wal_queue = self._wal
+            self._telemetry.observe_queue(
+                "wal", wal_queue, wal_queue.__len__, lambda: wal_queue.evicted
+            )
+        self._writer = None
+        make_writer = None
+        if output_format == "parquet":
+            from databricks_opentelemetry_exporter.formats import parquet
+
+            self.suffix = check_output_format(output_format)
+            self._columns = parquet.log_columns
+
+            def make_writer(directory):
+                return parquet.ParquetFileWriter(
+                    directory,
+                    parquet.LOG_SCHEMA,
+                    compression=compression or "zstd",
+                    max_bytes=max_file_bytes,
+                    max_age_seconds=max_file_age_seconds,
+                    max_records=max_file_records,
+                    durability=self.durability,
+                    index=index,
+                    on_publish=self._telemetry.published,
+                )
+        else:
+            self.suffix = check_output_format(output_format) + check_compression(compression)
+            if rolling:
+
+                def make_writer(directory):
+                    return RollingFileWriter(
+                        directory,
+                        suffix=self.suffix,
+                        max_bytes=max_file_bytes,
+                        max_age_seconds=max_file_age_seconds,
+                        max_records=max_file_records,
+                        compression=compression,
+                        compression_level=compression_level,
+                        durability=self.durability,
+                        index=index,
+                        on_publish=self._telemetry.published,
+                    )
+        self._partitioner = None
+        if partition_by:
+            self._partitioner = Partitioner(log_dir, "logs", partition_by)
+        if make_writer is not None:
+            if self._partitioner is not None:
+                self._writer = PartitionedWriter(make_writer)
+            else:
+                self._writer = make_writer(log_dir)
         # Check directory exists and is writable on init
         if not disable_file_check:
             if not os.path.exists(self.log_dir):
@@ -50,41 +225,295 @@ class DatabricksVolumeLogExporter(LogExporter):
             elif not os.access(self.log_dir, os.W_OK):
                 raise PermissionError(f"No write permission for directory: {self.log_dir}")
 
-    def _write_logs_to_file(self, filepath: str, batch: Sequence[LogData]):
-        # Use 'x' mode to ensure we don't overwrite existing files
+        self._async_writer = None
+        if async_write:
+            self._async_writer = AsyncBatchWriter(
+                self._export_batch,
+                max_queue_size=max_queue_size,
+                queue_full_policy=queue_full_policy,
+                name="DatabricksVolumeLogWriter",
+            )
+            writer = self._async_writer
+            self._telemetry.observe_queue(
+                "async",
+                writer,
+                lambda: writer.queue_depth,
+                lambda: writer.dropped_batches,
+            )
+
+    def _format_batch(self, batch: Sequence[LogData]) -> bytes:
+        if self.output_format == "otlp":
+            return otlp.encode_log_batch(batch)
+        if self.formatter is None:
+            return encode_log_batch(batch)
+        lines = []
+        for data in batch:
+            try:
+                lines.append(self.formatter(data.log_record))
+            except Exception as e:
+                # Log formatting errors shouldn't fail the whole batch
+                import logging
+                logging.error(f"Error formatting log record: {str(e)}")
+        return "".join(lines).encode("utf-8")
+
+    def _encode_batch(self, batch: Sequence[LogData], encoded: bytes = None):
+        """
+        Return ``(header, data, records)`` chunks to write in order.
+        ``encoded`` is the batch already encoded, see :meth:`export_encoded`.
+        """
+        if encoded is not None:
+            return [(None, encoded, batch)]
+        if self.resource_mode == "header":
+            return [
+                (
+                    encode_resource_header(resource),
+                    encode_log_batch(group, include_resource=False),
+                    group,
+                )
+                for resource, group in group_by_resource(
+                    batch, lambda data: data.log_record.resource
+                )
+            ]
+        return [(None, self._format_batch(batch), batch)]
+
+    def _write_logs_to_file(
+        self, filepath: str, batch: Sequence[LogData], encoded: bytes = None
+    ) -> str:
+        """Write ``batch`` to a new file at ``filepath``, returning the path used."""
+        start = time.perf_counter()
+        payload = self._payload(batch, encoded)
+        start = self._telemetry.phase("serialize", start)
+        while True:
+            # Use 'x' mode to ensure we don't overwrite existing files
+            try:
+                with open_compressed(
+                    filepath, self.compression, self.compression_level
+                ) as file:
+                    file.write(payload)
+                    start = self._telemetry.phase("write", start)
+                    self.durability.commit(file, len(payload))
+                    self._telemetry.phase("fsync", start)
+                break
+            except FileExistsError:
+                # Generate new filename if collision occurs
+                self._telemetry.collided()
+                filepath = os.path.join(
+                    os.path.dirname(filepath), f"{uuid7()}{self.suffix}"
+                )
+            except Exception:
+                # Don't leave a partial file behind
+                try:
+                    os.unlink(filepath)
+                except OSError:
+                    pass
+                raise
+        self._telemetry.written(len(batch), len(payload))
+        self._telemetry.published()
+        return filepath
+
+    def _partitions(self, batch: Sequence[LogData]):
+        if self._partitioner is None:
+            return [(self.log_dir, batch)]
+        return self._partitioner.split(
+            batch,
+            lambda data: data.log_record.timestamp or data.log_record.observed_timestamp,
+        )
+
+    def _writer_for(self, directory: str):
+        if self._partitioner is None:
+            return self._writer
+        return self._writer.get(directory)
+
+    def _payload(self, batch: Sequence[LogData], encoded: bytes = None) -> bytes:
+        return b"".join(
+            (header or b"") + data
+            for header, data, _ in self._encode_batch(batch, encoded)
+        )
+
+    def _spool_write(
+        self, directory: str, batch: Sequence[LogData], encoded: bytes = None
+    ) -> bool:
+        if not self._spool.available():
+            return False
+        start = time.perf_counter()
+        payload = self._payload(batch, encoded)
+        start = self._telemetry.phase("serialize", start)
+        if not self._spool.send(
+            directory,
+            self.output_format,
+            self.compression,
+            self.compression_level,
+            payload,
+            len(batch),
+        ):
+            return False
+        self._telemetry.phase("write", start)
+        self._telemetry.written(len(batch), len(payload))
+        return True
+
+    def _write_group(
+        self, directory: str, group: Sequence[LogData], encoded: bytes = None
+    ) -> None:
+        if self.output_format == "parquet":
+            start = time.perf_counter()
+            columns = self._columns(group)
+            start = self._telemetry.phase("serialize", start)
+            self._writer_for(directory).write_rows(
+                columns,
+                len(group),
+                update_index=lambda index: index.add_logs(group),
+            )
+            self._telemetry.phase("write", start)
+            self._telemetry.written(len(group))
+        elif self._writer is not None:
+            writer = self._writer_for(directory)
+            start = time.perf_counter()
+            chunks = self._encode_batch(group, encoded)
+            start = self._telemetry.phase("serialize", start)
+            for i, (header, data, records) in enumerate(chunks):
+                try:
+                    writer.write(
+                        data,
+                        len(records),
+                        header=header,
+                        update_index=lambda index, records=records: index.add_logs(
+                            records
+                        ),
+                    )
+                except Exception as e:
+                    if self._wal is None:
+                        raise
+                    # The writer cut this chunk out of its file and the earlier
+                    # ones are written, so only the rest is retried
+                    rest = chunks[i:]
+                    self._queue(
+                        directory,
+                        b"".join((header or b"") + data for header, data, _ in rest),
+                        sum(len(records) for _, _, records in rest),
+                        e,
+                    )
+                    return
+            self._telemetry.phase("write", start)
+            self._telemetry.written(
+                len(group), sum(len(header or b"") + len(data) for header, data, _ in chunks)
+            )
+        else:
+            # Names are unique and files are created with O_EXCL, so concurrent
+            # exports write (and fsync) their files in parallel
+            filepath = os.path.join(directory, f"{uuid7()}{self.suffix}")
+            filepath = self._write_logs_to_file(filepath, group, encoded)
+            if self.index:
+                index = FileIndex()
+                index.add_logs(group)
+                write_index(filepath, index)
+
+    def _write_batch(self, batch: Sequence[LogData], encoded: bytes = None) -> None:
+        for directory, group in self._partitions(batch):
+            if self._spool is not None and self._spool_write(directory, group, encoded):
+                continue
+            try:
+                self._write_group(directory, group, encoded)
+            except Exception as e:
+                if self._wal is None:
+                    raise
+                self._queue(directory, self._payload(group, encoded), len(group), e)
+
+    def _queue(self, directory: str, payload: bytes, records: int, error) -> None:
+        self._wal.put(
+            directory,
+            f"{uuid7()}{self.suffix}",
+            payload,
+            self.compression,
+            self.compression_level,
+        )
+        import logging
+        logging.warning(f"Queued {records} log records for retry: {str(error)}")
+
+    def _export_batch(self, batch: Sequence[LogData], encoded: bytes = None) -> None:
+        start = time.perf_counter()
         try:
-            with open(filepath, "x") as file:
-                for data in batch:
-                    try:
-                        file.write(self.formatter(data.log_record))
-                    except Exception as e:
-                        # Log formatting errors shouldn't fail the whole batch
-                        print(f"Error formatting log record: {str(e)}")
-                file.flush()
-                os.fsync(file.fileno())  # Ensure data is written to disk
-        except FileExistsError:
-            # Generate new filename if collision occurs
-            new_filepath = os.path.join(self.log_dir, f"{uuid7()}.json")
-            self._write_logs_to_file(new_filepath, batch)
+            self._write_batch(batch, encoded)
+        except Exception:
+            self._telemetry.failed()
+            self._telemetry.exported(start, ok=False)
+            raise
+        self._telemetry.exported(start)
 
     def export(self, batch: Sequence[LogData]) -> LogExportResult:
         if not batch:  # Don't create empty files
             return LogExportResult.SUCCESS
-            
-        try:
-            with self._lock:  # Lock during file creation to prevent race conditions
-                filename = f"{uuid7()}.json"
-                filepath = os.path.join(self.log_dir, filename)
-                self._write_logs_to_file(filepath, batch)
 
+        if self._async_writer is not None:
+            if self._async_writer.submit(batch):
+                return LogExportResult.SUCCESS
+            import logging
+            logging.warning(f"Log write queue full, dropped {len(batch)} records")
+            return LogExportResult.FAILURE
+        return self._export_sync(batch)
+
+    def _export_sync(
+        self, batch: Sequence[LogData], encoded: bytes = None
+    ) -> LogExportResult:
+        try:
+            self._export_batch(batch, encoded)
             return LogExportResult.SUCCESS
         except Exception as e:
-            # Use proper logging instead of print
             import logging
             logging.error(f"Error exporting logs: {str(e)}")
             return LogExportResult.FAILURE
 
+    @property
+    def encoding(self) -> str:
+        """
+        The shared encoding (``"json"`` or ``"otlp"``, see
+        :mod:`databricks_opentelemetry_exporter.fanout`) that
+        :meth:`export_encoded` accepts, or None if batches have to be encoded
+        by the exporter itself.
+        """
+        if (
+            self._partitioner is not None
+            or self._async_writer is not None
+            or self.formatter is not None
+            or self.resource_mode != "inline"
+        ):
+            return None
+        if self.output_format in ("json", "otlp"):
+            return self.output_format
+        return None
+
+    def export_encoded(
+        self, batch: Sequence[LogData], payload: bytes
+    ) -> LogExportResult:
+        """Export ``batch``, already encoded as ``payload`` in :attr:`encoding`."""
+        if self.encoding is None:
+            raise ValueError("This exporter doesn't accept encoded batches")
+        if not batch:
+            return LogExportResult.SUCCESS
+        if self.output_format == "otlp":
+            payload = otlp.frame(payload)
+        return self._export_sync(batch, payload)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        if self._async_writer is not None:
+            if not self._async_writer.flush(timeout_millis):
+                return False
+        if self._writer is not None:
+            try:
+                self._writer.flush()
+            except Exception as e:
+                import logging
+                logging.error(f"Error flushing logs: {str(e)}")
+                return False
+        if self._wal is not None:
+            return self._wal.drain()
+        return True
+
     def shutdown(self):
-        # Implement proper shutdown
-        # Could add cleanup of old log files here if needed
-        pass
\ No newline at end of file
+        if self._async_writer is not None:
+            self._async_writer.shutdown()
+        if self._writer is not None:
+            self._writer.close()
+        if self._spool is not None:
+            self._spool.close()
+        if self._wal is not None:
+            self._wal.shutdown()
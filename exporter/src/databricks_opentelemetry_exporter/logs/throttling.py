@@ -0,0 +1,267 @@
+"""
+Rate limiting and repeated-message suppression in front of a log exporter.
+
+A loop in a Spark job can log the same line millions of times.
+:class:`ThrottlingLogRecordProcessor` sits between the ``LoggerProvider``
+and the processor that exports records, e.g. a ``BatchLogRecordProcessor``
+of a
+:class:`~databricks_opentelemetry_exporter.logs.export.DatabricksVolumeLogExporter`,
+and does two things:
+
+* **Repeat suppression.** Records of one template (logger, severity, call
+  site and body with numbers and ids masked) within ``repeat_window_millis``
+  of the first are collapsed. The first record passes; the rest are
+  counted and, when the window ends, reported as one record: the last
+  suppressed record with ``databricks.log.repeat_count`` and
+  ``databricks.log.repeat_first_timestamp`` and
+  ``databricks.log.repeat_last_timestamp`` (in ns) attributes.
+* **Rate limiting.** A token bucket per logger and severity lets through
+  ``rate_per_second`` records with bursts of up to ``burst``.
+  ``severity_rates`` overrides the rate per severity, e.g.
+  ``{SeverityNumber.ERROR: 1000}``. The first record admitted after
+  records were dropped carries their number in
+  ``databricks.log.rate_limited_count``.
+
+State is bounded: at most ``max_keys`` templates and as many buckets are
+tracked, least recently used first out.
+"""
+import collections
+import logging
+import re
+import threading
+import time
+from typing import Dict
+
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord, LogRecordProcessor
+
+_logger = logging.getLogger(__name__)
+
+REPEAT_COUNT = "databricks.log.repeat_count"
+REPEAT_FIRST_TIMESTAMP = "databricks.log.repeat_first_timestamp"
+REPEAT_LAST_TIMESTAMP = "databricks.log.repeat_last_timestamp"
+RATE_LIMITED_COUNT = "databricks.log.rate_limited_count"
+
+# Parts of a message that vary between records of one template
+_VARIABLE = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|0x[0-9a-fA-F]+"
+    r"|\d+"
+)
+
+
+def template(body) -> str:
+    """``body`` with numbers, hex values and UUIDs replaced by ``<*>``."""
+    return _VARIABLE.sub("<*>", str(body))
+
+
+def _severity_range(severity) -> int:
+    """The first severity of the range (e.g. ``ERROR`` for ``ERROR3``)."""
+    number = int(severity.value if isinstance(severity, SeverityNumber) else severity)
+    return (number - 1) // 4 * 4 + 1 if number > 0 else 0
+
+
+def _timestamp(record: LogRecord) -> int:
+    return record.timestamp or record.observed_timestamp or time.time_ns()
+
+
+def _with_attributes(log_data: LogData, attributes: dict) -> LogData:
+    record = log_data.log_record
+    return LogData(
+        LogRecord(
+            timestamp=record.timestamp,
+            observed_timestamp=record.observed_timestamp,
+            trace_id=record.trace_id,
+            span_id=record.span_id,
+            trace_flags=record.trace_flags,
+            severity_text=record.severity_text,
+            severity_number=record.severity_number,
+            body=record.body,
+            resource=record.resource,
+            attributes={**(record.attributes or {}), **attributes},
+        ),
+        log_data.instrumentation_scope,
+    )
+
+
+class _Burst:
+    __slots__ = ("started", "count", "first", "last", "log_data")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.log_data = None
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "dropped")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.dropped = 0
+
+
+class ThrottlingLogRecordProcessor(LogRecordProcessor):
+    """
+    :class:`LogRecordProcessor` that suppresses repeated records and rate
+    limits the rest before passing them to ``processor``.
+
+    ``rate_per_second=None`` disables rate limiting and
+    ``repeat_window_millis=None`` disables repeat suppression. Totals are
+    kept in ``suppressed`` and ``rate_limited``.
+    """
+
+    def __init__(
+        self,
+        processor: LogRecordProcessor,
+        rate_per_second: float = 100.0,
+        burst: float = None,
+        severity_rates: Dict[SeverityNumber, float] = None,
+        repeat_window_millis: float = 10_000,
+        max_keys: int = 10_000,
+    ):
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+        self.processor = processor
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.severity_rates = {
+            _severity_range(severity): rate
+            for severity, rate in (severity_rates or {}).items()
+        }
+        self.repeat_window_millis = repeat_window_millis
+        self.max_keys = max_keys
+
+        self._lock = threading.Lock()
+        # template key -> _Burst, least recently started first
+        self._bursts = collections.OrderedDict()
+        # (logger, severity range) -> _Bucket, least recently used first
+        self._buckets = collections.OrderedDict()
+
+        self.suppressed = 0
+        self.rate_limited = 0
+
+        self._shutdown_event = threading.Event()
+        self._thread = None
+        if repeat_window_millis:
+            self._thread = threading.Thread(
+                target=self._run, name="ThrottlingLogRecordProcessor", daemon=True
+            )
+            self._thread.start()
+
+    def _rate(self, severity: int) -> float:
+        return self.severity_rates.get(severity, self.rate_per_second)
+
+    def _admit(self, log_data: LogData, now: float):
+        """``log_data`` if its bucket has a token, else None. Called with _lock held."""
+        record = log_data.log_record
+        severity = _severity_range(record.severity_number or 0)
+        rate = self._rate(severity)
+        if rate is None:
+            return log_data
+        capacity = self.burst if self.burst is not None else max(rate, 1.0)
+        key = (log_data.instrumentation_scope.name, severity)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(capacity, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        if bucket.tokens < 1:
+            bucket.dropped += 1
+            self.rate_limited += 1
+            return None
+        bucket.tokens -= 1
+        if bucket.dropped:
+            log_data = _with_attributes(log_data, {RATE_LIMITED_COUNT: bucket.dropped})
+            bucket.dropped = 0
+        return log_data
+
+    def _end_burst(self, key) -> LogData:
+        """The summary of the burst of ``key``, if any. Called with _lock held."""
+        burst = self._bursts.pop(key)
+        if not burst.count:
+            return None
+        return _with_attributes(
+            burst.log_data,
+            {
+                REPEAT_COUNT: burst.count,
+                REPEAT_FIRST_TIMESTAMP: burst.first,
+                REPEAT_LAST_TIMESTAMP: burst.last,
+            },
+        )
+
+    def emit(self, log_data: LogData) -> None:
+        record = log_data.log_record
+        now = time.monotonic()
+        pending = []
+        with self._lock:
+            if self.repeat_window_millis:
+                attributes = record.attributes or {}
+                key = (
+                    log_data.instrumentation_scope.name,
+                    record.severity_number,
+                    attributes.get("code.filepath"),
+                    attributes.get("code.lineno"),
+                    template(record.body),
+                )
+                burst = self._bursts.get(key)
+                if burst is not None and (
+                    now - burst.started < self.repeat_window_millis / 1000
+                ):
+                    timestamp = _timestamp(record)
+                    if burst.first is None:
+                        burst.first = timestamp
+                    burst.last = timestamp
+                    burst.count += 1
+                    burst.log_data = log_data
+                    self.suppressed += 1
+                    return
+                if burst is not None:
+                    pending.append(self._end_burst(key))
+                self._bursts[key] = _Burst(now)
+                while len(self._bursts) > self.max_keys:
+                    pending.append(self._end_burst(next(iter(self._bursts))))
+            pending.append(self._admit(log_data, now))
+        self._forward(pending)
+
+    def _forward(self, records) -> None:
+        for log_data in records:
+            if log_data is None:
+                continue
+            try:
+                self.processor.emit(log_data)
+            except Exception as e:
+                _logger.error(f"Error forwarding log record: {str(e)}")
+
+    def _end_bursts(self, older_than: float = None):
+        with self._lock:
+            ended = []
+            for key, burst in list(self._bursts.items()):
+                if older_than is not None and burst.started > older_than:
+                    break
+                ended.append(self._end_burst(key))
+        self._forward(ended)
+
+    def _run(self) -> None:
+        window = self.repeat_window_millis / 1000
+        while not self._shutdown_event.wait(window / 2):
+            self._end_bursts(time.monotonic() - window)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Report every suppressed burst now and flush ``processor``."""
+        self._end_bursts()
+        return self.processor.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self._shutdown_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._end_bursts()
+        self.processor.shutdown()
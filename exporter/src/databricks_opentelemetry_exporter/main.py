@@ -1,43 +1,443 @@
-from databricks_opentelemetry_exporter.logs.export import create_databricks_volume_log_exporter
+"""
+One-call setup of the Databricks volume exporters.
 
-import logging
+Spark Python workers are short-lived, so importing this module is kept
+cheap: the OpenTelemetry SDK, the exporters and the resource detector are
+only imported by :func:`init_logging` and :func:`init_telemetry`, and only
+for the signals and formats they set up.
+"""
 import os
-from pathlib import Path
 
-from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
-from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+# The service.namespace and service.name every resource starts from
+DEFAULT_SERVICE_NAMESPACE = "acmecorp"
+DEFAULT_SERVICE_NAME = "databricks"
 
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.semconv.resource import ResourceAttributes
+SIGNALS = ("logs", "traces", "metrics")
 
-def init_logging(export_path: str) -> LoggingHandler:
+# Output formats each signal's exporter writes
+SIGNAL_OUTPUT_FORMATS = {
+    "logs": ("json", "otlp", "parquet"),
+    "traces": ("json", "otlp", "parquet"),
+    "metrics": ("json", "otlp"),
+}
+
+# Prefix of the environment variables read by TelemetryConfig.from_env
+ENV_PREFIX = "DATABRICKS_OTEL_"
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def _resource(service_namespace: str, service_name: str, detect_resource: bool):
+    from opentelemetry.sdk.resources import Resource, get_aggregated_resources
+
+    resource = Resource(
+        attributes={
+            "service.namespace": service_namespace,
+            "service.name": service_name,
+        }
+    )
+    if detect_resource:
+        from databricks_opentelemetry_exporter.resource.detector import (
+            DatabricksResourceDetector,
+        )
+
+        resource = get_aggregated_resources(
+            [DatabricksResourceDetector()], initial_resource=resource
+        )
+    return resource
+
+
+def _exporter_class(signal: str):
+    """The exporter class of ``signal``, imported on first use."""
+    if signal == "logs":
+        from databricks_opentelemetry_exporter.logs.export import (
+            DatabricksVolumeLogExporter,
+        )
+
+        return DatabricksVolumeLogExporter
+    if signal == "traces":
+        from databricks_opentelemetry_exporter.traces.export import (
+            DatabricksVolumeTraceExporter,
+        )
+
+        return DatabricksVolumeTraceExporter
+    from databricks_opentelemetry_exporter.metrics.export import (
+        DatabricksVolumeMetricsExporter,
+    )
+
+    return DatabricksVolumeMetricsExporter
+
+
+def _exporter_parameters(exporter_class) -> list:
+    """The keyword arguments ``exporter_class`` accepts besides its directory."""
+    import inspect
+
+    return list(inspect.signature(exporter_class).parameters)[1:]
+
+
+def _log_processor(exporter, throttling: dict = None):
+    from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+
+    processor = BatchLogRecordProcessor(exporter)
+    if throttling is not None:
+        from databricks_opentelemetry_exporter.logs.throttling import (
+            ThrottlingLogRecordProcessor,
+        )
+
+        processor = ThrottlingLogRecordProcessor(processor, **throttling)
+    return processor
+
+
+def init_logging(
+    export_path: str,
+    output_format: str = "json",
+    detect_resource: bool = True,
+    throttling: dict = None,
+    **kwargs,
+) -> "LoggingHandler":
     """Initialize OpenTelemetry logging with Databricks exporter.
-    
+
     Args:
         path: Path to the log directory where logs will be written
-        
+        output_format: "json", "otlp" or "parquet"
+        detect_resource: Merge host, OS, cloud and runtime attributes from
+            DatabricksResourceDetector into the resource
+        throttling: Options for ThrottlingLogRecordProcessor, e.g.
+            {"rate_per_second": 50}, to rate limit and collapse repeated logs
+        **kwargs: Extra options for DatabricksVolumeLogExporter, e.g. rolling=True
+
     Returns:
         LoggingHandler that can be added to Python loggers
     """
+    import logging
+    from pathlib import Path
+
+    from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
+
+    from databricks_opentelemetry_exporter.logs.export import (
+        create_databricks_volume_log_exporter,
+    )
 
     path = Path(export_path)
 
     assert path.exists() & path.is_dir() & os.access(path, os.W_OK)
 
     # build the Resource -> LoggerProvider -> LogExporter -> LoggingHandler
-    resource = Resource(
-        attributes={
-            ResourceAttributes.SERVICE_NAMESPACE: "acmecorp", 
-            ResourceAttributes.SERVICE_NAME: "databricks",
-        }
+    resource = _resource(
+        DEFAULT_SERVICE_NAMESPACE, DEFAULT_SERVICE_NAME, detect_resource
     )
     logger_provider = LoggerProvider(resource=resource)
-    exporter = create_databricks_volume_log_exporter(log_dir=path)
-    logger_provider.add_log_record_processor(BatchLogRecordProcessor(exporter))
+    exporter = create_databricks_volume_log_exporter(
+        log_dir=path, output_format=output_format, **kwargs
+    )
+    logger_provider.add_log_record_processor(_log_processor(exporter, throttling))
     handler =  LoggingHandler(logger_provider=logger_provider)
 
     # Add the handler to the root logger
-    logging.getLogger().addHandler(handler) 
+    logging.getLogger().addHandler(handler)
 
     # return handler
     return handler
+
+
+def _parse_bool(name: str, value: str) -> bool:
+    if value.lower() in _TRUE:
+        return True
+    if value.lower() in _FALSE:
+        return False
+    raise ValueError(f"Unsupported {name}: {value!r}, expected true or false")
+
+
+class TelemetryConfig:
+    """
+    What :func:`init_telemetry` sets up.
+
+    Each signal in ``signals`` is exported to ``{signal}_path``, by default
+    the ``logs``, ``traces`` or ``metrics`` directory under ``export_path``
+    (created if missing). ``output_format`` applies to every signal whose
+    exporter supports it; metrics fall back to ``"json"`` for
+    ``"parquet"``. ``exporter_options`` are passed to every exporter that
+    accepts them, e.g. ``{"compression": "zstd"}`` to all of them and
+    ``{"rolling": True}`` to the log exporter only. Options that none of
+    the exporters of ``signals`` accept raise ``ValueError``.
+    ``signal_options`` adds or overrides options per signal, e.g.
+    ``{"metrics": {"output_format": "otlp", "change_only": True}}``.
+    Metrics are collected every
+    ``metrics_interval_millis``. ``log_throttling`` enables
+    :class:`~databricks_opentelemetry_exporter.logs.throttling.ThrottlingLogRecordProcessor`
+    with these options, e.g. ``{"rate_per_second": 50}``.
+
+    With ``set_global`` the providers become the global OpenTelemetry
+    providers, and with ``logging_handler`` a ``LoggingHandler`` is added to
+    the root logger.
+    """
+
+    def __init__(
+        self,
+        export_path: str = None,
+        signals=SIGNALS,
+        logs_path: str = None,
+        traces_path: str = None,
+        metrics_path: str = None,
+        output_format: str = "json",
+        service_name: str = DEFAULT_SERVICE_NAME,
+        service_namespace: str = DEFAULT_SERVICE_NAMESPACE,
+        detect_resource: bool = True,
+        metrics_interval_millis: float = 60_000,
+        logging_handler: bool = True,
+        set_global: bool = True,
+        exporter_options: dict = None,
+        log_throttling: dict = None,
+        signal_options: dict = None,
+    ):
+        from databricks_opentelemetry_exporter.formats import check_output_format
+
+        for signal in signals:
+            if signal not in SIGNALS:
+                raise ValueError(
+                    f"Unsupported signal: {signal!r}, expected one of {list(SIGNALS)}"
+                )
+        check_output_format(output_format)
+        signal_options = {
+            signal: dict(options) for signal, options in (signal_options or {}).items()
+        }
+        for signal, options in signal_options.items():
+            if signal not in SIGNALS:
+                raise ValueError(
+                    f"Unsupported signal: {signal!r}, expected one of {list(SIGNALS)}"
+                )
+            if "output_format" in options:
+                formats = SIGNAL_OUTPUT_FORMATS[signal]
+                if options["output_format"] not in formats:
+                    raise ValueError(
+                        f"Unsupported {signal} output_format: "
+                        f"{options['output_format']!r}, expected one of {list(formats)}"
+                    )
+        if exporter_options:
+            accepted = []
+            for signal in signals:
+                accepted.extend(
+                    name
+                    for name in _exporter_parameters(_exporter_class(signal))
+                    if name not in accepted
+                )
+            for name in exporter_options:
+                if name not in accepted:
+                    raise ValueError(
+                        f"Unsupported exporter option: {name!r}, "
+                        f"expected one of {accepted}"
+                    )
+        paths = {"logs": logs_path, "traces": traces_path, "metrics": metrics_path}
+        for signal in signals:
+            if not (paths[signal] or export_path):
+                raise ValueError(f"export_path or {signal}_path must be provided")
+        self.export_path = export_path
+        self.signals = tuple(signals)
+        self.logs_path = logs_path
+        self.traces_path = traces_path
+        self.metrics_path = metrics_path
+        self.output_format = output_format
+        self.service_name = service_name
+        self.service_namespace = service_namespace
+        self.detect_resource = detect_resource
+        self.metrics_interval_millis = metrics_interval_millis
+        self.logging_handler = logging_handler
+        self.set_global = set_global
+        self.exporter_options = dict(exporter_options or {})
+        self.log_throttling = log_throttling
+        self.signal_options = signal_options
+
+    def path(self, signal: str) -> str:
+        """The directory ``signal`` is exported to."""
+        path = getattr(self, f"{signal}_path")
+        return path or os.path.join(self.export_path, signal)
+
+    def options(self, signal: str, exporter_class) -> dict:
+        """The keyword arguments of ``signal``'s ``exporter_class``."""
+        accepted = _exporter_parameters(exporter_class)
+        options = {
+            name: value
+            for name, value in self.exporter_options.items()
+            if name in accepted
+        }
+        output_format = self.output_format
+        if output_format not in SIGNAL_OUTPUT_FORMATS[signal]:
+            output_format = "json"
+        options["output_format"] = output_format
+        options.update(self.signal_options.get(signal, {}))
+        return options
+
+    @classmethod
+    def from_env(cls, environ=None, **kwargs) -> "TelemetryConfig":
+        """
+        A config read from environment variables, overridden by ``kwargs``:
+
+        * ``DATABRICKS_OTEL_EXPORT_PATH``, ``DATABRICKS_OTEL_LOGS_PATH``,
+          ``DATABRICKS_OTEL_TRACES_PATH`` and ``DATABRICKS_OTEL_METRICS_PATH``
+        * ``DATABRICKS_OTEL_SIGNALS``: comma separated, e.g. ``logs,traces``
+        * ``DATABRICKS_OTEL_OUTPUT_FORMAT`` and ``DATABRICKS_OTEL_COMPRESSION``
+        * ``OTEL_SERVICE_NAME`` and ``DATABRICKS_OTEL_SERVICE_NAMESPACE``
+        * ``DATABRICKS_OTEL_DETECT_RESOURCE``: ``true`` or ``false``
+        * ``DATABRICKS_OTEL_METRICS_INTERVAL_MILLIS``
+        * ``DATABRICKS_OTEL_LOG_RATE_PER_SECOND``: enables log throttling
+        """
+        environ = os.environ if environ is None else environ
+
+        def get(name):
+            return environ.get(ENV_PREFIX + name) or None
+
+        config = {}
+        for name in ("export_path", "logs_path", "traces_path", "metrics_path",
+                     "output_format", "service_namespace"):
+            if value := get(name.upper()):
+                config[name] = value
+        if value := environ.get("OTEL_SERVICE_NAME"):
+            config["service_name"] = value
+        if value := get("SIGNALS"):
+            config["signals"] = [s.strip() for s in value.split(",") if s.strip()]
+        if value := get("DETECT_RESOURCE"):
+            config["detect_resource"] = _parse_bool(ENV_PREFIX + "DETECT_RESOURCE", value)
+        if value := get("METRICS_INTERVAL_MILLIS"):
+            config["metrics_interval_millis"] = float(value)
+        if value := get("COMPRESSION"):
+            config["exporter_options"] = {"compression": value}
+        if value := get("LOG_RATE_PER_SECOND"):
+            config["log_throttling"] = {"rate_per_second": float(value)}
+        config.update(kwargs)
+        return cls(**config)
+
+
+class Telemetry:
+    """The providers set up by :func:`init_telemetry`, None for unused signals."""
+
+    def __init__(self, logger_provider=None, tracer_provider=None, meter_provider=None,
+                 handler=None):
+        self.logger_provider = logger_provider
+        self.tracer_provider = tracer_provider
+        self.meter_provider = meter_provider
+        self.handler = handler
+
+    def _providers(self):
+        return [
+            provider
+            for provider in (self.logger_provider, self.tracer_provider, self.meter_provider)
+            if provider is not None
+        ]
+
+    def force_flush(self, timeout_millis: int = 30_000) -> bool:
+        return all(
+            provider.force_flush(timeout_millis) is not False
+            for provider in self._providers()
+        )
+
+    def shutdown(self) -> None:
+        if self.handler is not None:
+            import logging
+
+            logging.getLogger().removeHandler(self.handler)
+        for provider in self._providers():
+            provider.shutdown()
+
+
+_telemetry = None
+
+
+def init_telemetry(config: TelemetryConfig = None, **kwargs) -> Telemetry:
+    """
+    Set up logs, traces and metrics with the Databricks volume exporters.
+
+    Without ``config`` it is read from the environment
+    (:meth:`TelemetryConfig.from_env`), overridden by ``kwargs``::
+
+        telemetry = init_telemetry(export_path="/Volumes/main/default/otel")
+
+    Only the exporters of the configured ``signals`` and formats are
+    imported. With ``set_global`` (the default) setup happens once per
+    process and later calls return the same :class:`Telemetry`.
+    """
+    global _telemetry
+
+    if config is None:
+        config = TelemetryConfig.from_env(**kwargs)
+    elif kwargs:
+        raise ValueError("Pass either a config or keyword arguments, not both")
+    if config.set_global and _telemetry is not None:
+        return _telemetry
+
+    for signal in config.signals:
+        os.makedirs(config.path(signal), exist_ok=True)
+    resource = _resource(
+        config.service_namespace, config.service_name, config.detect_resource
+    )
+    telemetry = Telemetry()
+
+    # First, so the other exporters' own metrics go to this provider
+    if "metrics" in config.signals:
+        from opentelemetry.sdk.metrics import MeterProvider
+
+        from databricks_opentelemetry_exporter.metrics.export import (
+            DatabricksVolumeMetricReader,
+            DatabricksVolumeMetricsExporter,
+        )
+
+        exporter = DatabricksVolumeMetricsExporter(
+            config.path("metrics"),
+            **config.options("metrics", DatabricksVolumeMetricsExporter),
+        )
+        reader = DatabricksVolumeMetricReader(
+            exporter, collect_interval_millis=config.metrics_interval_millis
+        )
+        telemetry.meter_provider = MeterProvider(
+            resource=resource, metric_readers=[reader]
+        )
+        if config.set_global:
+            from opentelemetry import metrics
+
+            metrics.set_meter_provider(telemetry.meter_provider)
+
+    if "traces" in config.signals:
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        from databricks_opentelemetry_exporter.traces.export import (
+            DatabricksVolumeTraceExporter,
+        )
+
+        options = config.options("traces", DatabricksVolumeTraceExporter)
+        options.setdefault("meter_provider", telemetry.meter_provider)
+        exporter = DatabricksVolumeTraceExporter(config.path("traces"), **options)
+        telemetry.tracer_provider = TracerProvider(resource=resource)
+        telemetry.tracer_provider.add_span_processor(BatchSpanProcessor(exporter))
+        if config.set_global:
+            from opentelemetry import trace
+
+            trace.set_tracer_provider(telemetry.tracer_provider)
+
+    if "logs" in config.signals:
+        from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
+
+        from databricks_opentelemetry_exporter.logs.export import (
+            DatabricksVolumeLogExporter,
+        )
+
+        options = config.options("logs", DatabricksVolumeLogExporter)
+        options.setdefault("meter_provider", telemetry.meter_provider)
+        exporter = DatabricksVolumeLogExporter(config.path("logs"), **options)
+        telemetry.logger_provider = LoggerProvider(resource=resource)
+        telemetry.logger_provider.add_log_record_processor(
+            _log_processor(exporter, config.log_throttling)
+        )
+        if config.set_global:
+            from opentelemetry import _logs
+
+            _logs.set_logger_provider(telemetry.logger_provider)
+        if config.logging_handler:
+            import logging
+
+            telemetry.handler = LoggingHandler(logger_provider=telemetry.logger_provider)
+            logging.getLogger().addHandler(telemetry.handler)
+
+    if config.set_global:
+        _telemetry = telemetry
+    return telemetry
@@ -0,0 +1,186 @@
+"""
+In-process pre-aggregation of ``MetricsData`` across collection cycles.
+
+:class:`MetricsAggregator` folds successive collections into one
+``MetricsData`` per export interval, keeping a single data point per series
+(resource, scope, instrument and attribute set):
+
+* cumulative sums, histograms and gauges keep the latest point, since it
+  already covers everything before it;
+* delta sums add up values; delta histograms add up counts, sums and buckets
+  and combine min/max, widening the point's time window.
+
+Delta histogram points that can't be merged (different bucket boundaries or
+exponential scale) are kept as separate points of the same series.
+"""
+import dataclasses
+from typing import Dict, Optional
+
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    Buckets,
+    ExponentialHistogramDataPoint,
+    Gauge,
+    HistogramDataPoint,
+    Metric,
+    MetricsData,
+    NumberDataPoint,
+    ResourceMetrics,
+    ScopeMetrics,
+)
+
+
+def _attributes_key(attributes) -> frozenset:
+    return frozenset(attributes.items()) if attributes else frozenset()
+
+
+def _merge_buckets(a: Buckets, b: Buckets) -> Buckets:
+    if not a.bucket_counts:
+        return b
+    if not b.bucket_counts:
+        return a
+    offset = min(a.offset, b.offset)
+    end = max(a.offset + len(a.bucket_counts), b.offset + len(b.bucket_counts))
+    counts = [0] * (end - offset)
+    for buckets in (a, b):
+        start = buckets.offset - offset
+        for i, count in enumerate(buckets.bucket_counts):
+            counts[start + i] += count
+    return Buckets(offset=offset, bucket_counts=counts)
+
+
+def merge_delta_points(previous, point):
+    """
+    Merge two consecutive delta points of one series, or return None if they
+    can't be combined.
+    """
+    if isinstance(point, NumberDataPoint):
+        return dataclasses.replace(
+            point,
+            start_time_unix_nano=previous.start_time_unix_nano,
+            value=previous.value + point.value,
+        )
+    if isinstance(point, HistogramDataPoint):
+        if list(previous.explicit_bounds) != list(point.explicit_bounds):
+            return None
+        return dataclasses.replace(
+            point,
+            start_time_unix_nano=previous.start_time_unix_nano,
+            count=previous.count + point.count,
+            sum=previous.sum + point.sum,
+            bucket_counts=[
+                a + b for a, b in zip(previous.bucket_counts, point.bucket_counts)
+            ],
+            min=min(previous.min, point.min),
+            max=max(previous.max, point.max),
+        )
+    if isinstance(point, ExponentialHistogramDataPoint):
+        if previous.scale != point.scale:
+            return None
+        return dataclasses.replace(
+            point,
+            start_time_unix_nano=previous.start_time_unix_nano,
+            count=previous.count + point.count,
+            sum=previous.sum + point.sum,
+            zero_count=previous.zero_count + point.zero_count,
+            positive=_merge_buckets(previous.positive, point.positive),
+            negative=_merge_buckets(previous.negative, point.negative),
+            min=min(previous.min, point.min),
+            max=max(previous.max, point.max),
+        )
+    return None
+
+
+class _MetricState:
+    __slots__ = ("metric", "delta", "points")
+
+    def __init__(self, metric: Metric):
+        self.metric = metric
+        data = metric.data
+        self.delta = not isinstance(data, Gauge) and (
+            data.aggregation_temporality == AggregationTemporality.DELTA
+        )
+        # attributes key -> list of points, usually exactly one
+        self.points: Dict[frozenset, list] = {}
+
+    def add(self, point) -> None:
+        key = _attributes_key(point.attributes)
+        points = self.points.get(key)
+        if points is None:
+            self.points[key] = [point]
+        elif not self.delta:
+            points[-1] = point
+        else:
+            merged = merge_delta_points(points[-1], point)
+            if merged is None:
+                points.append(point)
+            else:
+                points[-1] = merged
+
+    def to_metric(self) -> Metric:
+        data_points = [p for points in self.points.values() for p in points]
+        return dataclasses.replace(
+            self.metric,
+            data=dataclasses.replace(self.metric.data, data_points=data_points),
+        )
+
+
+class MetricsAggregator:
+    """Accumulates ``MetricsData`` until :meth:`take` is called."""
+
+    def __init__(self):
+        # resource -> (ResourceMetrics, scope -> (ScopeMetrics, key -> _MetricState))
+        self._resources = {}
+        self.collections = 0
+
+    def __len__(self) -> int:
+        return self.collections
+
+    def add(self, metrics_data: MetricsData) -> None:
+        self.collections += 1
+        for resource_metrics in metrics_data.resource_metrics:
+            _, scopes = self._resources.setdefault(
+                resource_metrics.resource, (resource_metrics, {})
+            )
+            for scope_metrics in resource_metrics.scope_metrics:
+                _, metrics = scopes.setdefault(
+                    scope_metrics.scope, (scope_metrics, {})
+                )
+                for metric in scope_metrics.metrics:
+                    data = metric.data
+                    key = (
+                        metric.name,
+                        metric.unit,
+                        metric.description,
+                        type(data),
+                        getattr(data, "aggregation_temporality", None),
+                    )
+                    state = metrics.get(key)
+                    if state is None:
+                        state = metrics[key] = _MetricState(metric)
+                    for point in data.data_points:
+                        state.add(point)
+
+    def take(self) -> Optional[MetricsData]:
+        """Return everything accumulated so far and reset, or None if empty."""
+        resources, self._resources = self._resources, {}
+        self.collections = 0
+        if not resources:
+            return None
+        return MetricsData(
+            resource_metrics=[
+                ResourceMetrics(
+                    resource=resource_metrics.resource,
+                    scope_metrics=[
+                        ScopeMetrics(
+                            scope=scope_metrics.scope,
+                            metrics=[state.to_metric() for state in metrics.values()],
+                            schema_url=scope_metrics.schema_url,
+                        )
+                        for scope_metrics, metrics in scopes.values()
+                    ],
+                    schema_url=resource_metrics.schema_url,
+                )
+                for resource_metrics, scopes in resources.values()
+            ]
+        )
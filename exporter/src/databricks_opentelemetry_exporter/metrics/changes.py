@@ -0,0 +1,161 @@
+"""
+Change-only filtering of ``MetricsData``.
+
+:class:`SeriesTracker` remembers a fingerprint of the last exported value of
+every cumulative or gauge series (instrument plus attribute set) and drops
+points whose value hasn't changed since. Delta points are always kept, as
+each one carries new data.
+
+State is two 64-bit hashes per series in an LRU ordered dict bounded by
+``max_series``. A full snapshot rebuilds it from scratch, which also evicts
+series that stopped reporting.
+
+:meth:`SeriesTracker.filter` doesn't change that state by itself. Call
+:meth:`SeriesTracker.commit` once the filtered data was written, or
+:meth:`SeriesTracker.rollback` if it wasn't, so points that failed to
+export are compared against the last value that was actually written.
+"""
+import collections
+import dataclasses
+from typing import Optional
+
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    ExponentialHistogramDataPoint,
+    Gauge,
+    HistogramDataPoint,
+    MetricsData,
+    ResourceMetrics,
+    ScopeMetrics,
+)
+
+
+def _fingerprint(point) -> int:
+    # Everything but the timestamps and exemplars
+    if isinstance(point, HistogramDataPoint):
+        return hash(
+            (point.count, point.sum, tuple(point.bucket_counts), point.min, point.max)
+        )
+    if isinstance(point, ExponentialHistogramDataPoint):
+        return hash(
+            (
+                point.count,
+                point.sum,
+                point.scale,
+                point.zero_count,
+                point.positive.offset,
+                tuple(point.positive.bucket_counts),
+                point.negative.offset,
+                tuple(point.negative.bucket_counts),
+                point.min,
+                point.max,
+            )
+        )
+    return hash(point.value)
+
+
+class SeriesTracker:
+    """Bounded memory of the last exported value per series."""
+
+    def __init__(self, max_series: int = 100_000):
+        self.max_series = max_series
+        self._last = collections.OrderedDict()
+        # Fingerprints seen by the last filter(), applied by commit()
+        self._pending = {}
+        self._pending_full = False
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def _changed(self, key: int, fingerprint: int) -> bool:
+        last = self._pending.get(key)
+        if last is None:
+            last = self._last.get(key)
+        self._pending[key] = fingerprint
+        return last != fingerprint
+
+    def commit(self) -> None:
+        """Remember the values of the last :meth:`filter` as exported."""
+        if self._pending_full:
+            self._last.clear()
+        for key, fingerprint in self._pending.items():
+            if key in self._last:
+                self._last.move_to_end(key)
+            self._last[key] = fingerprint
+            if len(self._last) > self.max_series:
+                self._last.popitem(last=False)
+        self.rollback()
+
+    def rollback(self) -> None:
+        """Forget the values of the last :meth:`filter`, which weren't exported."""
+        self._pending = {}
+        self._pending_full = False
+
+    def filter(self, metrics_data: MetricsData, full: bool = False) -> Optional[MetricsData]:
+        """
+        Return ``metrics_data`` without unchanged points, or None if nothing
+        changed. With ``full=True`` every point is kept and :meth:`commit`
+        rebuilds the state from them.
+        """
+        self.rollback()
+        self._pending_full = full
+        resource_metrics_list = []
+        for resource_metrics in metrics_data.resource_metrics:
+            resource_key = hash(resource_metrics.resource)
+            scope_metrics_list = []
+            for scope_metrics in resource_metrics.scope_metrics:
+                scope = scope_metrics.scope
+                scope_key = (scope.name, scope.version) if scope else None
+                metrics = []
+                for metric in scope_metrics.metrics:
+                    data = metric.data
+                    if not isinstance(data, Gauge) and (
+                        data.aggregation_temporality == AggregationTemporality.DELTA
+                    ):
+                        metrics.append(metric)
+                        continue
+                    points = []
+                    for point in data.data_points:
+                        try:
+                            key = hash(
+                                (
+                                    resource_key,
+                                    scope_key,
+                                    metric.name,
+                                    frozenset(point.attributes.items())
+                                    if point.attributes
+                                    else None,
+                                )
+                            )
+                            changed = self._changed(key, _fingerprint(point))
+                        except TypeError:
+                            # Unhashable attribute value, always export it
+                            changed = True
+                        if changed or full:
+                            points.append(point)
+                    if points:
+                        metrics.append(
+                            dataclasses.replace(
+                                metric,
+                                data=dataclasses.replace(data, data_points=points),
+                            )
+                        )
+                if metrics:
+                    scope_metrics_list.append(
+                        ScopeMetrics(
+                            scope=scope,
+                            metrics=metrics,
+                            schema_url=scope_metrics.schema_url,
+                        )
+                    )
+            if scope_metrics_list:
+                resource_metrics_list.append(
+                    ResourceMetrics(
+                        resource=resource_metrics.resource,
+                        scope_metrics=scope_metrics_list,
+                        schema_url=resource_metrics.schema_url,
+                    )
+                )
+        if not resource_metrics_list:
+            return None
+        return MetricsData(resource_metrics=resource_metrics_list)
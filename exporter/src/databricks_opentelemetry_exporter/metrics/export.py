@@ -1,70 +1,317 @@
-from opentelemetry.sdk.metrics import MetricReader
+from opentelemetry.sdk.metrics import (
+    Counter,
+    Histogram,
+    ObservableCounter,
+    ObservableGauge,
+    ObservableUpDownCounter,
+    UpDownCounter,
+)
 from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
     MetricExporter,
     MetricExportResult,
+    MetricReader,
     MetricsData,
 )
 from typing import Callable, Sequence
-from uuid import uuid4
+import logging
 import os
-import json
+import threading
+import time
+
+from databricks_opentelemetry_exporter.formats import check_output_format
+from databricks_opentelemetry_exporter.formats import otlp
+from databricks_opentelemetry_exporter.metrics.aggregation import MetricsAggregator
+from databricks_opentelemetry_exporter.metrics.changes import SeriesTracker
+from databricks_opentelemetry_exporter.util.compression import (
+    check_compression,
+    open_compressed,
+)
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+from databricks_opentelemetry_exporter.util.encoding import encode_metrics_data
+from databricks_opentelemetry_exporter.util.partitioning import Partitioner
+from databricks_opentelemetry_exporter.util.telemetry import ExporterTelemetry
+from databricks_opentelemetry_exporter.util.uuids import uuid7
+from databricks_opentelemetry_exporter.util.wal import WriteAheadQueue
+
+_logger = logging.getLogger(__name__)
+
+# Delta for counters and histograms, cumulative for up/down counters and
+# gauges, the same preference as the OTLP exporters' "delta" setting
+_DELTA_TEMPORALITY = {
+    Counter: AggregationTemporality.DELTA,
+    UpDownCounter: AggregationTemporality.CUMULATIVE,
+    Histogram: AggregationTemporality.DELTA,
+    ObservableCounter: AggregationTemporality.DELTA,
+    ObservableUpDownCounter: AggregationTemporality.CUMULATIVE,
+    ObservableGauge: AggregationTemporality.CUMULATIVE,
+}
+
+TEMPORALITIES = ("cumulative", "delta")
+
+
+def _point_count(metrics_data: MetricsData) -> int:
+    return sum(
+        len(metric.data.data_points)
+        for resource_metrics in metrics_data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    )
 
 class DatabricksVolumeMetricsExporter(MetricExporter):
     """
     Implementation of :class:`MetricExporter` that writes metrics to a
-    random file in a Databricks Volume.
+    time-ordered ``{uuid7()}`` file in a Databricks Volume.
 
     This class will only work on Databricks. It requires a volume to be mounted.
+
+    ``compression`` (``"gzip"`` or ``"zstd"``) produces ``.json.gz`` or
+    ``.json.zst`` files at ``compression_level``.
+
+    Without a ``formatter`` each ``MetricsData`` is encoded as one compact JSON
+    line with the fields of ``MetricsData.to_json()``.
+
+    ``output_format="otlp"`` writes length-delimited OTLP protobuf ``.binpb``
+    files instead of JSON.
+
+    ``durability`` (a mode name or a shared
+    :class:`~databricks_opentelemetry_exporter.util.durability.DurabilityPolicy`)
+    controls fsync; by default files are not fsynced.
+
+    With ``change_only=True`` cumulative and gauge points whose value hasn't
+    changed since the last export are skipped (see
+    :mod:`databricks_opentelemetry_exporter.metrics.changes`), and nothing
+    is written when no point changed. Every ``snapshot_interval_millis`` a
+    full snapshot is written to a ``{uuid7()}.snapshot{suffix}`` file;
+    readers rebuild current state from the latest snapshot plus the files
+    after it. At most ``max_series`` series are tracked.
+
+    ``partition_by`` writes files into Hive-style partition directories such
+    as ``signal=metrics/date=YYYY-MM-DD/hour=HH/host=<host>/`` (see
+    :mod:`databricks_opentelemetry_exporter.util.partitioning`), by export
+    time.
+
+    ``wal`` (``True``, a local directory or a
+    :class:`~databricks_opentelemetry_exporter.util.wal.WriteAheadQueue`)
+    queues files on local disk when writing them to the volume fails, and
+    retries them in the background, instead of failing the export.
+
+    The exporter records its latency, throughput (in data points) and
+    failures with the meter of ``meter_provider``, by default the global one
+    (see :mod:`databricks_opentelemetry_exporter.util.telemetry`).
     """
 
     def __init__(
         self,
         metrics_dir: str = None,
-        formatter: Callable[[MetricsData], str] = lambda data: json.dumps(data.to_dict(), default=str) + '\n',
+        formatter: Callable[[MetricsData], str] = None,
+        compression: str = None,
+        compression_level: int = None,
+        output_format: str = "json",
+        durability="none",
+        change_only: bool = False,
+        snapshot_interval_millis: float = 10 * 60 * 1000,
+        max_series: int = 100_000,
+        partition_by=None,
+        wal=None,
+        meter_provider=None,
     ):
         if not metrics_dir:
             raise ValueError("metrics_dir must be provided")
         
         self.metrics_dir = metrics_dir
         self.formatter = formatter
-        self.file = None
+        self.compression = compression
+        self.compression_level = compression_level
+        self.durability = DurabilityPolicy.of(durability)
+        if output_format == "parquet":
+            raise ValueError("parquet output is only supported for logs and traces")
+        self.output_format = output_format
+        self.suffix = check_output_format(output_format) + check_compression(compression)
+        self.snapshot_interval_millis = snapshot_interval_millis
+        self._tracker = SeriesTracker(max_series) if change_only else None
+        self._last_snapshot = None
+        self._partitioner = None
+        if partition_by:
+            self._partitioner = Partitioner(metrics_dir, "metrics", partition_by)
+        self._wal = WriteAheadQueue.of(wal, durability=self.durability)
+        self._telemetry = ExporterTelemetry("metrics", meter_provider)
+        if self._wal is not None:
+            wal_queue = self._wal
+            self._telemetry.observe_queue(
+                "wal", wal_queue, wal_queue.__len__, lambda: wal_queue.evicted
+            )
 
     def export(self, metrics_data: MetricsData) -> MetricExportResult:
+        export_start = time.perf_counter()
         try:
-            filename = f"{uuid4()}.json"
-            filepath = os.path.join(self.metrics_dir, filename)
-            print(f"Writing metrics to file: {filepath}")
-            self.file = open(filepath, "w")
-
-            self.file.write(self.formatter(metrics_data))
-            self.file.flush()
-            self.file.close()
-            self.file = None
+            snapshot = ""
+            if self._tracker is not None:
+                now = time.monotonic()
+                full = self._last_snapshot is None or (
+                    (now - self._last_snapshot) * 1000 >= self.snapshot_interval_millis
+                )
+                metrics_data = self._tracker.filter(metrics_data, full=full)
+                if metrics_data is None:
+                    self._tracker.commit()
+                    return MetricExportResult.SUCCESS
+                if full:
+                    snapshot = ".snapshot"
+            filename = f"{uuid7()}{snapshot}{self.suffix}"
+            directory = self.metrics_dir
+            if self._partitioner is not None:
+                directory = self._partitioner.directory_for()
+            filepath = os.path.join(directory, filename)
+            start = time.perf_counter()
+            if self.output_format == "otlp":
+                payload = otlp.encode_metrics_data(metrics_data)
+            elif self.formatter is None:
+                payload = encode_metrics_data(metrics_data)
+            else:
+                payload = self.formatter(metrics_data).encode("utf-8")
+            start = self._telemetry.phase("serialize", start)
+
+            file = None
+            try:
+                file = open_compressed(
+                    filepath, self.compression, self.compression_level
+                )
+                file.write(payload)
+                start = self._telemetry.phase("write", start)
+                self.durability.commit(file, len(payload))
+                file.close()
+                self._telemetry.phase("fsync", start)
+                self._telemetry.published()
+            except Exception:
+                if file is not None:
+                    try:
+                        file.close()
+                    except Exception:
+                        pass
+                    # Don't leave a partial file behind
+                    try:
+                        os.unlink(filepath)
+                    except OSError:
+                        pass
+                if self._wal is None:
+                    raise
+                # Retried under the name it would have had
+                self._wal.put(
+                    directory, filename, payload, self.compression, self.compression_level
+                )
+            if self._tracker is not None:
+                # Written or queued, so later batches only need what changes next
+                self._tracker.commit()
+                if snapshot:
+                    self._last_snapshot = now
+            self._telemetry.written(_point_count(metrics_data), len(payload))
+            self._telemetry.exported(export_start)
             return MetricExportResult.SUCCESS
         except Exception as e:
-            print(f"Error exporting metrics: {str(e)}")
+            if self._tracker is not None:
+                self._tracker.rollback()
+            _logger.error(f"Error exporting metrics: {str(e)}")
+            self._telemetry.failed()
+            self._telemetry.exported(export_start, ok=False)
             return MetricExportResult.FAILURE
 
-    def shutdown(self):
-        if self.file:
-            self.file.close()
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        if self._wal is not None:
+            return self._wal.drain()
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs):
+        if self._wal is not None:
+            self._wal.shutdown()
 
 class DatabricksVolumeMetricReader(MetricReader):
     """
     Implementation of :class:`MetricReader` that uses DatabricksVolumeMetricsExporter
     to export metrics.
+
+    By default metrics are exported whenever ``collect()`` is called. With
+    ``collect_interval_millis`` a background thread collects periodically.
+
+    With ``export_interval_millis`` collections are pre-aggregated in
+    process (see :mod:`databricks_opentelemetry_exporter.metrics.aggregation`)
+    and written as one file per export interval, so e.g. a minute of
+    5-second collections ends up in one file holding one point per series.
+
+    ``temporality="delta"`` asks for delta counters and histograms, which
+    are then summed across the collections of an export interval.
     """
 
     def __init__(
         self,
         exporter: DatabricksVolumeMetricsExporter = None,
         metrics_dir: str = "/Volumes/cgrant/occ/arr/metrics/",
+        collect_interval_millis: float = None,
+        export_interval_millis: float = None,
+        temporality: str = "cumulative",
     ):
-        super().__init__()
+        if temporality not in TEMPORALITIES:
+            raise ValueError(
+                f"Unsupported temporality: {temporality!r}, "
+                f"expected one of {list(TEMPORALITIES)}"
+            )
+        super().__init__(
+            preferred_temporality=_DELTA_TEMPORALITY if temporality == "delta" else None
+        )
         self.exporter = exporter or DatabricksVolumeMetricsExporter(metrics_dir=metrics_dir)
+        self.collect_interval_millis = collect_interval_millis
+        self.export_interval_millis = export_interval_millis
+        self._aggregator = MetricsAggregator() if export_interval_millis else None
+        self._aggregator_lock = threading.Lock()
+        self._last_export = time.monotonic()
+        self._shutdown_event = threading.Event()
+        self._thread = None
+        if collect_interval_millis:
+            self._thread = threading.Thread(
+                target=self._ticker, name="DatabricksVolumeMetricReader", daemon=True
+            )
+            self._thread.start()
+
+    def _ticker(self) -> None:
+        interval = self.collect_interval_millis / 1000
+        while not self._shutdown_event.wait(interval):
+            try:
+                self.collect()
+            except Exception as e:
+                _logger.error(f"Error collecting metrics: {str(e)}")
+
+    def _receive_metrics(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> None:
+        if self._aggregator is None:
+            self.exporter.export(metrics_data)
+            return
+        with self._aggregator_lock:
+            self._aggregator.add(metrics_data)
+            due = (time.monotonic() - self._last_export) * 1000 >= self.export_interval_millis
+        if due:
+            self._export_aggregated()
+
+    def _export_aggregated(self) -> None:
+        with self._aggregator_lock:
+            metrics_data = self._aggregator.take()
+            self._last_export = time.monotonic()
+        if metrics_data is not None:
+            self.exporter.export(metrics_data)
 
-    def _receive_metrics(self, metrics_data: MetricsData) -> None:
-        self.exporter.export(metrics_data)
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        super().force_flush(timeout_millis=timeout_millis)
+        if self._aggregator is not None:
+            self._export_aggregated()
+        return True
 
     def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self._shutdown_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout_millis / 1000)
+        if self._thread is not None or self._aggregator is not None:
+            # Don't lose what was collected (or is pending) since the last export
+            try:
+                self.collect(timeout_millis=timeout_millis)
+            except Exception as e:
+                _logger.error(f"Error collecting metrics: {str(e)}")
+            if self._aggregator is not None:
+                self._export_aggregated()
         self.exporter.shutdown()
@@ -0,0 +1,463 @@
+"""
+Helpers for reading files written by the volume exporters.
+
+:func:`read_records` lazily yields the records of one exported file in any
+of the exporters' formats (JSON lines, OTLP protobuf, Parquet) and
+compressions; :func:`read_directory` does the same for a whole export
+directory, partitioned or not, reading several files in parallel. Both take
+the same predicates:
+
+* ``start_time_ns``/``end_time_ns`` - record timestamp (span start time) in
+  the inclusive range;
+* ``min_severity`` - log severity number at least this;
+* ``trace_id`` - record belongs to this trace (int or hex string).
+
+A record that lacks the field a predicate looks at doesn't match it.
+:func:`read_directory` first uses partition directories and index sidecars
+to skip files that can't match, then filters the records of the others.
+
+Records keep the shape of their format: JSON files yield the exporters' JSON
+objects, OTLP files yield one dict per log record or span (OTLP field names,
+hex ids, integer timestamps, plain attribute dicts, with ``resource`` and
+``scope`` attached) or one dict per metrics request, and Parquet files yield
+one dict per row. Since :func:`read_records` only needs a path, it can also
+run per file inside a Spark job, e.g. in a ``flatMap`` over a file listing.
+"""
+import base64
+import collections
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Union
+
+from databricks_opentelemetry_exporter.util.compression import (
+    COMPRESSION_SUFFIXES,
+    compression_from_path,
+    open_decompressed,
+)
+from databricks_opentelemetry_exporter.util.encoding import HEADER_KEY
+
+SIGNALS = ("logs", "traces", "metrics")
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Timestamp fields of the JSON, OTLP and Parquet record shapes, in order of
+# preference
+_TIME_FIELDS = (
+    "timestamp",
+    "observed_timestamp",
+    "start_time",
+    "time_unix_nano",
+    "observed_time_unix_nano",
+    "start_time_unix_nano",
+)
+_ID_FIELDS = ("trace_id", "span_id", "parent_span_id")
+_FILE_FORMATS = ((".json", "json"), (".binpb", "otlp"), (".parquet", "parquet"))
+
+
+def _is_header(record: Dict[str, Any]) -> bool:
+    return len(record) == 1 and HEADER_KEY in record
+
+
+def read_json_records(path: str, use_mmap: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the records of a (possibly compressed) JSON lines file.
+
+    Files written with ``resource_mode="header"`` carry the resource in header
+    lines; it is re-joined onto every record that follows, so callers see the
+    same records as with ``resource_mode="inline"``.
+    """
+    resource = None
+    with open_decompressed(path, use_mmap=use_mmap) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if _is_header(record):
+                resource = record[HEADER_KEY].get("resource")
+                continue
+            if resource is not None and "resource" not in record:
+                record["resource"] = resource
+            yield record
+
+
+def file_format(path: str) -> Optional[str]:
+    """``"json"``, ``"otlp"`` or ``"parquet"`` by suffix, or None for other files."""
+    path = str(path)
+    suffix = COMPRESSION_SUFFIXES.get(compression_from_path(path))
+    if suffix:
+        path = path[: -len(suffix)]
+    for extension, name in _FILE_FORMATS:
+        if path.endswith(extension):
+            return name
+    return None
+
+
+def signal_from_path(path: str) -> Optional[str]:
+    """Signal of the ``signal=`` partition ``path`` is in, if any."""
+    for part in os.path.normpath(str(path)).split(os.sep):
+        field, _, value = part.partition("=")
+        if field == "signal" and value in SIGNALS:
+            return value
+    return None
+
+
+# Record field extraction
+
+
+def to_time_ns(value) -> Optional[int]:
+    """
+    Nanoseconds since the epoch of a timestamp in any of the record shapes
+    (ISO string, integer or numeric string, datetime), None for unset ones.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value or None
+    if isinstance(value, str):
+        if value.isdigit():
+            return int(value) or None
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        moment = datetime.datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return (moment - _EPOCH) // _MICROSECOND * 1000
+    if isinstance(value, datetime.datetime):
+        return (value - _EPOCH) // _MICROSECOND * 1000
+    return None
+
+
+def _metrics_time(record: Dict[str, Any]) -> Optional[int]:
+    # Latest data point of a metrics request, in either the JSON or OTLP shape
+    latest = None
+    for resource_metrics in record.get("resource_metrics") or ():
+        for scope_metrics in resource_metrics.get("scope_metrics") or ():
+            for metric in scope_metrics.get("metrics") or ():
+                for data in metric.values():
+                    if not isinstance(data, dict):
+                        continue
+                    for point in data.get("data_points") or ():
+                        time_ns = to_time_ns(point.get("time_unix_nano"))
+                        if time_ns is not None and (latest is None or time_ns > latest):
+                            latest = time_ns
+    return latest
+
+
+def record_time(record: Dict[str, Any]) -> Optional[int]:
+    """Timestamp of ``record`` in nanoseconds, or None if it has none."""
+    if "resource_metrics" in record:
+        return _metrics_time(record)
+    for field in _TIME_FIELDS:
+        time_ns = to_time_ns(record.get(field))
+        if time_ns is not None:
+            return time_ns
+    return None
+
+
+def record_end_time(record: Dict[str, Any]) -> Optional[int]:
+    """End time of a span ``record``, or the timestamp of any other record."""
+    for field in ("end_time", "end_time_unix_nano"):
+        time_ns = to_time_ns(record.get(field))
+        if time_ns is not None:
+            return time_ns
+    return record_time(record)
+
+
+def record_severity(record: Dict[str, Any]) -> Optional[int]:
+    """Severity number of a log ``record``, or None if it has none."""
+    severity = record.get("severity_number")
+    if isinstance(severity, int):
+        return severity
+    if isinstance(severity, str):
+        # repr() of a SeverityNumber, e.g. "<SeverityNumber.INFO: 9>"
+        number = severity.rstrip(">").rpartition(" ")[2]
+        if number.isdigit():
+            return int(number)
+    return None
+
+
+def _to_trace_id(value) -> Optional[int]:
+    if isinstance(value, int):
+        return value or None
+    if value:
+        return int(value.removeprefix("0x"), 16) or None
+    return None
+
+
+def record_trace_id(record: Dict[str, Any]) -> Optional[int]:
+    """Trace id of a log or span ``record``, or None if it has none."""
+    context = record.get("context")
+    if isinstance(context, dict):
+        return _to_trace_id(context.get("trace_id"))
+    return _to_trace_id(record.get("trace_id"))
+
+
+class _Predicate:
+    """Record filter built from the reader arguments."""
+
+    def __init__(self, start_time_ns, end_time_ns, min_severity, trace_id):
+        self.start_time_ns = start_time_ns
+        self.end_time_ns = end_time_ns
+        self.min_severity = None if min_severity is None else int(min_severity)
+        self.trace_id = _to_trace_id(trace_id)
+        self.empty = (
+            start_time_ns is None
+            and end_time_ns is None
+            and min_severity is None
+            and trace_id is None
+        )
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        if self.start_time_ns is not None or self.end_time_ns is not None:
+            time_ns = record_time(record)
+            if time_ns is None:
+                return False
+            if self.start_time_ns is not None and time_ns < self.start_time_ns:
+                return False
+            if self.end_time_ns is not None and time_ns > self.end_time_ns:
+                return False
+        if self.min_severity is not None:
+            severity = record_severity(record)
+            if severity is None or severity < self.min_severity:
+                return False
+        if self.trace_id is not None and record_trace_id(record) != self.trace_id:
+            return False
+        return True
+
+
+# OTLP
+
+
+def _any_value(value: Dict[str, Any]):
+    if not value:
+        return None
+    kind, inner = next(iter(value.items()))
+    if kind == "array_value":
+        return [_any_value(v) for v in inner.get("values", ())]
+    if kind == "kvlist_value":
+        return _attributes(inner.get("values", ()))
+    if kind == "int_value":
+        return int(inner)
+    return inner
+
+
+def _attributes(key_values) -> Dict[str, Any]:
+    return {kv["key"]: _any_value(kv.get("value")) for kv in key_values}
+
+
+def _normalize(message: Dict[str, Any]) -> Dict[str, Any]:
+    # MessageToDict renders ids as base64, 64-bit ints as strings and
+    # attributes as KeyValue lists
+    for key, value in message.items():
+        if key in _ID_FIELDS and isinstance(value, str):
+            message[key] = base64.b64decode(value).hex()
+        elif key.endswith("time_unix_nano") and isinstance(value, str):
+            message[key] = int(value)
+        elif key == "attributes" and isinstance(value, list):
+            message[key] = _attributes(value)
+        elif key == "body" and isinstance(value, dict):
+            message[key] = _any_value(value)
+        elif isinstance(value, dict):
+            _normalize(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    _normalize(item)
+    return message
+
+
+_OTLP_LAYOUT = {
+    # signal -> (resource list, scope list, record list) fields of the request
+    "logs": ("resource_logs", "scope_logs", "log_records"),
+    "traces": ("resource_spans", "scope_spans", "spans"),
+    "metrics": ("resource_metrics", None, None),
+}
+
+
+def _request_type(signal: str):
+    if signal == "logs":
+        from opentelemetry.proto.collector.logs.v1.logs_service_pb2 import (
+            ExportLogsServiceRequest as request_type,
+        )
+    elif signal == "traces":
+        from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+            ExportTraceServiceRequest as request_type,
+        )
+    else:
+        from opentelemetry.proto.collector.metrics.v1.metrics_service_pb2 import (
+            ExportMetricsServiceRequest as request_type,
+        )
+    return request_type
+
+
+def read_otlp_records(
+    path: str, signal: str, use_mmap: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the log records or spans of an OTLP ``.binpb`` file, or its
+    requests for metrics. The request types of all signals share one wire
+    layout, so ``signal`` has to be given.
+    """
+    from google.protobuf.json_format import MessageToDict
+
+    from databricks_opentelemetry_exporter.formats.otlp import read_file
+
+    if signal not in _OTLP_LAYOUT:
+        raise ValueError(
+            f"Unsupported signal: {signal!r}, expected one of {list(SIGNALS)}"
+        )
+    resource_field, scope_field, records_field = _OTLP_LAYOUT[signal]
+    request_type = _request_type(signal)
+    for message in read_file(path, use_mmap=use_mmap):
+        request = request_type.FromString(message)
+        value = _normalize(
+            MessageToDict(
+                request,
+                preserving_proto_field_name=True,
+                use_integers_for_enums=True,
+            )
+        )
+        if records_field is None:
+            yield value
+            continue
+        for resource_item in value.get(resource_field, ()):
+            resource = resource_item.get("resource")
+            for scope_item in resource_item.get(scope_field, ()):
+                scope = scope_item.get("scope")
+                for record in scope_item.get(records_field, ()):
+                    record["resource"] = resource
+                    record["scope"] = scope
+                    yield record
+
+
+# Parquet
+
+
+def read_parquet_records(path: str, use_mmap: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of a Parquet file written by the exporters, with
+    timestamps as integer nanoseconds and map columns as dicts.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError(
+            "Reading Parquet files requires the 'pyarrow' package; "
+            "install databricks-opentelemetry-exporter[parquet]"
+        )
+    parquet_file = pq.ParquetFile(path, memory_map=use_mmap)
+    for batch in parquet_file.iter_batches():
+        # to_pylist() can't represent nanosecond timestamps as datetimes
+        columns = [
+            column.cast(pa.int64()) if pa.types.is_timestamp(column.type) else column
+            for column in batch.columns
+        ]
+        batch = pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+        map_columns = [
+            field.name for field in batch.schema if pa.types.is_map(field.type)
+        ]
+        for row in batch.to_pylist():
+            for name in map_columns:
+                if row[name] is not None:
+                    row[name] = dict(row[name])
+            yield row
+
+
+# Public API
+
+
+def read_records(
+    path: str,
+    start_time_ns: int = None,
+    end_time_ns: int = None,
+    min_severity: int = None,
+    trace_id: Union[int, str] = None,
+    signal: str = None,
+    use_mmap: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield the records of one exported file that match the predicates.
+
+    The format and compression are taken from the file name. OTLP files need
+    their ``signal``; when it isn't given it is taken from a ``signal=``
+    partition directory in ``path``. ``use_mmap`` memory-maps the file, which
+    is cheaper than buffered reads for large local files but should be turned
+    off on FUSE mounts that don't support it.
+    """
+    predicate = _Predicate(start_time_ns, end_time_ns, min_severity, trace_id)
+    file_type = file_format(path)
+    if file_type == "json":
+        records = read_json_records(path, use_mmap=use_mmap)
+    elif file_type == "otlp":
+        signal = signal or signal_from_path(path)
+        if signal is None:
+            raise ValueError(
+                f"Can't tell the signal of OTLP file {path}, pass signal= explicitly"
+            )
+        records = read_otlp_records(path, signal, use_mmap=use_mmap)
+    elif file_type == "parquet":
+        records = read_parquet_records(path, use_mmap=use_mmap)
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
+    if predicate.empty:
+        return records
+    return filter(predicate, records)
+
+
+def read_directory(
+    directory: str,
+    start_time_ns: int = None,
+    end_time_ns: int = None,
+    min_severity: int = None,
+    trace_id: Union[int, str] = None,
+    signal: str = None,
+    use_mmap: bool = True,
+    max_workers: int = 4,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield the matching records of every exported file under
+    ``directory``, file by file in name (and so creation) order.
+
+    Files are read by ``max_workers`` threads, at most ``2 * max_workers``
+    files ahead of the consumer; with ``max_workers=1`` files are read one at
+    a time in the calling thread. Files in progress, index sidecars and
+    unknown file types are skipped.
+    """
+    from databricks_opentelemetry_exporter.util.index import find_files
+
+    paths = (
+        path
+        for path in find_files(directory, trace_id, start_time_ns, end_time_ns)
+        if file_format(path) is not None
+    )
+
+    def read(path):
+        return read_records(
+            path, start_time_ns, end_time_ns, min_severity, trace_id, signal, use_mmap
+        )
+
+    if max_workers <= 1:
+        for path in paths:
+            yield from read(path)
+        return
+
+    def read_all(path):
+        return list(read(path))
+
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        try:
+            for path in paths:
+                pending.append(pool.submit(read_all, path))
+                if len(pending) >= 2 * max_workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # The consumer stopped early, don't read the files queued ahead
+            for future in pending:
+                future.cancel()
@@ -1,58 +1,118 @@
-from databricks.sdk import WorkspaceClient
-w = WorkspaceClient()
-
-CLOUD_PROVIDER = w.config.environment.cloud.value
-
-DATABRICKS_WORKSPACE_ID = w.get_workspace_id()
-
-import requests
-
-# Get the token for IMDSv2
-try:
-    _token = requests.put(
-        'http://169.254.169.254/latest/api/token', 
-        headers={'X-aws-ec2-metadata-token-ttl-seconds': '60'}
-    ).text
-except requests.RequestException as e:
-    _token = None
-
-# Get the region using the token
-try:
-    CLOUD_REGION = requests.get(
-        'http://169.254.169.254/latest/meta-data/placement/region', 
-        headers={'X-aws-ec2-metadata-token': _token}
-    ).text
-except requests.RequestException as e:
-    CLOUD_REGION = None
-
-# Get the availability zone using the token
-try:
-    CLOUD_AVAILABILITY_ZONE = requests.get(
-        'http://169.254.169.254/latest/meta-data/placement/availability-zone', 
-        headers={'X-aws-ec2-metadata-token': _token}
-    ).text
-except requests.RequestException as e:
-    CLOUD_AVAILABILITY_ZONE = None
-
-try:
-    CLOUD_ACCOUNT_ID = requests.get(
-        'http://169.254.169.254/latest/dynamic/instance-identity/document', 
-        headers={'X-aws-ec2-metadata-token': _token}
-    ).json()['accountId']
-except requests.RequestException as e:
-    CLOUD_ACCOUNT_ID = None
-
-try:
-    HOST_TYPE = requests.get(
-        'http://169.254.169.254/latest/meta-data/instance-type',
-        headers={'X-aws-ec2-metadata-token': _token}
-    ).text
-except requests.RequestException as e:
-    HOST_TYPE = None
-
-
-
-print(f"{CLOUD_PROVIDER=}")
-print(f"{CLOUD_REGION=}")
-print(f"{CLOUD_AVAILABILITY_ZONE=}")
-print(f"{CLOUD_ACCOUNT_ID=}")
\ No newline at end of file
+import threading
+
+IMDS_ENDPOINT = "http://169.254.169.254"
+
+# Resource attribute -> IMDS path, fetched concurrently once a token is held
+_METADATA = {
+    "cloud.region": "/latest/meta-data/placement/region",
+    "cloud.availability_zone": "/latest/meta-data/placement/availability-zone",
+    "cloud.account.id": "/latest/dynamic/instance-identity/document",
+    "host.type": "/latest/meta-data/instance-type",
+}
+
+
+def _get(endpoint, path, token, timeout):
+    import requests
+
+    response = requests.get(
+        endpoint + path,
+        headers={'X-aws-ec2-metadata-token': token},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    if path.endswith("instance-identity/document"):
+        return response.json()['accountId']
+    return response.text
+
+
+def get_aws_attributes(
+    endpoint: str = IMDS_ENDPOINT,
+    timeout: float = 0.5,
+    raise_if_unreachable: bool = False,
+):
+    """
+    Cloud resource attributes from the EC2 instance metadata service (IMDSv2).
+
+    Every request is bounded by ``timeout`` seconds and the metadata requests
+    run concurrently, so this returns in at most about ``2 * timeout``. Returns
+    an empty dict off AWS, where the metadata endpoint answers with an error
+    or isn't there. With ``raise_if_unreachable``, a connection error or
+    timeout is raised instead, so callers can tell it from an answer.
+    """
+    # Imported here: most processes read detected attributes from the cache
+    import requests
+
+    # Get the token for IMDSv2
+    try:
+        response = requests.put(
+            endpoint + '/latest/api/token',
+            headers={'X-aws-ec2-metadata-token-ttl-seconds': '60'},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        token = response.text
+    except (requests.ConnectionError, requests.Timeout):
+        if raise_if_unreachable:
+            raise
+        return {}
+    except requests.RequestException:
+        return {}
+
+    attributes = {"cloud.provider": "aws", "cloud.platform": "aws_ec2"}
+
+    unreachable = []
+
+    def fetch(key, path):
+        try:
+            attributes[key] = _get(endpoint, path, token, timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            unreachable.append(e)
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+
+    threads = [
+        threading.Thread(target=fetch, args=item, daemon=True)
+        for item in _METADATA.items()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if unreachable and raise_if_unreachable:
+        raise unreachable[0]
+    return attributes
+
+
+# Module constants of earlier versions -> attribute, fetched on first access
+# and None where IMDS didn't answer
+_CONSTANTS = {
+    "CLOUD_REGION": "cloud.region",
+    "CLOUD_AVAILABILITY_ZONE": "cloud.availability_zone",
+    "CLOUD_ACCOUNT_ID": "cloud.account.id",
+    "HOST_TYPE": "host.type",
+}
+
+
+def _workspace_constants():
+    from databricks.sdk import WorkspaceClient
+
+    w = WorkspaceClient()
+    return {
+        "CLOUD_PROVIDER": w.config.environment.cloud.value,
+        "DATABRICKS_WORKSPACE_ID": w.get_workspace_id(),
+    }
+
+
+def __getattr__(name):
+    if name in _CONSTANTS:
+        attributes = get_aws_attributes()
+        constants = {
+            constant: attributes.get(attribute)
+            for constant, attribute in _CONSTANTS.items()
+        }
+    elif name in ("CLOUD_PROVIDER", "DATABRICKS_WORKSPACE_ID"):
+        constants = _workspace_constants()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals().update(constants)
+    return constants[name]
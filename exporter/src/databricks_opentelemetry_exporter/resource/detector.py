@@ -0,0 +1,179 @@
+"""
+Resource detection for Databricks clusters.
+
+Detection is lazy (nothing happens on import), sources run concurrently with
+bounded timeouts, and the result is cached in a file on local disk. Every
+Spark Python worker on a node starts a new interpreter, so with the cache
+only the first one pays for IMDS round trips; the others read a small JSON
+file.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from opentelemetry.sdk.resources import Resource, ResourceDetector
+
+from databricks_opentelemetry_exporter.resource.cloud.aws import (
+    IMDS_ENDPOINT,
+    get_aws_attributes,
+)
+from databricks_opentelemetry_exporter.resource.os import get_os_attributes
+from databricks_opentelemetry_exporter.resource.resource import (
+    get_databricks_runtime_version,
+)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    tempfile.gettempdir(), "databricks-opentelemetry-resource.json"
+)
+
+
+def _runtime_attributes() -> Dict[str, str]:
+    version = get_databricks_runtime_version()
+    return {"databricks.runtime.version": version} if version else {}
+
+
+class DatabricksResourceDetector(ResourceDetector):
+    """
+    :class:`ResourceDetector` for host, OS, AWS (IMDSv2) and Databricks
+    runtime attributes.
+
+    Sources are queried in parallel; each IMDS request is bounded by
+    ``timeout`` seconds and ``detect()`` as a whole returns within roughly
+    ``3 * timeout``, dropping any source that hasn't answered by then.
+
+    The result is written to ``cache_path`` and reused by every detector (in
+    any process) that points at the same file: for ``cache_ttl_seconds`` if
+    every source answered, else only for ``failure_cache_ttl_seconds``, so
+    e.g. a transient IMDS failure is retried soon. A source that answered
+    with no attributes, like AWS off AWS or the runtime off Databricks
+    Runtime, counts as answered. Concurrent processes serialize on a lock file, so a node runs one
+    detection. ``cache_path=None`` disables caching.
+    """
+
+    def __init__(
+        self,
+        imds_endpoint: str = IMDS_ENDPOINT,
+        timeout: float = 0.5,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        cache_ttl_seconds: float = 3600.0,
+        raise_on_error: bool = False,
+        failure_cache_ttl_seconds: float = 60.0,
+    ):
+        super().__init__(raise_on_error=raise_on_error)
+        self.imds_endpoint = imds_endpoint
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.failure_cache_ttl_seconds = failure_cache_ttl_seconds
+
+    def _sources(self) -> Dict[str, Callable[[], Dict[str, str]]]:
+        return {
+            "os": get_os_attributes,
+            "runtime": _runtime_attributes,
+            "aws": lambda: get_aws_attributes(
+                self.imds_endpoint, self.timeout, raise_if_unreachable=True
+            ),
+        }
+
+    def _detect_attributes(self):
+        """
+        Return ``(attributes, complete)`` from all sources, in parallel.
+        ``complete`` is False if any source raised or timed out; sources
+        that answered with no attributes count as answered.
+        """
+        results = {}
+
+        def run(name, source):
+            try:
+                results[name] = source()
+            except Exception:
+                # Left out of results, like a source that timed out
+                pass
+
+        sources = self._sources()
+        threads = [
+            threading.Thread(target=run, args=item, daemon=True)
+            for item in sources.items()
+        ]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 3 * self.timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        attributes = {}
+        for name in sources:
+            attributes.update(results.get(name, {}))
+        complete = all(name in results for name in sources)
+        return attributes, complete
+
+    def _read_cache(self) -> Optional[Dict[str, str]]:
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            ttl = min(
+                cached.get("ttl_seconds", self.cache_ttl_seconds),
+                self.cache_ttl_seconds,
+            )
+            if time.time() - cached["detected_at"] < ttl:
+                return cached["attributes"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _write_cache(self, attributes: Dict[str, str], ttl_seconds: float) -> None:
+        directory = os.path.dirname(self.cache_path) or "."
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".resource-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {
+                        "detected_at": time.time(),
+                        "ttl_seconds": ttl_seconds,
+                        "attributes": attributes,
+                    },
+                    f,
+                )
+            # Readers see either the old or the new file, never a partial one
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def _detect_and_cache(self) -> Dict[str, str]:
+        attributes, complete = self._detect_attributes()
+        if complete:
+            self._write_cache(attributes, self.cache_ttl_seconds)
+        elif self.failure_cache_ttl_seconds:
+            self._write_cache(attributes, self.failure_cache_ttl_seconds)
+        return attributes
+
+    def detect(self) -> Resource:
+        if self.cache_path is None:
+            return Resource(self._detect_attributes()[0])
+        attributes = self._read_cache()
+        if attributes is None:
+            lock = None
+            if fcntl is not None:
+                try:
+                    lock = open(self.cache_path + ".lock", "a")
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                except OSError:
+                    if lock is not None:
+                        lock.close()
+                    lock = None
+            try:
+                # Another process may have finished detection while we waited
+                attributes = self._read_cache()
+                if attributes is None:
+                    attributes = self._detect_and_cache()
+            finally:
+                if lock is not None:
+                    lock.close()
+        return Resource(attributes)
@@ -1,8 +1,6 @@
 import socket
 import platform
 
-# Get the hostname
-HOST_NAME = socket.gethostname()
 
 def get_os_info():
     try:
@@ -13,8 +11,35 @@ def get_os_info():
     except:
         return '', '', ''
 
-name, version, codename = get_os_info()
-OS_DESCRIPTION = f"{name} {version} {codename}".strip()
-OS_NAME = name.lower() if name else platform.system().lower()
-OS_TYPE = platform.system().lower()
 
+def get_host_name():
+    return socket.gethostname()
+
+
+def get_os_attributes():
+    """Host and OS resource attributes, read on call rather than on import."""
+    name, version, codename = get_os_info()
+    return {
+        "host.name": get_host_name(),
+        "os.description": f"{name} {version} {codename}".strip(),
+        "os.name": name.lower() if name else platform.system().lower(),
+        "os.type": platform.system().lower(),
+    }
+
+
+# Module constants of earlier versions -> attribute, read on first access
+_CONSTANTS = {
+    "HOST_NAME": "host.name",
+    "OS_DESCRIPTION": "os.description",
+    "OS_NAME": "os.name",
+    "OS_TYPE": "os.type",
+}
+
+
+def __getattr__(name):
+    if name not in _CONSTANTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    attributes = get_os_attributes()
+    for constant, attribute in _CONSTANTS.items():
+        globals()[constant] = attributes[attribute]
+    return globals()[name]
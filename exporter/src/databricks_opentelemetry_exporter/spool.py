@@ -0,0 +1,431 @@
+"""
+Node-local spool: many exporting processes, one writer.
+
+Every PySpark Python worker and notebook process on a node runs its own
+exporter. Each one opens, fsyncs and publishes its own files. A
+:class:`SpoolServer` runs once per node, e.g. started from an init script
+with::
+
+    python -m databricks_opentelemetry_exporter.spool --allowed-directory /Volumes &
+
+Exporters created with ``spool=True`` then send their encoded batches to it
+over a Unix domain socket. The server appends the batches of all processes
+to one :class:`~databricks_opentelemetry_exporter.util.writer.RollingFileWriter`
+per target directory and format, so the node writes a few large files
+instead of one small file per batch and process.
+
+Each batch is sent as one frame: the sizes of a small JSON header and of
+the payload, as two 4-byte big-endian integers, then the header, then the
+payload. The header names the target directory, format and compression.
+The payload is the batch exactly as the exporter would have written it, so
+files come out the same as without the spool. The server answers each
+frame with one byte, telling whether it accepted the batch. A frame over
+the server's size limits is read, discarded and rejected, leaving the
+connection usable for the next one.
+
+:class:`SpoolClient` falls back to direct writes whenever the spool isn't
+available: the socket is missing, the server is down or slow, or the write
+failed. It only tries to reconnect every ``retry_seconds``. A batch the
+server wrote but didn't get to acknowledge before the timeout is also
+written directly, so a batch is written at least once, not exactly once.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Sequence
+
+from databricks_opentelemetry_exporter.formats import check_output_format
+from databricks_opentelemetry_exporter.util.compression import check_compression
+from databricks_opentelemetry_exporter.util.durability import DURABILITY_MODES
+from databricks_opentelemetry_exporter.util.partitioning import PartitionedWriter
+from databricks_opentelemetry_exporter.util.writer import RollingFileWriter
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    tempfile.gettempdir(), "databricks-opentelemetry-spool.sock"
+)
+
+# Formats whose batches can be appended to one file as they are
+SPOOL_FORMATS = ("json", "otlp")
+
+_FRAME = struct.Struct(">II")
+_ACCEPTED = b"\x01"
+_REJECTED = b"\x00"
+_DISCARD_CHUNK = 1024 * 1024
+
+
+def encode_frame(header: dict, payload: bytes) -> bytes:
+    header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return _FRAME.pack(len(header), len(payload)) + header + payload
+
+
+class SpoolClient:
+    """
+    Sends batches to a :class:`SpoolServer`. :meth:`send` returns False
+    instead of raising whenever the batch should be written directly.
+
+    One client can be shared by several exporters. It is thread-safe and
+    reconnects in processes forked after it connected.
+    """
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        timeout: float = 5.0,
+        retry_seconds: float = 30.0,
+    ):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._socket = None
+        self._pid = None
+        self._retry_at = 0.0
+
+    @classmethod
+    def of(cls, spool) -> "SpoolClient":
+        """Client for an exporter's ``spool`` argument: True, a path or a client."""
+        if spool is None or spool is False:
+            return None
+        if isinstance(spool, cls):
+            return spool
+        if spool is True:
+            return cls()
+        return cls(str(spool))
+
+    def _disconnect(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+    def _connect(self) -> bool:
+        if time.monotonic() < self._retry_at:
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            self._retry_at = time.monotonic() + self.retry_seconds
+            return False
+        self._socket = sock
+        self._pid = os.getpid()
+        return True
+
+    def available(self) -> bool:
+        """False while backing off after the spool couldn't be reached."""
+        return self._socket is not None or time.monotonic() >= self._retry_at
+
+    def send(
+        self,
+        directory: str,
+        output_format: str,
+        compression: str,
+        compression_level: int,
+        payload: bytes,
+        records: int,
+    ) -> bool:
+        """Hand ``payload`` to the spool, returning whether it accepted it."""
+        header = {
+            "directory": os.path.abspath(directory),
+            "output_format": output_format,
+            "compression": compression,
+            "compression_level": compression_level,
+            "records": records,
+        }
+        frame = encode_frame(header, payload)
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child shares its parent's connection, don't use it
+                self._disconnect()
+            if self._socket is None and not self._connect():
+                return False
+            try:
+                self._socket.sendall(frame)
+                answer = self._socket.recv(1)
+            except OSError:
+                answer = b""
+            if not answer:
+                self._disconnect()
+                self._retry_at = time.monotonic() + self.retry_seconds
+                return False
+            return answer == _ACCEPTED
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.server.spool._connections.add(self.request)
+
+    def finish(self):
+        self.server.spool._connections.discard(self.request)
+        super().finish()
+
+    def _discard(self, size: int) -> bool:
+        """Skip ``size`` bytes of the stream, returning False at its end."""
+        while size:
+            chunk = self.rfile.read(min(size, _DISCARD_CHUNK))
+            if not chunk:
+                return False
+            size -= len(chunk)
+        return True
+
+    def handle(self):
+        spool = self.server.spool
+        while True:
+            sizes = self.rfile.read(_FRAME.size)
+            if len(sizes) < _FRAME.size:
+                return
+            header_size, payload_size = _FRAME.unpack(sizes)
+            if (
+                header_size > spool.max_header_bytes
+                or payload_size > spool.max_batch_bytes
+            ):
+                _logger.error(
+                    f"Spool batch with a {header_size} byte header and "
+                    f"{payload_size} byte payload is too large"
+                )
+                if not self._discard(header_size + payload_size):
+                    return
+                answer = _REJECTED
+            else:
+                header = self.rfile.read(header_size)
+                payload = self.rfile.read(payload_size)
+                if len(header) < header_size or len(payload) < payload_size:
+                    return
+                try:
+                    spool.write(json.loads(header), payload)
+                    answer = _ACCEPTED
+                except Exception as e:
+                    _logger.error(f"Error writing spooled batch: {str(e)}")
+                    answer = _REJECTED
+            try:
+                self.wfile.write(answer)
+            except OSError:
+                return
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class SpoolServer:
+    """
+    Accepts batches from :class:`SpoolClient` on ``socket_path`` and appends
+    them to rolled files, like an exporter with ``rolling=True`` would.
+
+    Clients may only have files written under ``allowed_directories``,
+    compared after resolving symlinks. The socket is created with
+    ``socket_mode``, by default readable and writable by the server's user
+    and group only. Frames with a header over ``max_header_bytes`` or a
+    payload over ``max_batch_bytes`` are rejected.
+    """
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        allowed_directories: Sequence[str] = (),
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_file_age_seconds: float = 60.0,
+        durability="on-roll",
+        socket_mode: int = 0o660,
+        max_batch_bytes: int = 64 * 1024 * 1024,
+        max_header_bytes: int = 64 * 1024,
+    ):
+        if not allowed_directories:
+            raise ValueError("allowed_directories must name at least one directory")
+        self.socket_path = socket_path
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age_seconds = max_file_age_seconds
+        self.durability = durability
+        self.allowed_directories = [os.path.realpath(d) for d in allowed_directories]
+        self.socket_mode = socket_mode
+        self.max_batch_bytes = max_batch_bytes
+        self.max_header_bytes = max_header_bytes
+        self.batches = 0
+        self.records = 0
+        self._writers = PartitionedWriter(self._make_writer)
+        self._connections = set()
+        # Guards _closed and _writing; shutdown() waits for writes to end
+        self._state = threading.Condition()
+        self._closed = False
+        self._writing = 0
+        self._server = None
+        self._thread = None
+
+    def _make_writer(self, key) -> RollingFileWriter:
+        directory, output_format, compression, compression_level = key
+        return RollingFileWriter(
+            directory,
+            suffix=check_output_format(output_format) + check_compression(compression),
+            max_bytes=self.max_file_bytes,
+            max_age_seconds=self.max_file_age_seconds,
+            compression=compression,
+            compression_level=compression_level,
+            durability=self.durability,
+        )
+
+    def _check_directory(self, directory: str) -> None:
+        directory = os.path.realpath(directory)
+        for allowed in self.allowed_directories:
+            if directory == allowed or directory.startswith(allowed + os.sep):
+                return
+        raise PermissionError(f"Spooling to {directory} isn't allowed")
+
+    def write(self, header: dict, payload: bytes) -> None:
+        """Append one batch described by a frame ``header``."""
+        output_format = header["output_format"]
+        if output_format not in SPOOL_FORMATS:
+            raise ValueError(f"Unsupported spool output_format: {output_format!r}")
+        directory = header["directory"]
+        self._check_directory(directory)
+        key = (
+            directory,
+            output_format,
+            header.get("compression"),
+            header.get("compression_level"),
+        )
+        records = header.get("records", 1)
+        with self._state:
+            if self._closed:
+                raise ValueError("Spool server is shut down")
+            self._writing += 1
+        written = False
+        try:
+            self._writers.get(key).write(payload, records)
+            written = True
+        finally:
+            with self._state:
+                self._writing -= 1
+                if written:
+                    self.batches += 1
+                    self.records += records
+                self._state.notify_all()
+
+    def _bind(self) -> None:
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                # Left behind by a server that didn't shut down cleanly
+                os.unlink(self.socket_path)
+            else:
+                raise OSError(f"A spool server is running on {self.socket_path}")
+            finally:
+                probe.close()
+        self._server = _UnixServer(self.socket_path, _Handler)
+        self._server.spool = self
+        os.chmod(self.socket_path, self.socket_mode)
+
+    def start(self) -> "SpoolServer":
+        """Listen and serve in a background thread."""
+        self._bind()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.1},
+            name="SpoolServer",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def flush(self) -> None:
+        """Publish the files currently being written."""
+        self._writers.flush()
+
+    def shutdown(self) -> None:
+        """Stop listening and publish every open file."""
+        with self._state:
+            self._closed = True
+            self._state.wait_for(lambda: self._writing == 0)
+        # Clients see their connection close and write directly from now on
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._writers.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m databricks_opentelemetry_exporter.spool",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="socket path")
+    parser.add_argument(
+        "--allowed-directory",
+        action="append",
+        dest="allowed_directories",
+        required=True,
+        help="only write under this directory (repeatable)",
+    )
+    parser.add_argument("--max-file-mb", type=float, default=64)
+    parser.add_argument("--max-file-age-seconds", type=float, default=60)
+    parser.add_argument("--durability", default="on-roll", choices=DURABILITY_MODES)
+    parser.add_argument(
+        "--socket-mode",
+        type=lambda mode: int(mode, 8),
+        default=0o660,
+        help="permissions of the socket, in octal (default: 660)",
+    )
+    args = parser.parse_args(argv)
+
+    server = SpoolServer(
+        args.socket,
+        allowed_directories=args.allowed_directories,
+        max_file_bytes=int(args.max_file_mb * 1024 * 1024),
+        max_file_age_seconds=args.max_file_age_seconds,
+        durability=args.durability,
+        socket_mode=args.socket_mode,
+    )
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    server.start()
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,42 +5,308 @@ from opentelemetry.sdk.trace.export import (
 )
 
 from typing import Callable, Sequence
-from uuid import uuid4
+import logging
 import os
-import json
+import time
+
+from databricks_opentelemetry_exporter.formats import check_output_format, check_resource_mode
+from databricks_opentelemetry_exporter.formats import otlp
+from databricks_opentelemetry_exporter.spool import SpoolClient
+from databricks_opentelemetry_exporter.util.compression import (
+    check_compression,
+    open_compressed,
+)
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+from databricks_opentelemetry_exporter.util.encoding import (
+    encode_resource_header,
+    encode_span_batch,
+    group_by_resource,
+)
+from databricks_opentelemetry_exporter.util.index import FileIndex, write_index
+from databricks_opentelemetry_exporter.util.partitioning import (
+    PartitionedWriter,
+    Partitioner,
+)
+from databricks_opentelemetry_exporter.util.telemetry import ExporterTelemetry
+from databricks_opentelemetry_exporter.util.uuids import uuid7
+from databricks_opentelemetry_exporter.util.wal import WriteAheadQueue
+
+_logger = logging.getLogger(__name__)
+
 
 class DatabricksVolumeTraceExporter(SpanExporter):
     """
     Implementation of :class:`SpanExporter` that writes trace spans to a
-    random file in a Databricks Volume.
+    time-ordered ``{uuid7()}`` file in a Databricks Volume.
 
     This class will only work on Databricks. It requires a volume to be mounted.
+
+    ``compression`` (``"gzip"`` or ``"zstd"``) produces ``.json.gz`` or
+    ``.json.zst`` files at ``compression_level``.
+
+    Without a ``formatter`` spans are encoded as compact JSON objects with the
+    fields of ``ReadableSpan.to_json()``, one per line.
+
+    ``output_format="otlp"`` writes length-delimited OTLP protobuf ``.binpb``
+    files instead of JSON. ``output_format="parquet"`` buffers spans into
+    rolled Parquet files with a fixed schema, limited by ``max_file_bytes``,
+    ``max_file_records`` and ``max_file_age_seconds``; ``compression`` then
+    selects the Parquet codec (requires ``pyarrow``).
+
+    ``resource_mode="header"`` writes the resource once per file in a header
+    line instead of embedding it in every JSON span.
+
+    ``durability`` (a mode name or a shared
+    :class:`~databricks_opentelemetry_exporter.util.durability.DurabilityPolicy`)
+    controls fsync; by default files are not fsynced.
+
+    ``partition_by`` writes files into Hive-style partition directories such
+    as ``signal=traces/date=YYYY-MM-DD/hour=HH/host=<host>/`` (see
+    :mod:`databricks_opentelemetry_exporter.util.partitioning`). Spans are
+    placed by the start time of the earliest span of their trace in the
+    batch, so a trace isn't split across partitions.
+
+    With ``index=True`` every finished file gets an index sidecar (see
+    :mod:`databricks_opentelemetry_exporter.util.index`).
+
+    ``spool`` sends batches to the node's spool server instead of writing
+    one file per batch, falling back to direct writes when it is unavailable
+    (see :mod:`databricks_opentelemetry_exporter.spool`). Spooling doesn't
+    support Parquet output or ``index``.
+
+    ``wal`` (``True``, a local directory or a
+    :class:`~databricks_opentelemetry_exporter.util.wal.WriteAheadQueue`)
+    queues batches on local disk when writing them to the volume fails, and
+    retries them in the background, instead of failing the export. Parquet
+    output doesn't support ``wal``.
+
+    The exporter records its latency, throughput and failures with the meter
+    of ``meter_provider``, by default the global one (see
+    :mod:`databricks_opentelemetry_exporter.util.telemetry`).
     """
 
     def __init__(
         self,
         trace_dir: str = None,
-        formatter: Callable[[ReadableSpan], str] = lambda span: json.dumps(span.to_json(), default=str) + '\n',
+        formatter: Callable[[ReadableSpan], str] = None,
+        compression: str = None,
+        compression_level: int = None,
+        output_format: str = "json",
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_file_age_seconds: float = 300.0,
+        max_file_records: int = None,
+        resource_mode: str = "inline",
+        durability="none",
+        partition_by=None,
+        index: bool = False,
+        spool=None,
+        wal=None,
+        meter_provider=None,
     ):
         if not trace_dir:
             raise ValueError("trace_dir must be provided")
+        check_resource_mode(resource_mode, output_format, formatter)
+        if spool and (output_format == "parquet" or index):
+            raise ValueError("spool doesn't support Parquet output or index")
+        if wal and output_format == "parquet":
+            raise ValueError("wal doesn't support Parquet output")
         self.trace_dir = trace_dir
         self.formatter = formatter
-        self.file = None
+        self.compression = compression
+        self.compression_level = compression_level
+        self.output_format = output_format
+        self.resource_mode = resource_mode
+        self.index = index
+        self.durability = DurabilityPolicy.of(durability)
+        self._spool = SpoolClient.of(spool)
+        self._wal = WriteAheadQueue.of(wal, durability=self.durability)
+        self._telemetry = ExporterTelemetry("traces", meter_provider)
+        if self._wal is not None:
+            wal_queue = self._wal
+            self._telemetry.observe_queue(
+                "wal", wal_queue, wal_queue.__len__, lambda: wal_queue.evicted
+            )
+        self._writer = None
+        self._partitioner = None
+        if partition_by:
+            self._partitioner = Partitioner(trace_dir, "traces", partition_by)
+        if output_format == "parquet":
+            from databricks_opentelemetry_exporter.formats import parquet
 
-    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
-        filename = f"{uuid4()}.json"
-        filepath = os.path.join(self.trace_dir, filename)
-        print(f"Writing trace spans to file: {filepath}")
-        self.file = open(filepath, "w")
+            self.suffix = check_output_format(output_format)
+            self._columns = parquet.span_columns
+
+            def make_writer(directory):
+                return parquet.ParquetFileWriter(
+                    directory,
+                    parquet.SPAN_SCHEMA,
+                    compression=compression or "zstd",
+                    max_bytes=max_file_bytes,
+                    max_age_seconds=max_file_age_seconds,
+                    max_records=max_file_records,
+                    durability=self.durability,
+                    index=index,
+                    on_publish=self._telemetry.published,
+                )
 
+            if self._partitioner is not None:
+                self._writer = PartitionedWriter(make_writer)
+            else:
+                self._writer = make_writer(trace_dir)
+        else:
+            self.suffix = check_output_format(output_format) + check_compression(compression)
+
+    def _partitions(self, spans: Sequence[ReadableSpan]):
+        if self._partitioner is None:
+            return [(self.trace_dir, spans)]
+        trace_start = {}
         for span in spans:
-            self.file.write(self.formatter(span))
-        self.file.flush()
-        self.file.close()
-        self.file = None
+            trace_id = span.context.trace_id
+            start = trace_start.get(trace_id)
+            if start is None or span.start_time < start:
+                trace_start[trace_id] = span.start_time
+        return self._partitioner.split(
+            spans, lambda span: trace_start[span.context.trace_id]
+        )
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        return self._export(spans)
+
+    @property
+    def encoding(self) -> str:
+        """
+        The shared encoding (``"json"`` or ``"otlp"``, see
+        :mod:`databricks_opentelemetry_exporter.fanout`) that
+        :meth:`export_encoded` accepts, or None if spans have to be encoded by
+        the exporter itself.
+        """
+        if (
+            self._partitioner is not None
+            or self.formatter is not None
+            or self.resource_mode != "inline"
+        ):
+            return None
+        if self.output_format in ("json", "otlp"):
+            return self.output_format
+        return None
+
+    def export_encoded(
+        self, spans: Sequence[ReadableSpan], payload: bytes
+    ) -> SpanExportResult:
+        """Export ``spans``, already encoded as ``payload`` in :attr:`encoding`."""
+        if self.encoding is None:
+            raise ValueError("This exporter doesn't accept encoded batches")
+        if self.output_format == "otlp":
+            payload = otlp.frame(payload)
+        return self._export(spans, payload)
+
+    def _export(
+        self, spans: Sequence[ReadableSpan], encoded: bytes = None
+    ) -> SpanExportResult:
+        start = time.perf_counter()
+        try:
+            for directory, group in self._partitions(spans):
+                self._export_partition(directory, group, encoded)
+        except Exception as e:
+            _logger.error(f"Error exporting spans: {str(e)}")
+            self._telemetry.failed()
+            self._telemetry.exported(start, ok=False)
+            return SpanExportResult.FAILURE
+        self._telemetry.exported(start)
         return SpanExportResult.SUCCESS
 
+    def _export_partition(
+        self, directory: str, spans: Sequence[ReadableSpan], encoded: bytes = None
+    ) -> None:
+        start = time.perf_counter()
+        if self._writer is not None:
+            writer = self._writer
+            if self._partitioner is not None:
+                writer = writer.get(directory)
+            columns = self._columns(spans)
+            start = self._telemetry.phase("serialize", start)
+            writer.write_rows(
+                columns,
+                len(spans),
+                update_index=lambda index: index.add_spans(spans),
+            )
+            self._telemetry.phase("write", start)
+            self._telemetry.written(len(spans))
+            return
+
+        if encoded is not None:
+            payload = encoded
+        elif self.output_format == "otlp":
+            payload = otlp.encode_span_batch(spans)
+        elif self.resource_mode == "header":
+            payload = b"".join(
+                encode_resource_header(resource)
+                + encode_span_batch(group, include_resource=False)
+                for resource, group in group_by_resource(spans, lambda span: span.resource)
+            )
+        elif self.formatter is None:
+            payload = encode_span_batch(spans)
+        else:
+            payload = "".join(self.formatter(span) for span in spans).encode("utf-8")
+        start = self._telemetry.phase("serialize", start)
+        if self._spool is not None and self._spool.send(
+            directory,
+            self.output_format,
+            self.compression,
+            self.compression_level,
+            payload,
+            len(spans),
+        ):
+            self._telemetry.phase("write", start)
+            self._telemetry.written(len(spans), len(payload))
+            return
+
+        filename = f"{uuid7()}{self.suffix}"
+        filepath = os.path.join(directory, filename)
+        file = None
+        try:
+            file = open_compressed(filepath, self.compression, self.compression_level)
+            file.write(payload)
+            start = self._telemetry.phase("write", start)
+            self.durability.commit(file, len(payload))
+            file.close()
+            self._telemetry.phase("fsync", start)
+        except Exception:
+            if file is not None:
+                try:
+                    file.close()
+                except Exception:
+                    pass
+                # Don't leave a partial file behind
+                try:
+                    os.unlink(filepath)
+                except OSError:
+                    pass
+            if self._wal is None:
+                raise
+            # Retried under the name it would have had
+            self._wal.put(
+                directory, filename, payload, self.compression, self.compression_level
+            )
+            return
+        self._telemetry.written(len(spans), len(payload))
+        self._telemetry.published()
+        if self.index:
+            index = FileIndex()
+            index.add_spans(spans)
+            write_index(filepath, index)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        if self._writer is not None:
+            self._writer.flush()
+        if self._wal is not None:
+            return self._wal.drain()
+        return True
+
     def shutdown(self):
-        if self.file:
-            self.file.close()
+        if self._writer is not None:
+            self._writer.close()
+        if self._spool is not None:
+            self._spool.close()
+        if self._wal is not None:
+            self._wal.shutdown()
@@ -0,0 +1,289 @@
+"""
+Tail-based sampling in front of a span exporter.
+
+:class:`TailSamplingSpanProcessor` buffers finished spans by trace id and
+decides per trace, once the trace's local root span has ended or
+``decision_wait_millis`` after its first span, whether to keep it. A trace
+is kept when any rule matches. Rules are callables taking the trace's spans;
+this module provides the common ones:
+
+* :func:`error_rule` - any span has an error status;
+* :func:`latency_rule` - the trace is longer than a threshold;
+* :func:`attribute_rule` - a span attribute is present or has given values;
+* :func:`probabilistic_rule` - a deterministic share of all traces, by id.
+
+Kept traces are queued and exported together every ``export_interval_millis``,
+or as soon as ``max_export_batch_size`` spans are queued, with the spans of
+each trace adjacent, so one
+:class:`~databricks_opentelemetry_exporter.traces.export.DatabricksVolumeTraceExporter`
+file holds complete traces. Exports hold at most ``max_export_batch_size``
+spans and only split traces larger than that.
+"""
+import collections
+import logging
+import threading
+import time
+from typing import Callable, Iterable, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.trace import StatusCode
+
+_logger = logging.getLogger(__name__)
+
+Rule = Callable[[Sequence[ReadableSpan]], bool]
+
+
+def error_rule() -> Rule:
+    """Keep traces with at least one span with an error status."""
+
+    def rule(spans):
+        return any(span.status.status_code is StatusCode.ERROR for span in spans)
+
+    return rule
+
+
+def latency_rule(threshold_millis: float) -> Rule:
+    """Keep traces whose spans cover more than ``threshold_millis``."""
+    threshold_ns = threshold_millis * 1_000_000
+
+    def rule(spans):
+        start = min(span.start_time for span in spans)
+        end = max(span.end_time for span in spans)
+        return end - start > threshold_ns
+
+    return rule
+
+
+def attribute_rule(key: str, values: Iterable = None) -> Rule:
+    """
+    Keep traces with a span that has attribute ``key``, or, with ``values``,
+    one whose ``key`` is one of ``values``.
+    """
+    values = None if values is None else frozenset(values)
+
+    def rule(spans):
+        for span in spans:
+            attributes = span.attributes or {}
+            if key in attributes and (values is None or attributes[key] in values):
+                return True
+        return False
+
+    return rule
+
+
+def probabilistic_rule(ratio: float) -> Rule:
+    """
+    Keep ``ratio`` of all traces. The decision only depends on the trace id,
+    like ``TraceIdRatioBased``, so every process keeps the same traces.
+    """
+    bound = round(ratio * (1 << 64))
+
+    def rule(spans):
+        return (spans[0].context.trace_id & 0xFFFFFFFFFFFFFFFF) < bound
+
+    return rule
+
+
+class _Trace:
+    __slots__ = ("spans", "first_seen")
+
+    def __init__(self):
+        self.spans = []
+        self.first_seen = time.monotonic()
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    :class:`SpanProcessor` that buffers spans per trace and only exports the
+    traces at least one of ``rules`` keeps (by default: traces with errors).
+
+    At most ``max_buffered_spans`` spans are held; beyond that the oldest
+    trace is decided early on the spans seen so far. Decisions are remembered
+    for the last ``max_decided_traces`` traces, so spans that end after the
+    decision follow it.
+
+    At most ``max_queue_size`` kept spans wait for export. Kept traces that
+    don't fit are dropped and counted in ``dropped_spans``; spans the
+    exporter failed on are counted in ``failed_spans``, and make
+    :meth:`force_flush` return False.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        rules: Sequence[Rule] = None,
+        decision_wait_millis: float = 10_000,
+        max_buffered_spans: int = 100_000,
+        max_decided_traces: int = 100_000,
+        export_interval_millis: float = 5_000,
+        max_queue_size: int = 100_000,
+        max_export_batch_size: int = 10_000,
+    ):
+        if max_export_batch_size < 1:
+            raise ValueError("max_export_batch_size must be at least 1")
+        self.exporter = exporter
+        self.rules = list(rules) if rules is not None else [error_rule()]
+        self.decision_wait_millis = decision_wait_millis
+        self.max_buffered_spans = max_buffered_spans
+        self.max_decided_traces = max_decided_traces
+        self.export_interval_millis = export_interval_millis
+        self.max_queue_size = max_queue_size
+        self.max_export_batch_size = max_export_batch_size
+
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        # trace id -> _Trace, oldest first
+        self._traces = collections.OrderedDict()
+        self._buffered_spans = 0
+        # trace id -> kept, for spans that end after the decision
+        self._decided = collections.OrderedDict()
+        # Spans to export, one list per kept trace or late span
+        self._ready = collections.deque()
+        self._ready_spans = 0
+
+        self.kept_traces = 0
+        self.dropped_traces = 0
+        self.dropped_spans = 0
+        self.failed_spans = 0
+
+        self._shutdown_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="TailSamplingSpanProcessor", daemon=True
+        )
+        self._thread.start()
+
+    def on_start(self, span, parent_context=None) -> None:
+        pass
+
+    def _keep(self, spans: Sequence[ReadableSpan]) -> bool:
+        for rule in self.rules:
+            try:
+                if rule(spans):
+                    return True
+            except Exception as e:
+                _logger.error(f"Error in tail sampling rule: {str(e)}")
+        return False
+
+    def _queue(self, spans: list) -> None:
+        # Called with _lock held
+        if self._ready_spans + len(spans) > self.max_queue_size:
+            if not self.dropped_spans:
+                _logger.warning("Tail sampling export queue full, dropping kept spans")
+            self.dropped_spans += len(spans)
+            return
+        self._ready.append(spans)
+        self._ready_spans += len(spans)
+        if self._ready_spans >= self.max_export_batch_size:
+            self._wakeup.set()
+
+    def _decide(self, trace_id: int) -> None:
+        # Called with _lock held
+        trace = self._traces.pop(trace_id)
+        self._buffered_spans -= len(trace.spans)
+        kept = self._keep(trace.spans)
+        if kept:
+            self.kept_traces += 1
+            self._queue(trace.spans)
+        else:
+            self.dropped_traces += 1
+        self._decided[trace_id] = kept
+        if len(self._decided) > self.max_decided_traces:
+            self._decided.popitem(last=False)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context is None:
+            return
+        trace_id = span.context.trace_id
+        with self._lock:
+            kept = self._decided.get(trace_id)
+            if kept is not None:
+                if kept:
+                    self._queue([span])
+                return
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                trace = self._traces[trace_id] = _Trace()
+            trace.spans.append(span)
+            self._buffered_spans += 1
+            if span.parent is None or span.parent.is_remote:
+                # The local root ends last, the trace is complete in this process
+                self._decide(trace_id)
+            while self._buffered_spans > self.max_buffered_spans and self._traces:
+                self._decide(next(iter(self._traces)))
+
+    def _decide_expired(self) -> None:
+        deadline = time.monotonic() - self.decision_wait_millis / 1000
+        with self._lock:
+            while self._traces:
+                trace_id, trace = next(iter(self._traces.items()))
+                if trace.first_seen > deadline:
+                    break
+                self._decide(trace_id)
+
+    def _take_batch(self) -> list:
+        """Up to ``max_export_batch_size`` queued spans, whole traces where possible."""
+        with self._lock:
+            batch = []
+            while self._ready:
+                spans = self._ready[0]
+                room = self.max_export_batch_size - len(batch)
+                if len(spans) <= room:
+                    batch.extend(self._ready.popleft())
+                elif batch:
+                    break
+                else:
+                    # A trace larger than a batch is split
+                    batch.extend(spans[:room])
+                    self._ready[0] = spans[room:]
+                    break
+            self._ready_spans -= len(batch)
+            return batch
+
+    def _export_ready(self) -> bool:
+        """Export the queued spans, returning whether every export succeeded."""
+        ok = True
+        with self._export_lock:
+            # Spans queued meanwhile wait for the next call
+            remaining = self._ready_spans
+            while remaining > 0:
+                spans = self._take_batch()
+                if not spans:
+                    break
+                remaining -= len(spans)
+                try:
+                    exported = self.exporter.export(spans) is SpanExportResult.SUCCESS
+                    if not exported:
+                        _logger.error(f"Exporting {len(spans)} sampled spans failed")
+                except Exception as e:
+                    _logger.error(f"Error exporting sampled traces: {str(e)}")
+                    exported = False
+                if not exported:
+                    ok = False
+                    self.failed_spans += len(spans)
+        return ok
+
+    def _run(self) -> None:
+        interval = min(self.export_interval_millis, self.decision_wait_millis) / 1000
+        while not self._shutdown_event.is_set():
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            if self._shutdown_event.is_set():
+                return
+            self._decide_expired()
+            self._export_ready()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Decide every buffered trace now and export the kept ones."""
+        with self._lock:
+            while self._traces:
+                self._decide(next(iter(self._traces)))
+        return self._export_ready() and self.exporter.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self._shutdown_event.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.force_flush()
+        self.exporter.shutdown()
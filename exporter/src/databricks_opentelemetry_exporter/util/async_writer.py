@@ -0,0 +1,142 @@
+import collections
+import logging
+import threading
+import time
+from typing import Callable, List, Sequence
+
+_logger = logging.getLogger(__name__)
+
+# What submit() does when the queue already holds max_queue_size batches
+QUEUE_FULL_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+class AsyncBatchWriter:
+    """
+    Hands batches to a dedicated writer thread through a bounded queue.
+
+    ``submit()`` returns as soon as the batch is queued, so a slow write or
+    fsync never stalls the caller. While one write is in progress the next
+    batches accumulate in the queue; the writer thread then takes everything
+    that is queued (up to ``max_coalesce_records``) and passes it to
+    ``write_batch`` as one combined batch.
+
+    When the queue is full, ``queue_full_policy`` decides what happens:
+    ``"block"`` waits up to ``block_timeout_millis`` for room and then drops
+    the new batch, ``"drop_newest"`` drops the new batch immediately and
+    ``"drop_oldest"`` evicts the oldest queued batch to make room.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List], None],
+        max_queue_size: int = 64,
+        queue_full_policy: str = "block",
+        block_timeout_millis: float = 10_000,
+        max_coalesce_records: int = 8192,
+        name: str = "DatabricksVolumeWriter",
+    ):
+        if queue_full_policy not in QUEUE_FULL_POLICIES:
+            raise ValueError(
+                f"Unsupported queue_full_policy: {queue_full_policy!r}, "
+                f"expected one of {list(QUEUE_FULL_POLICIES)}"
+            )
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        self._write_batch = write_batch
+        self.max_queue_size = max_queue_size
+        self.queue_full_policy = queue_full_policy
+        self.block_timeout_millis = block_timeout_millis
+        self.max_coalesce_records = max_coalesce_records
+
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._shutdown = False
+
+        self.dropped_batches = 0
+        self.dropped_records = 0
+        self.failed_batches = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of batches waiting to be written."""
+        return len(self._queue)
+
+    def _drop(self, batch: Sequence) -> None:
+        self.dropped_batches += 1
+        self.dropped_records += len(batch)
+
+    def submit(self, batch: Sequence) -> bool:
+        """Queue ``batch`` for writing. Returns False if it was dropped."""
+        batch = list(batch)
+        with self._condition:
+            if self._shutdown:
+                self._drop(batch)
+                return False
+            if len(self._queue) >= self.max_queue_size:
+                if self.queue_full_policy == "drop_oldest":
+                    self._drop(self._queue.popleft())
+                elif self.queue_full_policy == "drop_newest":
+                    self._drop(batch)
+                    return False
+                else:
+                    deadline = time.monotonic() + self.block_timeout_millis / 1000
+                    while len(self._queue) >= self.max_queue_size and not self._shutdown:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._condition.wait(remaining):
+                            break
+                    if len(self._queue) >= self.max_queue_size or self._shutdown:
+                        self._drop(batch)
+                        return False
+            self._queue.append(batch)
+            self._condition.notify_all()
+        return True
+
+    def _take(self) -> List:
+        # Called with the condition held and a non-empty queue
+        combined = self._queue.popleft()
+        while self._queue and len(combined) + len(self._queue[0]) <= self.max_coalesce_records:
+            combined.extend(self._queue.popleft())
+        self._in_flight += 1
+        self._condition.notify_all()
+        return combined
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = self._take()
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                _logger.error(f"Error writing batch of {len(batch)} records: {str(e)}")
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def flush(self, timeout_millis: float = 30_000) -> bool:
+        """Wait until every queued batch is written. Returns False on timeout."""
+        deadline = time.monotonic() + timeout_millis / 1000
+        with self._condition:
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000) -> bool:
+        """Drain the queue, then stop the writer thread."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        self._thread.join(timeout_millis / 1000)
+        return not self._thread.is_alive()
@@ -0,0 +1,237 @@
+import gzip
+import io
+import mmap
+import struct
+import zlib
+
+# File name suffix appended after the format suffix (e.g. ".json.gz")
+COMPRESSION_SUFFIXES = {
+    None: "",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+DEFAULT_COMPRESSION_LEVELS = {
+    "gzip": 6,
+    "zstd": 3,
+}
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd compression requires the 'zstandard' package; "
+            "install databricks-opentelemetry-exporter[zstd]"
+        )
+    return zstandard
+
+
+def check_compression(compression: str) -> str:
+    """Validate a compression name, returning its file name suffix."""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(
+            f"Unsupported compression: {compression!r}, "
+            f"expected one of {list(COMPRESSION_SUFFIXES)}"
+        )
+    if compression == "zstd":
+        _import_zstandard()
+    return COMPRESSION_SUFFIXES[compression]
+
+
+class CompressedFile:
+    """
+    Binary file that streams everything written to it through a compressor.
+
+    ``flush()`` emits a sync point, so every byte written before it can be
+    decompressed even if the process dies before ``close()``. ``tell()`` and
+    ``fileno()`` refer to the underlying (compressed) file.
+    :meth:`end_at` ends the stream at an earlier sync point.
+    """
+
+    def __init__(self, raw, compression: str, level: int = None):
+        self.raw = raw
+        self.compression = compression
+        self._finished = False
+        # Uncompressed CRC and size, for a gzip trailer at a sync point
+        self._crc = 0
+        self._size = 0
+        self._flushed = None
+        self._sync_point = None
+        if level is None:
+            level = DEFAULT_COMPRESSION_LEVELS[compression]
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level)
+            self._flush = self._stream.flush
+        else:
+            zstandard = _import_zstandard()
+            self._stream = zstandard.ZstdCompressor(level=level).stream_writer(
+                raw, closefd=False
+            )
+            self._flush = lambda: self._stream.flush(zstandard.FLUSH_BLOCK)
+
+    def write(self, data: bytes) -> int:
+        if self.compression == "gzip":
+            self._crc = zlib.crc32(data, self._crc)
+            self._size += len(data)
+        return self._stream.write(data)
+
+    def flush(self) -> None:
+        self._flush()
+        self.raw.flush()
+        self._flushed = (self.raw.tell(), self._crc, self._size)
+
+    def sync_point(self) -> int:
+        """Mark the last ``flush()`` as the point :meth:`end_at` returns to."""
+        self._sync_point = self._flushed
+        return self._sync_point[0]
+
+    def end_at(self, offset: int) -> None:
+        """
+        End the stream at ``offset``, the last :meth:`sync_point`, dropping
+        everything written after it. Nothing can be written afterwards.
+        """
+        if self._sync_point is None or self._sync_point[0] != offset:
+            raise ValueError(f"Not the last sync point: {offset}")
+        _, crc, size = self._sync_point
+        self.raw.truncate(offset)
+        self.raw.seek(offset)
+        if self.compression == "gzip":
+            # An empty final stored block, then the trailer of the data so far
+            self.raw.write(b"\x01\x00\x00\xff\xff")
+            self.raw.write(struct.pack("<II", crc, size & 0xFFFFFFFF))
+            # Keep the GzipFile from writing a trailer of its own
+            self._stream.fileobj = None
+        else:
+            # An empty last block ends the frame
+            self.raw.write(b"\x01\x00\x00")
+        self.raw.flush()
+        self._finished = True
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    def fileno(self) -> int:
+        return self.raw.fileno()
+
+    def finish(self) -> None:
+        """End the compressed stream, writing its trailer, but keep the file open."""
+        if not self._finished:
+            self._finished = True
+            self._stream.close()
+            self.raw.flush()
+
+    def close(self) -> None:
+        try:
+            self.finish()
+        finally:
+            self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_compressed(
+    path: str, compression: str = None, level: int = None, mode: str = "xb"
+):
+    """
+    Open ``path`` for binary writing, compressing with ``compression``.
+
+    The default ``"xb"`` mode fails with ``FileExistsError`` instead of
+    overwriting an existing file.
+    """
+    raw = open(path, mode)
+    if compression is None:
+        return raw
+    try:
+        return CompressedFile(raw, compression, level)
+    except Exception:
+        raw.close()
+        raise
+
+
+def finish_file(file) -> None:
+    """Write out everything buffered for ``file``, including any trailer."""
+    if isinstance(file, CompressedFile):
+        file.finish()
+    else:
+        file.flush()
+
+
+def compression_from_path(path: str) -> str:
+    """Infer the compression of an exported file from its name."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if suffix and str(path).endswith(suffix):
+            return compression
+    return None
+
+
+class _MappedFile:
+    """Read-only view of a memory-mapped file, optionally through a decompressor."""
+
+    def __init__(self, stream, mapped, raw):
+        self._stream = stream
+        self._mapped = mapped
+        self._raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+    def readline(self) -> bytes:
+        return self._stream.readline()
+
+    def __iter__(self):
+        return iter(self._stream.readline, b"")
+
+    def close(self) -> None:
+        try:
+            if self._stream is not self._mapped:
+                self._stream.close()
+        finally:
+            self._mapped.close()
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_decompressed(path: str, use_mmap: bool = False):
+    """
+    Open an exported file for binary reading, decompressing by suffix.
+
+    With ``use_mmap`` the file is memory-mapped rather than read through
+    buffered ``read()`` calls, which saves a copy for large local files.
+    """
+    compression = compression_from_path(path)
+    if use_mmap:
+        raw = open(path, "rb")
+        try:
+            mapped = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            raw.close()
+        else:
+            if compression == "gzip":
+                stream = gzip.GzipFile(fileobj=mapped, mode="rb")
+            elif compression == "zstd":
+                zstandard = _import_zstandard()
+                stream = io.BufferedReader(
+                    zstandard.ZstdDecompressor().stream_reader(mapped, closefd=False)
+                )
+            else:
+                stream = mapped
+            return _MappedFile(stream, mapped, raw)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        zstandard = _import_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.BufferedReader(reader)
+    return open(path, "rb")
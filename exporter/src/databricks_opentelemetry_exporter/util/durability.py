@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+from databricks_opentelemetry_exporter.util.compression import CompressedFile, finish_file
+
+DURABILITY_MODES = ("none", "per-batch", "interval", "on-roll")
+
+
+class DurabilityPolicy:
+    """
+    Decides when exporters fsync the files they write.
+
+    * ``"none"`` never fsyncs and leaves flushing to the OS.
+    * ``"per-batch"`` fsyncs after every batch is written.
+    * ``"interval"`` group-commits: every file written since the last fsync,
+      including files closed in the meantime, is fsynced together once
+      ``interval_millis`` have passed or ``interval_bytes`` have been written,
+      whichever comes first. At most that much data can be lost on a crash.
+    * ``"on-roll"`` fsyncs once when a file is closed, i.e. once per file for
+      file-per-batch exporters and once per rolled file for rolling writers.
+
+    One policy can be shared by several exporters so that they commit as a
+    group.
+    """
+
+    def __init__(
+        self,
+        mode: str = "per-batch",
+        interval_millis: float = 1000,
+        interval_bytes: int = None,
+    ):
+        if mode not in DURABILITY_MODES:
+            raise ValueError(
+                f"Unsupported durability mode: {mode!r}, "
+                f"expected one of {list(DURABILITY_MODES)}"
+            )
+        self.mode = mode
+        self.interval_millis = interval_millis
+        self.interval_bytes = interval_bytes
+        self._lock = threading.Lock()
+        # File written since the last fsync -> duplicate of its descriptor,
+        # which stays valid after the file is closed or renamed
+        self._pending = {}
+        self._pending_bytes = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+        self.syncs = 0
+
+    @classmethod
+    def of(cls, durability) -> "DurabilityPolicy":
+        """Accept either a policy or a mode name."""
+        if isinstance(durability, DurabilityPolicy):
+            return durability
+        return cls(durability)
+
+    def _sync(self, file) -> None:
+        os.fsync(file.fileno())
+        self.syncs += 1
+
+    def _due(self) -> bool:
+        if self.interval_bytes and self._pending_bytes >= self.interval_bytes:
+            return True
+        return (time.monotonic() - self._last_sync) * 1000 >= self.interval_millis
+
+    def _take_pending(self) -> list:
+        """Descriptors to fsync, resetting the interval. Called with _lock held."""
+        fds = list(self._pending.values())
+        self._pending = {}
+        self._pending_bytes = 0
+        self._last_sync = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return fds
+
+    def _sync_fds(self, fds) -> None:
+        for fd in fds:
+            try:
+                os.fsync(fd)
+                self.syncs += 1
+            finally:
+                os.close(fd)
+
+    def _add_pending(self, file, nbytes: int) -> None:
+        with self._lock:
+            if file not in self._pending:
+                self._pending[file] = os.dup(file.fileno())
+            self._pending_bytes += nbytes
+            if self._due():
+                fds = self._take_pending()
+            else:
+                fds = []
+                if self._timer is None:
+                    # Sync files that see no further writes once the interval ends
+                    elapsed = time.monotonic() - self._last_sync
+                    delay = max(self.interval_millis / 1000 - elapsed, 0)
+                    self._timer = threading.Timer(delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        self._sync_fds(fds)
+
+    def flush(self) -> None:
+        """fsync every file written since the last fsync now."""
+        with self._lock:
+            fds = self._take_pending()
+        self._sync_fds(fds)
+
+    def after_write(self, file, nbytes: int) -> None:
+        """Call after a batch of ``nbytes`` was written and flushed to ``file``."""
+        if self.mode == "per-batch":
+            self._sync(file)
+        elif self.mode == "interval":
+            self._add_pending(file, nbytes)
+
+    def before_close(self, file) -> None:
+        """Call once everything, including any trailer, is written to ``file``."""
+        if self.mode == "on-roll":
+            self._sync(file)
+        elif self.mode == "interval":
+            # A compression trailer is written after the last batch
+            with self._lock:
+                pending = file in self._pending
+            if pending or isinstance(file, CompressedFile):
+                self._add_pending(file, 0)
+
+    def commit(self, file, nbytes: int) -> None:
+        """
+        Finish a file that was written in one go (one batch per file), so it
+        is fsynced at most once, after any compression trailer.
+        """
+        finish_file(file)
+        if self.mode in ("per-batch", "on-roll"):
+            self._sync(file)
+        elif self.mode == "interval":
+            self._add_pending(file, nbytes)
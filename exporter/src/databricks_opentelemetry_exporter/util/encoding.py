@@ -0,0 +1,300 @@
+"""
+Compact, allocation-light JSON encoding for logs, spans and metrics.
+
+The encoders walk the SDK objects directly into plain dicts with the same
+fields as their ``to_json()`` methods, and serialize them without
+indentation. A batch is encoded into a single ``bytes`` buffer of newline
+delimited records, so exporters can write it with one ``write()`` call.
+``orjson`` is used when it is installed.
+"""
+import datetime
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+_logger = logging.getLogger(__name__)
+
+_json_encoder = json.JSONEncoder(
+    separators=(",", ":"), ensure_ascii=False, default=str
+)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return _json_encoder.encode(obj).encode("utf-8")
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize ``obj`` to compact JSON bytes."""
+        try:
+            return orjson.dumps(obj, default=str)
+        except TypeError:
+            # orjson rejects e.g. integers wider than 64 bits
+            return _json_dumps(obj)
+
+else:
+    dumps = _json_dumps
+
+
+_iso_cache = (None, "")
+
+
+def ns_to_iso_str(nanoseconds: Optional[int]) -> Optional[str]:
+    """
+    Same output as ``opentelemetry.sdk.util.ns_to_iso_str``, caching the
+    formatted seconds since records in a batch share most of them.
+
+    Rounding to microseconds is done in integer arithmetic, so it can differ
+    from the SDK's float based rounding by 1us when a value sits right on the
+    rounding boundary.
+    """
+    global _iso_cache
+    if nanoseconds is None:
+        return None
+    seconds, micros = divmod((int(nanoseconds) + 500) // 1000, 1_000_000)
+    cached_seconds, prefix = _iso_cache
+    if cached_seconds != seconds:
+        prefix = datetime.datetime.fromtimestamp(
+            seconds, tz=datetime.timezone.utc
+        ).strftime("%Y-%m-%dT%H:%M:%S")
+        _iso_cache = (seconds, prefix)
+    return f"{prefix}.{micros:06d}Z"
+
+
+_resource_cache = (None, None)
+
+
+def resource_to_dict(resource) -> Optional[Dict[str, Any]]:
+    # Resources are immutable and usually shared by every record of a process
+    global _resource_cache
+    if resource is None:
+        return None
+    cached, value = _resource_cache
+    if cached is not resource:
+        value = {
+            "attributes": dict(resource.attributes),
+            "schema_url": resource.schema_url,
+        }
+        _resource_cache = (resource, value)
+    return value
+
+
+def scope_to_dict(scope) -> Optional[Dict[str, Any]]:
+    if scope is None:
+        return None
+    return {
+        "name": scope.name,
+        "version": scope.version,
+        "schema_url": scope.schema_url,
+        "attributes": dict(scope.attributes) if scope.attributes else None,
+    }
+
+
+def _attributes(attributes) -> Optional[Dict[str, Any]]:
+    if attributes is None:
+        return None
+    if isinstance(attributes, dict):
+        return attributes
+    return dict(attributes)
+
+
+def log_record_to_dict(record, include_resource: bool = True) -> Dict[str, Any]:
+    """Same fields as ``LogRecord.to_json()``."""
+    attributes = record.attributes
+    result = {
+        "body": record.body,
+        "severity_number": repr(record.severity_number),
+        "severity_text": record.severity_text,
+        "attributes": dict(attributes) if attributes else None,
+        "dropped_attributes": attributes.dropped if attributes else 0,
+        "timestamp": ns_to_iso_str(record.timestamp),
+        "observed_timestamp": ns_to_iso_str(record.observed_timestamp),
+        "trace_id": (
+            f"0x{record.trace_id:032x}" if record.trace_id is not None else ""
+        ),
+        "span_id": f"0x{record.span_id:016x}" if record.span_id is not None else "",
+        "trace_flags": record.trace_flags,
+    }
+    if include_resource:
+        result["resource"] = resource_to_dict(record.resource)
+    return result
+
+
+def _context_to_dict(context) -> Dict[str, str]:
+    return {
+        "trace_id": f"0x{context.trace_id:032x}",
+        "span_id": f"0x{context.span_id:016x}",
+        "trace_state": repr(context.trace_state),
+    }
+
+
+def span_to_dict(span, include_resource: bool = True) -> Dict[str, Any]:
+    """Same fields as ``ReadableSpan.to_json()``."""
+    status = {"status_code": span.status.status_code.name}
+    if span.status.description:
+        status["description"] = span.status.description
+    result = {
+        "name": span.name,
+        "context": _context_to_dict(span.context) if span.context else None,
+        "kind": str(span.kind),
+        "parent_id": f"0x{span.parent.span_id:016x}" if span.parent else None,
+        "start_time": ns_to_iso_str(span.start_time) if span.start_time else None,
+        "end_time": ns_to_iso_str(span.end_time) if span.end_time else None,
+        "status": status,
+        "attributes": _attributes(span.attributes),
+        "events": [
+            {
+                "name": event.name,
+                "timestamp": ns_to_iso_str(event.timestamp),
+                "attributes": _attributes(event.attributes),
+            }
+            for event in span.events
+        ],
+        "links": [
+            {
+                "context": _context_to_dict(link.context),
+                "attributes": _attributes(link.attributes),
+            }
+            for link in span.links
+        ],
+    }
+    if include_resource:
+        result["resource"] = resource_to_dict(span.resource)
+    return result
+
+
+def _exemplar_to_dict(exemplar) -> Dict[str, Any]:
+    return {
+        "filtered_attributes": _attributes(exemplar.filtered_attributes),
+        "value": exemplar.value,
+        "time_unix_nano": exemplar.time_unix_nano,
+        "span_id": exemplar.span_id,
+        "trace_id": exemplar.trace_id,
+    }
+
+
+def _data_point_to_dict(point) -> Dict[str, Any]:
+    # Equivalent to dataclasses.asdict() without its deepcopy of every field
+    result = {}
+    for name in point.__dataclass_fields__:
+        value = getattr(point, name)
+        if name == "exemplars":
+            value = [_exemplar_to_dict(e) for e in value]
+        elif name == "attributes":
+            value = _attributes(value)
+        elif name in ("positive", "negative"):
+            value = {"offset": value.offset, "bucket_counts": list(value.bucket_counts)}
+        elif name in ("bucket_counts", "explicit_bounds"):
+            value = list(value)
+        result[name] = value
+    return result
+
+
+def metric_to_dict(metric) -> Dict[str, Any]:
+    data = metric.data
+    data_dict = {"data_points": [_data_point_to_dict(p) for p in data.data_points]}
+    if hasattr(data, "aggregation_temporality"):
+        data_dict["aggregation_temporality"] = int(data.aggregation_temporality)
+    if hasattr(data, "is_monotonic"):
+        data_dict["is_monotonic"] = data.is_monotonic
+    return {
+        "name": metric.name,
+        "description": metric.description or "",
+        "unit": metric.unit or "",
+        "data": data_dict,
+    }
+
+
+def metrics_data_to_dict(metrics_data) -> Dict[str, Any]:
+    """Same fields as ``MetricsData.to_json()``."""
+    return {
+        "resource_metrics": [
+            {
+                "resource": resource_to_dict(resource_metrics.resource),
+                "scope_metrics": [
+                    {
+                        "scope": scope_to_dict(scope_metrics.scope),
+                        "metrics": [metric_to_dict(m) for m in scope_metrics.metrics],
+                        "schema_url": scope_metrics.schema_url,
+                    }
+                    for scope_metrics in resource_metrics.scope_metrics
+                ],
+                "schema_url": resource_metrics.schema_url,
+            }
+            for resource_metrics in metrics_data.resource_metrics
+        ]
+    }
+
+
+def _log_data_to_dict(data) -> Dict[str, Any]:
+    return log_record_to_dict(data.log_record)
+
+
+def _log_data_to_dict_without_resource(data) -> Dict[str, Any]:
+    return log_record_to_dict(data.log_record, include_resource=False)
+
+
+def _span_to_dict_without_resource(span) -> Dict[str, Any]:
+    return span_to_dict(span, include_resource=False)
+
+
+def _encode_lines(items, to_dict) -> bytes:
+    lines = []
+    for item in items:
+        try:
+            lines.append(dumps(to_dict(item)))
+        except Exception as e:
+            # A bad record shouldn't fail the whole batch
+            _logger.error(f"Error encoding record: {str(e)}")
+    if not lines:
+        return b""
+    lines.append(b"")
+    return b"\n".join(lines)
+
+
+def encode_log_batch(batch: Sequence, include_resource: bool = True) -> bytes:
+    """Encode a batch of ``LogData`` as newline delimited JSON."""
+    if include_resource:
+        return _encode_lines(batch, _log_data_to_dict)
+    return _encode_lines(batch, _log_data_to_dict_without_resource)
+
+
+def encode_span_batch(spans: Sequence, include_resource: bool = True) -> bytes:
+    """Encode a batch of ``ReadableSpan`` as newline delimited JSON."""
+    if include_resource:
+        return _encode_lines(spans, span_to_dict)
+    return _encode_lines(spans, _span_to_dict_without_resource)
+
+
+# Key of the header line written before records in "header" resource mode
+HEADER_KEY = "header"
+
+
+def encode_resource_header(resource) -> bytes:
+    """
+    Encode the header line that carries ``resource`` for every record after
+    it, up to the next header line.
+    """
+    return dumps({HEADER_KEY: {"resource": resource_to_dict(resource)}}) + b"\n"
+
+
+def group_by_resource(items: Sequence, get_resource) -> List[Tuple[Any, List]]:
+    """Split ``items`` into consecutive runs that share the same resource."""
+    groups = []
+    for item in items:
+        resource = get_resource(item)
+        if not groups or groups[-1][0] is not resource:
+            groups.append((resource, []))
+        groups[-1][1].append(item)
+    return groups
+
+
+def encode_metrics_data(metrics_data) -> bytes:
+    """Encode ``MetricsData`` as a single JSON line."""
+    return dumps(metrics_data_to_dict(metrics_data)) + b"\n"
@@ -0,0 +1,272 @@
+"""
+Per-file index sidecars.
+
+When an indexed exporter finishes a file ``{dir}/{name}`` it writes a small
+JSON index to ``{dir}/_index/{name}.index.json`` (Spark skips ``_``
+directories) with the file's time range, record count, per-severity (logs)
+or per-status (spans) counts, the attribute keys present and a bloom filter
+of its trace ids. :func:`find_files` uses the sidecars to open only the
+files that can hold a given trace or time window.
+"""
+import base64
+import json
+import math
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.trace import StatusCode
+
+from databricks_opentelemetry_exporter.util.partitioning import partition_time_range
+
+INDEX_DIR = "_index"
+INDEX_SUFFIX = ".index.json"
+
+_MASK_64 = (1 << 64) - 1
+
+
+class BloomFilter:
+    """
+    Bloom filter over 128-bit trace ids.
+
+    Trace ids are random, so their two 64-bit halves serve directly as the
+    two hashes of double hashing.
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: bytearray = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> "BloomFilter":
+        capacity = max(capacity, 1)
+        num_bits = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, trace_id: int):
+        h1 = trace_id & _MASK_64
+        h2 = (trace_id >> 64) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, trace_id: int) -> None:
+        for position in self._positions(trace_id):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, trace_id: int) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(trace_id)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, value: dict) -> "BloomFilter":
+        return cls(
+            value["num_bits"],
+            value["num_hashes"],
+            bytearray(base64.b64decode(value["bits"])),
+        )
+
+
+class FileIndex:
+    """Accumulates the index of one exported file."""
+
+    def __init__(self):
+        self.min_time_ns = None
+        self.max_time_ns = None
+        self.records = 0
+        self.severity_counts = {}
+        self.status_counts = {}
+        self.attribute_keys = set()
+        self.trace_ids = set()
+
+    def _add_time(self, start: Optional[int], end: Optional[int] = None) -> None:
+        if start is None:
+            return
+        end = end or start
+        if self.min_time_ns is None or start < self.min_time_ns:
+            self.min_time_ns = start
+        if self.max_time_ns is None or end > self.max_time_ns:
+            self.max_time_ns = end
+
+    def _add_severity(self, severity: Optional[int], text: str = None) -> None:
+        if severity is None:
+            severity = text or "UNSPECIFIED"
+        else:
+            try:
+                severity = SeverityNumber(severity).name
+            except ValueError:
+                severity = str(severity)
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+
+    def _add_status(self, status: str) -> None:
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def add_logs(self, batch: Sequence) -> None:
+        """Add a batch of ``LogData``."""
+        for data in batch:
+            record = data.log_record
+            self.records += 1
+            self._add_time(record.timestamp or record.observed_timestamp)
+            self._add_severity(record.severity_number, record.severity_text)
+            if record.trace_id:
+                self.trace_ids.add(record.trace_id)
+            if record.attributes:
+                self.attribute_keys.update(record.attributes)
+
+    def add_spans(self, spans: Sequence) -> None:
+        """Add a batch of ``ReadableSpan``."""
+        for span in spans:
+            self.records += 1
+            self._add_time(span.start_time, span.end_time)
+            self._add_status(span.status.status_code.name)
+            if span.context is not None:
+                self.trace_ids.add(span.context.trace_id)
+            if span.attributes:
+                self.attribute_keys.update(span.attributes)
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add log or span records as yielded by
+        :mod:`~databricks_opentelemetry_exporter.reader`, in any format.
+        """
+        from databricks_opentelemetry_exporter.reader import (
+            record_end_time,
+            record_severity,
+            record_time,
+            record_trace_id,
+        )
+
+        for record in records:
+            self.records += 1
+            self._add_time(record_time(record), record_end_time(record))
+            if "start_time" not in record and "start_time_unix_nano" not in record:
+                self._add_severity(record_severity(record), record.get("severity_text"))
+            else:
+                status = record.get("status") or {}
+                if "status_code" in record:
+                    # Parquet rows
+                    self._add_status(record["status_code"])
+                elif "status_code" in status:
+                    self._add_status(status["status_code"])
+                else:
+                    # OTLP omits the default UNSET code
+                    self._add_status(StatusCode(status.get("code", 0)).name)
+            trace_id = record_trace_id(record)
+            if trace_id:
+                self.trace_ids.add(trace_id)
+            if record.get("attributes"):
+                self.attribute_keys.update(record["attributes"])
+
+    def to_dict(self) -> dict:
+        bloom = BloomFilter.for_capacity(len(self.trace_ids))
+        for trace_id in self.trace_ids:
+            bloom.add(trace_id)
+        result = {
+            "min_time_unix_nano": self.min_time_ns,
+            "max_time_unix_nano": self.max_time_ns,
+            "records": self.records,
+            "attribute_keys": sorted(self.attribute_keys),
+            "trace_id_bloom": bloom.to_dict(),
+        }
+        if self.severity_counts:
+            result["severity_counts"] = self.severity_counts
+        if self.status_counts:
+            result["status_counts"] = self.status_counts
+        return result
+
+
+def index_path(path: str) -> str:
+    """Sidecar path of the exported file ``path``."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, INDEX_DIR, name + INDEX_SUFFIX)
+
+
+def write_index(path: str, index: FileIndex) -> None:
+    """Atomically write the sidecar of the exported file ``path``."""
+    target = index_path(path)
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".inprogress")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(index.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_index(path: str) -> Optional[dict]:
+    """Index of the exported file ``path``, or None if it has no sidecar."""
+    try:
+        with open(index_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _may_match(index: dict, trace_id: Optional[int], start_ns, end_ns) -> bool:
+    # Records without timestamps can't be ruled out by time
+    if index["min_time_unix_nano"] is not None:
+        if start_ns is not None and index["max_time_unix_nano"] < start_ns:
+            return False
+        if end_ns is not None and index["min_time_unix_nano"] > end_ns:
+            return False
+    if trace_id is not None:
+        return trace_id in BloomFilter.from_dict(index["trace_id_bloom"])
+    return True
+
+
+def _partition_may_match(path: str, start_ns, end_ns) -> bool:
+    time_range = partition_time_range(path)
+    if time_range is None:
+        return True
+    if end_ns is not None and time_range[0] > end_ns:
+        return False
+    # Trace partitions are chosen by a trace's first span, so later spans of
+    # the trace can start after the partition's hour
+    if start_ns is not None and time_range[1] < start_ns:
+        return f"{os.sep}signal=traces" in f"{os.sep}{path}"
+    return True
+
+
+def find_files(
+    directory: str,
+    trace_id: Union[int, str] = None,
+    start_time_ns: int = None,
+    end_time_ns: int = None,
+) -> Iterator[str]:
+    """
+    Yield the exported files under ``directory`` (including partition
+    subdirectories) that may hold records of ``trace_id`` and/or records
+    between ``start_time_ns`` and ``end_time_ns``. Files without an index are
+    always yielded. Hive partition directories (``date=``/``hour=``) outside
+    the time window are skipped without listing them.
+    """
+    if isinstance(trace_id, str):
+        trace_id = int(trace_id.removeprefix("0x"), 16)
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(
+            d
+            for d in dirnames
+            if not d.startswith(("_", "."))
+            and _partition_may_match(os.path.join(dirpath, d), start_time_ns, end_time_ns)
+        )
+        for name in sorted(filenames):
+            if name.startswith(("_", ".")):
+                continue
+            path = os.path.join(dirpath, name)
+            index = read_index(path)
+            if index is None or _may_match(index, trace_id, start_time_ns, end_time_ns):
+                yield path
@@ -0,0 +1,169 @@
+"""
+Hive-style partitioned directory layout for exported files.
+
+With partitioning, files go to e.g.
+``{dir}/signal=logs/date=2024-05-01/hour=13/host=node-1/`` instead of
+straight into ``{dir}``, so listings stay small and Spark prunes partitions
+when queries filter on time or host. Date and hour (UTC) are taken from
+the records' timestamps, so a batch that spans an hour boundary is split.
+"""
+import datetime
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from databricks_opentelemetry_exporter.resource.os import get_host_name
+
+PARTITION_FIELDS = ("signal", "date", "hour", "host")
+
+_NS_PER_HOUR = 3600 * 1_000_000_000
+
+
+def _escape(value: str) -> str:
+    return value.replace("/", "_").replace("=", "_") or "unknown"
+
+
+def partition_time_range(path: str) -> Optional[Tuple[int, int]]:
+    """
+    First and last nanosecond covered by the ``date=``/``hour=`` components
+    of ``path``, or None if it isn't inside a dated partition.
+    """
+    date = hour = None
+    for part in os.path.normpath(str(path)).split(os.sep):
+        field, _, value = part.partition("=")
+        if field == "date":
+            date = value
+        elif field == "hour":
+            hour = value
+    if date is None:
+        return None
+    try:
+        day = datetime.datetime.strptime(date, "%Y-%m-%d")
+        start = int(day.replace(tzinfo=datetime.timezone.utc).timestamp()) * 1_000_000_000
+        if hour is None:
+            return start, start + 24 * _NS_PER_HOUR - 1
+        start += int(hour) * _NS_PER_HOUR
+    except ValueError:
+        return None
+    return start, start + _NS_PER_HOUR - 1
+
+
+class Partitioner:
+    """
+    Maps record timestamps to partition directories under ``directory``.
+
+    ``partition_by`` selects and orders the ``PARTITION_FIELDS`` used; ``True``
+    means all of them. Each partition directory is created once, when the
+    first file is written to it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        signal: str,
+        partition_by: Union[bool, Sequence[str]] = True,
+        host: str = None,
+    ):
+        if partition_by is True:
+            partition_by = PARTITION_FIELDS
+        for field in partition_by:
+            if field not in PARTITION_FIELDS:
+                raise ValueError(
+                    f"Unsupported partition field: {field!r}, "
+                    f"expected any of {list(PARTITION_FIELDS)}"
+                )
+        self.directory = str(directory)
+        self.signal = signal
+        self.partition_by = tuple(partition_by)
+        self.host = _escape(host if host is not None else get_host_name())
+        self._lock = threading.Lock()
+        self._created = set()
+        self._hour_cache = (None, None)
+
+    def _path(self, hour: int) -> str:
+        cached_hour, path = self._hour_cache
+        if cached_hour == hour:
+            return path
+        moment = datetime.datetime.fromtimestamp(hour * 3600, tz=datetime.timezone.utc)
+        values = {
+            "signal": self.signal,
+            "date": moment.strftime("%Y-%m-%d"),
+            "hour": moment.strftime("%H"),
+            "host": self.host,
+        }
+        path = os.path.join(
+            self.directory, *(f"{field}={values[field]}" for field in self.partition_by)
+        )
+        self._hour_cache = (hour, path)
+        return path
+
+    def directory_for(self, timestamp_ns: int = None) -> str:
+        """Partition directory for ``timestamp_ns`` (default: now), created if needed."""
+        if not timestamp_ns:
+            timestamp_ns = time.time_ns()
+        path = self._path(timestamp_ns // _NS_PER_HOUR)
+        if path not in self._created:
+            with self._lock:
+                if path not in self._created:
+                    os.makedirs(path, exist_ok=True)
+                    self._created.add(path)
+        return path
+
+    def split(self, items: Sequence, get_timestamp: Callable) -> List[Tuple[str, List]]:
+        """Group ``items`` by partition directory, keeping their order within each."""
+        groups: Dict[str, List] = {}
+        last_hour, last_group = None, None
+        for item in items:
+            timestamp = get_timestamp(item) or time.time_ns()
+            hour = timestamp // _NS_PER_HOUR
+            if hour != last_hour:
+                last_group = groups.setdefault(self.directory_for(timestamp), [])
+                last_hour = hour
+            last_group.append(item)
+        return list(groups.items())
+
+
+class PartitionedWriter:
+    """
+    One rolling writer per partition directory, created by ``factory`` on
+    first use. Writers that have no open file and weren't used for
+    ``idle_seconds`` are closed when a new partition is opened, so past hours
+    don't accumulate.
+    """
+
+    def __init__(self, factory: Callable[[str], object], idle_seconds: float = 60.0):
+        self._factory = factory
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._writers = {}
+        self._last_used = {}
+
+    def get(self, directory: str):
+        now = time.monotonic()
+        with self._lock:
+            writer = self._writers.get(directory)
+            if writer is None:
+                for path, idle in list(self._writers.items()):
+                    if (
+                        idle.current_path is None
+                        and now - self._last_used[path] >= self.idle_seconds
+                    ):
+                        del self._writers[path], self._last_used[path]
+                        idle.close()
+                writer = self._writers[directory] = self._factory(directory)
+            self._last_used[directory] = now
+            return writer
+
+    def flush(self) -> None:
+        with self._lock:
+            writers = list(self._writers.values())
+        for writer in writers:
+            writer.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            writers, self._writers = list(self._writers.values()), {}
+            self._last_used = {}
+        for writer in writers:
+            writer.close()
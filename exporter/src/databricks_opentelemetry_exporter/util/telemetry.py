@@ -0,0 +1,188 @@
+"""
+The exporters' own metrics, recorded through an OpenTelemetry ``Meter``.
+
+Every exporter records to the meter ``databricks_opentelemetry_exporter``
+of its ``meter_provider``, by default the global one. Until a meter
+provider is configured, recording is a no-op. All instruments carry a
+``signal`` attribute (``logs``, ``traces`` or ``metrics``):
+
+* ``databricks.exporter.export.duration`` (s): time spent in ``export()``,
+  or writing a batch for ``async_write=True``, with ``outcome`` set to
+  ``success`` or ``failure``.
+* ``databricks.exporter.phase.duration`` (s): the part of that spent in
+  each ``phase``: ``serialize``, ``write`` and ``fsync``. Rolled files are
+  fsynced by their writer, so that time counts as ``write``.
+* ``databricks.exporter.records`` and ``databricks.exporter.bytes``:
+  records and encoded bytes written. Parquet batches don't count bytes.
+* ``databricks.exporter.files``: files published.
+* ``databricks.exporter.failures``: batches that failed to write.
+* ``databricks.exporter.collisions``: file names that were already taken.
+* ``databricks.exporter.queue.size`` and ``databricks.exporter.dropped``:
+  batches waiting in, and dropped from, each ``queue`` (``async`` or
+  ``wal``).
+
+To have the collector from ``agent/init.sh`` scrape them, serve them with
+``opentelemetry-exporter-prometheus`` on the port its
+``databricks_opentelemetry_exporter`` job scrapes::
+
+    from opentelemetry.exporter.prometheus import PrometheusMetricReader
+    from opentelemetry.sdk.metrics import MeterProvider
+    from prometheus_client import start_http_server
+
+    start_http_server(9464)
+    meter_provider = MeterProvider(metric_readers=[PrometheusMetricReader()])
+    exporter = DatabricksVolumeLogExporter(log_dir, meter_provider=meter_provider)
+"""
+import collections
+import threading
+import time
+import weakref
+from typing import Callable
+
+from opentelemetry.metrics import MeterProvider, Observation, get_meter_provider
+
+from databricks_opentelemetry_exporter.__version__ import __version__
+
+METER_NAME = "databricks_opentelemetry_exporter"
+
+
+class _Instruments:
+    """
+    The instruments of one meter provider, shared by all exporters using
+    it: a meter only keeps the first registration of an instrument name.
+    """
+
+    def __init__(self, meter_provider: MeterProvider):
+        meter = meter_provider.get_meter(METER_NAME, __version__)
+        self.telemetries = weakref.WeakSet()
+        self.export_duration = meter.create_histogram(
+            "databricks.exporter.export.duration",
+            unit="s",
+            description="Time spent exporting a batch",
+        )
+        self.phase_duration = meter.create_histogram(
+            "databricks.exporter.phase.duration",
+            unit="s",
+            description="Time spent serializing, writing and fsyncing batches",
+        )
+        self.records = meter.create_counter(
+            "databricks.exporter.records",
+            unit="{record}",
+            description="Records written",
+        )
+        self.bytes = meter.create_counter(
+            "databricks.exporter.bytes",
+            unit="By",
+            description="Encoded bytes written",
+        )
+        self.files = meter.create_counter(
+            "databricks.exporter.files",
+            unit="{file}",
+            description="Files published",
+        )
+        self.failures = meter.create_counter(
+            "databricks.exporter.failures",
+            unit="{batch}",
+            description="Batches that failed to write",
+        )
+        self.collisions = meter.create_counter(
+            "databricks.exporter.collisions",
+            unit="{file}",
+            description="File names that were already taken",
+        )
+        meter.create_observable_gauge(
+            "databricks.exporter.queue.size",
+            callbacks=[lambda options: self._observe(0)],
+            unit="{batch}",
+            description="Batches waiting to be written",
+        )
+        meter.create_observable_counter(
+            "databricks.exporter.dropped",
+            callbacks=[lambda options: self._observe(1)],
+            unit="{batch}",
+            description="Batches dropped from a queue",
+        )
+
+    def _observe(self, which: int):
+        totals = collections.Counter()
+        seen = set()
+        for telemetry in list(self.telemetries):
+            for (queue, source), callbacks in list(telemetry._queues.items()):
+                # A queue shared by exporters of one signal is counted once
+                if (telemetry.signal, queue, id(source)) in seen:
+                    continue
+                seen.add((telemetry.signal, queue, id(source)))
+                totals[(telemetry.signal, queue)] += callbacks[which]()
+        return [
+            Observation(value, {"signal": signal, "queue": queue})
+            for (signal, queue), value in totals.items()
+        ]
+
+
+_instruments = weakref.WeakKeyDictionary()
+_instruments_lock = threading.Lock()
+
+
+def _instruments_for(meter_provider: MeterProvider) -> _Instruments:
+    with _instruments_lock:
+        instruments = _instruments.get(meter_provider)
+        if instruments is None:
+            instruments = _instruments[meter_provider] = _Instruments(meter_provider)
+        return instruments
+
+
+class ExporterTelemetry:
+    """Records to the instruments of ``meter_provider`` for one exporter."""
+
+    def __init__(self, signal: str, meter_provider: MeterProvider = None):
+        instruments = _instruments_for(meter_provider or get_meter_provider())
+        instruments.telemetries.add(self)
+        self.signal = signal
+        self._instruments = instruments
+        self._attributes = {"signal": signal}
+        self._phase_attributes = {
+            phase: {"signal": signal, "phase": phase}
+            for phase in ("serialize", "write", "fsync")
+        }
+        self._outcome_attributes = {
+            ok: {"signal": signal, "outcome": "success" if ok else "failure"}
+            for ok in (True, False)
+        }
+        self._queues = {}
+
+    def observe_queue(
+        self,
+        queue: str,
+        source: object,
+        size: Callable[[], int],
+        dropped: Callable[[], int],
+    ) -> None:
+        """Report the current ``size`` and ``dropped`` count of ``source``."""
+        self._queues[(queue, source)] = (size, dropped)
+
+    def phase(self, phase: str, start: float) -> float:
+        """Record the ``phase`` that began at ``start``; returns the time now."""
+        now = time.perf_counter()
+        self._instruments.phase_duration.record(
+            now - start, self._phase_attributes[phase]
+        )
+        return now
+
+    def exported(self, start: float, ok: bool = True) -> None:
+        self._instruments.export_duration.record(
+            time.perf_counter() - start, self._outcome_attributes[ok]
+        )
+
+    def written(self, records: int, nbytes: int = None) -> None:
+        self._instruments.records.add(records, self._attributes)
+        if nbytes is not None:
+            self._instruments.bytes.add(nbytes, self._attributes)
+
+    def published(self, path: str = None) -> None:
+        self._instruments.files.add(1, self._attributes)
+
+    def failed(self) -> None:
+        self._instruments.failures.add(1, self._attributes)
+
+    def collided(self) -> None:
+        self._instruments.collisions.add(1, self._attributes)
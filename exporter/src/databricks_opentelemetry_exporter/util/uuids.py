@@ -1,23 +1,79 @@
-import time
+"""
+UUIDv7 (RFC 9562) strings for file names.
+
+IDs are monotonic within a process: ``rand_a`` holds a 12-bit counter
+(RFC 9562 section 6.2, method 1) that is re-seeded at a random value in its
+lower half every millisecond and incremented for each ID generated in the
+same millisecond. A clock that steps backwards keeps counting on the last
+timestamp used, and a counter that runs out borrows the next millisecond, so
+IDs (and the file names built from them) always sort in generation order.
+``rand_b`` is random for every ID and keeps IDs unique across processes.
+"""
+import os
 import random
+import threading
+import time
+from typing import List
+
+_MAX_COUNTER = 0xFFF
+# Counter seeds stay in the lower half so a millisecond has room for >= 2048 IDs
+_SEED_BITS = 11
+_VARIANT = 0b10 << 62
+
+_time_ns = time.time_ns
+_getrandbits = random.getrandbits
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+# "tttttttt-tttt-" for _last_ms, formatted once per millisecond
+_prefix = ""
+
+
+def _reset_after_fork():
+    # The lock may have been held by another thread when the process forked
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
-def uuid7():
-    # Step 1: Get Unix timestamp in milliseconds
-    unix_ts_ms = int(time.time() * 1000)  # 48-bit timestamp
+def _advance(now_ms: int) -> None:
+    # Called with _lock held: move on to the next (timestamp, counter) slot
+    global _last_ms, _counter, _prefix
+    if now_ms > _last_ms:
+        _last_ms = now_ms
+    elif _counter < _MAX_COUNTER:
+        _counter += 1
+        return
+    else:
+        # Counter exhausted, borrow the next millisecond
+        _last_ms += 1
+    _counter = _getrandbits(_SEED_BITS)
+    ts = f"{_last_ms:012x}"
+    _prefix = f"{ts[:8]}-{ts[8:]}-7"
 
-    # Step 2: Generate random bits for rand_a (12 bits) and rand_b (62 bits)
-    rand_a = random.getrandbits(12)
-    rand_b = random.getrandbits(62)
 
-    # Step 3: Pack the parts into a 128-bit structure
-    # 48-bit timestamp, 4-bit version, 12-bit rand_a, 2-bit variant, 62-bit rand_b
-    uuid_int = (
-        (unix_ts_ms << 80) | (0b0111 << 76) | (rand_a << 64) | (0b10 << 62) | rand_b
-    )
+def uuid7() -> str:
+    """Return a new UUIDv7 string, greater than every one generated before it."""
+    with _lock:
+        _advance(_time_ns() // 1_000_000)
+        prefix, counter = _prefix, _counter
+    # 48-bit timestamp, version 7, 12-bit counter, 2-bit variant, 62-bit rand_b
+    low = f"{_VARIANT | _getrandbits(62):016x}"
+    return f"{prefix}{counter:03x}-{low[:4]}-{low[4:]}"
 
-    # Convert to hex and format as UUID
-    uuid_hex = f"{uuid_int:032x}"
-    uuid_formatted = f"{uuid_hex[:8]}-{uuid_hex[8:12]}-{uuid_hex[12:16]}-{uuid_hex[16:20]}-{uuid_hex[20:]}"
 
-    return uuid_formatted
+def uuid7_batch(count: int) -> List[str]:
+    """Return ``count`` increasing UUIDv7 strings, taking the lock only once."""
+    ids = []
+    append = ids.append
+    with _lock:
+        now_ms = _time_ns() // 1_000_000
+        for _ in range(count):
+            _advance(now_ms)
+            low = f"{_VARIANT | _getrandbits(62):016x}"
+            append(f"{_prefix}{_counter:03x}-{low[:4]}-{low[4:]}")
+    return ids
@@ -0,0 +1,331 @@
+"""
+Local-disk write-ahead queue for batches the volume couldn't take.
+
+When writing to ``/Volumes`` fails, an exporter with a
+:class:`WriteAheadQueue` stores the encoded batch on local disk instead of
+dropping it. A background thread then retries the queued batches, oldest
+first, with exponential backoff. Each batch is written to the file it would
+have been written to, under the same time-ordered name, and then removed
+from the queue.
+
+Every batch is stored as its own ``{name}.wal`` file. The file holds a
+4-byte big-endian size, a small JSON header with the target directory, file
+name and compression, and then the uncompressed payload. Queue files
+survive restarts. All processes of a node can share one queue directory:
+a process claims an entry by renaming it before writing it, so no entry is
+written twice. Entries claimed by processes that have since died are
+released again.
+
+The queue is bounded by ``max_bytes`` and ``max_entries``. When it is full,
+the oldest entries are evicted, so a long outage costs the oldest data
+rather than local disk or memory. Each process keeps a running total of the
+queue, resynced whenever it lists the directory, so processes sharing a
+queue can overshoot the bounds by what the others queued in between.
+
+Retried writes are committed with ``durability`` (see
+:class:`~databricks_opentelemetry_exporter.util.durability.DurabilityPolicy`),
+which exporters set to their own policy.
+
+The queue never creates directories. While a mount is missing, writing
+below it fails and is retried, rather than ending up on local disk under
+the mount point.
+"""
+import json
+import logging
+import os
+import random
+import struct
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from databricks_opentelemetry_exporter.util.compression import open_compressed
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_WAL_DIR = os.path.join(
+    "/local_disk0/tmp" if os.path.isdir("/local_disk0") else tempfile.gettempdir(),
+    "databricks-opentelemetry-wal",
+)
+
+ENTRY_SUFFIX = ".wal"
+_CLAIMED = ".claimed-"
+_SIZE = struct.Struct(">I")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class WriteAheadQueue:
+    """
+    Bounded queue of batches in ``directory`` that retries writing them to
+    their target files, backing off from ``initial_backoff_seconds`` up to
+    ``max_backoff_seconds`` while writes keep failing.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_WAL_DIR,
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_entries: int = 100_000,
+        initial_backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 300.0,
+        durability="per-batch",
+    ):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.initial_backoff_seconds = initial_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.durability = DurabilityPolicy.of(durability)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.queued = 0
+        self.drained = 0
+        self.evicted = 0
+
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._idle = True
+        # Running totals of the queued entries, so put() needn't list them
+        self._count = 0
+        self._bytes = 0
+        if self._resync():
+            # Left behind by an earlier process
+            self._ensure_thread()
+
+    @classmethod
+    def of(cls, wal, durability="per-batch") -> Optional["WriteAheadQueue"]:
+        """
+        Queue for an exporter's ``wal`` argument: True, a directory or a queue.
+        A queue passed in keeps its own ``durability``.
+        """
+        if wal is None or wal is False:
+            return None
+        if isinstance(wal, cls):
+            return wal
+        if wal is True:
+            return cls(durability=durability)
+        return cls(str(wal), durability=durability)
+
+    def _entries(self) -> List[Tuple[str, int]]:
+        """Queued (unclaimed) entries as ``(name, size)``, oldest first."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(ENTRY_SUFFIX) and not entry.name.startswith("."):
+                    try:
+                        entries.append((entry.name, entry.stat().st_size))
+                    except FileNotFoundError:
+                        pass
+        entries.sort()
+        return entries
+
+    def _resync(self) -> List[Tuple[str, int]]:
+        """Queued entries, resetting the running totals to them."""
+        entries = self._entries()
+        with self._lock:
+            self._count = len(entries)
+            self._bytes = sum(size for _, size in entries)
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._resync())
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size in entries)
+        evicted = 0
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            name, size = entries.pop(0)
+            try:
+                os.unlink(os.path.join(self.directory, name))
+                evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._count = len(entries)
+            self._bytes = total
+            self.evicted += evicted
+        if evicted:
+            _logger.warning(f"Write-ahead queue full, evicted {evicted} oldest batches")
+
+    def put(
+        self,
+        directory: str,
+        name: str,
+        payload: bytes,
+        compression: str = None,
+        compression_level: int = None,
+    ) -> None:
+        """Queue ``payload`` to be written to ``{directory}/{name}``."""
+        header = json.dumps(
+            {
+                "directory": os.path.abspath(directory),
+                "name": name,
+                "compression": compression,
+                "compression_level": compression_level,
+            }
+        ).encode("utf-8")
+        entry = name + ENTRY_SUFFIX
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_SIZE.pack(len(header)) + header)
+                f.write(payload)
+                size = f.tell()
+            os.replace(tmp_path, os.path.join(self.directory, entry))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self.queued += 1
+            self._count += 1
+            self._bytes += size
+            full = self._count > self.max_entries or self._bytes > self.max_bytes
+        if full:
+            self._evict()
+        self._ensure_thread()
+        if self._idle:
+            self._wakeup.set()
+
+    def _forget(self, size: int) -> None:
+        with self._lock:
+            self._count -= 1
+            self._bytes -= size
+
+    def _release_stale_claims(self) -> None:
+        for name in os.listdir(self.directory):
+            entry, sep, pid = name.rpartition(_CLAIMED)
+            if not sep or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            try:
+                os.rename(
+                    os.path.join(self.directory, name),
+                    os.path.join(self.directory, entry),
+                )
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _read_entry(path: str) -> Tuple[dict, bytes]:
+        with open(path, "rb") as f:
+            (size,) = _SIZE.unpack(f.read(_SIZE.size))
+            header = json.loads(f.read(size))
+            payload = f.read()
+        return header, payload
+
+    def _write_entry(self, header: dict, payload: bytes) -> None:
+        directory, name = header["directory"], header["name"]
+        tmp_path = os.path.join(directory, f".{name}.inprogress")
+        try:
+            with open_compressed(
+                tmp_path, header["compression"], header["compression_level"], mode="wb"
+            ) as f:
+                f.write(payload)
+                self.durability.commit(f, len(payload))
+            os.replace(tmp_path, os.path.join(directory, name))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def drain(self) -> bool:
+        """
+        Write queued batches to their targets, oldest first. Once a write
+        to a directory fails, the rest of its batches wait for the next
+        attempt. Returns whether the queue is now empty.
+        """
+        with self._drain_lock:
+            self._release_stale_claims()
+            failed = set()
+            for name, size in self._entries():
+                path = os.path.join(self.directory, name)
+                claimed = f"{path}{_CLAIMED}{os.getpid()}"
+                try:
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    # Claimed by another process
+                    continue
+                try:
+                    header, payload = self._read_entry(claimed)
+                    if header["directory"] in failed:
+                        os.rename(claimed, path)
+                        continue
+                except (struct.error, ValueError, KeyError) as e:
+                    _logger.error(f"Dropping corrupt write-ahead queue entry {name}: {e}")
+                    os.unlink(claimed)
+                    self._forget(size)
+                    continue
+                try:
+                    self._write_entry(header, payload)
+                except Exception as e:
+                    os.rename(claimed, path)
+                    failed.add(header["directory"])
+                    _logger.warning(f"Retrying queued batches failed: {str(e)}")
+                    continue
+                os.unlink(claimed)
+                self._forget(size)
+                with self._lock:
+                    self.drained += 1
+            return not failed and not self._resync()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            # Threads don't survive fork(), so this also restarts it in children
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="WriteAheadQueue", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        # Entries are queued because a write just failed, don't retry at once
+        delay = self.initial_backoff_seconds
+        while True:
+            self._idle = delay is None
+            wait = delay
+            if delay is not None:
+                # Jitter, so the processes sharing a queue don't retry in step
+                wait = delay * random.uniform(0.8, 1.2)
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                return
+            if delay is None:
+                # Woken by put()
+                delay = self.initial_backoff_seconds
+            elif self.drain():
+                # Nothing left, sleep until the next put()
+                delay = None
+            else:
+                delay = min(delay * 2, self.max_backoff_seconds)
+
+    def shutdown(self, drain: bool = True) -> None:
+        """Stop retrying, after one last attempt with ``drain=True``."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drain:
+            try:
+                self.drain()
+            except OSError as e:
+                _logger.warning(f"Retrying queued batches failed: {str(e)}")
@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from databricks_opentelemetry_exporter.util.compression import (
+    CompressedFile,
+    finish_file,
+    open_compressed,
+)
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+from databricks_opentelemetry_exporter.util.index import FileIndex, write_index
+from databricks_opentelemetry_exporter.util.uuids import uuid7
+
+_logger = logging.getLogger(__name__)
+
+
+class RollingFileWriter:
+    """
+    Keeps one file open in ``directory`` and appends batches to it.
+
+    The writer rolls over to a new ``{uuid7()}{suffix}`` file once the current
+    file reaches ``max_bytes``, ``max_records`` or ``max_age_seconds``. While a
+    file is being written it lives under a hidden ``.{name}.inprogress`` name,
+    which ``spark.read.json`` and other Hadoop-style readers skip. Finalizing a
+    file flushes, closes and renames it to its published name. When it is
+    fsynced is up to ``durability`` (a
+    :class:`~databricks_opentelemetry_exporter.util.durability.DurabilityPolicy`
+    or mode name), by default once per file.
+
+    With ``compression`` set, batches are streamed through the compressor and
+    ``max_bytes`` applies to the compressed size on disk.
+
+    A ``header`` passed to :meth:`write` is written at the start of every file
+    and again whenever it changes, before the data it applies to.
+
+    With ``index=True`` each finalized file gets an index sidecar (see
+    :mod:`databricks_opentelemetry_exporter.util.index`), built by the
+    ``update_index`` callbacks passed to :meth:`write`.
+
+    ``on_publish`` is called with the path of every finalized file.
+
+    A :meth:`write` that fails is cut back out of the file, so the batch can
+    be retried without duplicating records. Compressed files end at the last
+    complete batch and are finalized. If even that fails, the file is left
+    unpublished under its in-progress name.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        suffix: str = ".json",
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age_seconds: float = 300.0,
+        max_records: int = None,
+        compression: str = None,
+        compression_level: int = None,
+        durability="on-roll",
+        index: bool = False,
+        on_publish: Callable[[str], None] = None,
+    ):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.max_records = max_records
+        self.compression = compression
+        self.compression_level = compression_level
+        self.durability = DurabilityPolicy.of(durability)
+        self.index = index
+        self.on_publish = on_publish
+
+        self._lock = threading.RLock()
+        self._file = None
+        self._name = None
+        self._opened_at = 0.0
+        self._bytes = 0
+        self._records = 0
+        self._header = None
+        self._index = None
+        self._timer = None
+        self._closed = False
+
+    @property
+    def current_path(self) -> str:
+        """Published path of the file currently being written, if any."""
+        if self._name is None:
+            return None
+        return os.path.join(self.directory, self._name)
+
+    def _inprogress_path(self, name: str) -> str:
+        return os.path.join(self.directory, f".{name}.inprogress")
+
+    def _open(self):
+        name = f"{uuid7()}{self.suffix}"
+        # 'x' guards against clobbering a file written by another process
+        self._file = open_compressed(
+            self._inprogress_path(name), self.compression, self.compression_level
+        )
+        self._name = name
+        self._opened_at = time.monotonic()
+        self._bytes = 0
+        self._records = 0
+        self._header = None
+        self._index = FileIndex() if self.index else None
+        if self.max_age_seconds:
+            self._timer = threading.Timer(self.max_age_seconds, self._on_max_age)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_max_age(self):
+        with self._lock:
+            if self._file is not None and self._expired():
+                self._finalize()
+
+    def _expired(self) -> bool:
+        return bool(self.max_age_seconds) and (
+            time.monotonic() - self._opened_at >= self.max_age_seconds
+        )
+
+    def _full(self) -> bool:
+        if self.max_bytes and self._bytes >= self.max_bytes:
+            return True
+        return bool(self.max_records) and self._records >= self.max_records
+
+    def _finalize(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        file, name = self._file, self._name
+        self._file = None
+        self._name = None
+        try:
+            finish_file(file)
+            self.durability.before_close(file)
+        finally:
+            file.close()
+        path = os.path.join(self.directory, name)
+        os.rename(self._inprogress_path(name), path)
+        if self._index is not None:
+            index, self._index = self._index, None
+            write_index(path, index)
+        if self.on_publish is not None:
+            self.on_publish(path)
+
+    def _abandon(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        file, self._file, self._name = self._file, None, None
+        self._index = None
+        try:
+            file.close()
+        except OSError:
+            pass
+
+    def _rollback(self, header: bytes) -> None:
+        """Cut a failed write out of the current file."""
+        path = self._inprogress_path(self._name)
+        try:
+            if not self._records:
+                # Nothing to keep
+                self._abandon()
+                os.unlink(path)
+            elif isinstance(self._file, CompressedFile):
+                # The compressor can't be rewound, end the file where it was
+                self._file.end_at(self._bytes)
+                self._finalize()
+            else:
+                self._file.truncate(self._bytes)
+                self._file.seek(self._bytes)
+                self._header = header
+        except Exception as e:
+            _logger.error(f"Leaving {path} unpublished after a failed write: {str(e)}")
+            if self._file is not None:
+                self._abandon()
+
+    def write(
+        self, data, records: int = 1, header: bytes = None, update_index=None
+    ) -> None:
+        """
+        Append ``data`` (``str`` or ``bytes``) holding ``records`` records.
+        ``update_index`` is called with the current file's ``FileIndex``.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            if self._closed:
+                raise ValueError("write to closed RollingFileWriter")
+            if self._file is not None and self._expired():
+                self._finalize()
+            if self._file is None:
+                self._open()
+            previous_header = self._header
+            try:
+                if header and header != self._header:
+                    self._file.write(header)
+                    self._header = header
+                self._file.write(data)
+                self._file.flush()
+                self.durability.after_write(self._file, self._file.tell() - self._bytes)
+            except BaseException:
+                self._rollback(previous_header)
+                raise
+            if isinstance(self._file, CompressedFile):
+                self._file.sync_point()
+            self._bytes = self._file.tell()
+            self._records += records
+            if self._index is not None and update_index is not None:
+                update_index(self._index)
+            if self._full():
+                self._finalize()
+
+    def flush(self) -> None:
+        """Finalize the current file so everything written so far is published."""
+        with self._lock:
+            if self._file is not None:
+                self._finalize()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._closed = True
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+
+import pytest
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.util.async_writer import AsyncBatchWriter
+
+
+class BlockingSink:
+    """Records written batches; blocks writes until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, batch):
+        self.started.set()
+        self.release.wait(5)
+        self.batches.append(batch)
+
+
+def test_submit_returns_before_write_and_flush_drains():
+    sink = BlockingSink()
+    writer = AsyncBatchWriter(sink)
+    assert writer.submit([1, 2])
+    assert sink.started.wait(5)
+    assert writer.submit([3])
+    assert writer.submit([4])
+    # The first write is still blocked; the rest is queued
+    assert not writer.flush(timeout_millis=50)
+    sink.release.set()
+    assert writer.flush()
+    # Batches queued during a write are coalesced into one write
+    assert sink.batches == [[1, 2], [3, 4]]
+    assert writer.shutdown()
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [("drop_newest", [[0], [1]]), ("drop_oldest", [[0], [2]])],
+)
+def test_queue_full_policies(policy, expected):
+    sink = BlockingSink()
+    writer = AsyncBatchWriter(sink, max_queue_size=1, queue_full_policy=policy)
+    writer.submit([0])
+    assert sink.started.wait(5)
+    assert writer.submit([1])
+    assert writer.submit([2]) == (policy == "drop_oldest")
+    assert writer.dropped_batches == 1 and writer.dropped_records == 1
+    sink.release.set()
+    writer.shutdown()
+    assert sink.batches == expected
+
+
+def test_block_policy_times_out():
+    sink = BlockingSink()
+    writer = AsyncBatchWriter(sink, max_queue_size=1, block_timeout_millis=50)
+    writer.submit([0])
+    assert sink.started.wait(5)
+    writer.submit([1])
+    assert not writer.submit([2])
+    assert writer.dropped_batches == 1
+    sink.release.set()
+    writer.shutdown()
+
+
+def test_write_errors_are_counted_not_raised():
+    def failing(batch):
+        raise OSError("volume unavailable")
+
+    writer = AsyncBatchWriter(failing)
+    writer.submit([1])
+    assert writer.flush()
+    assert writer.failed_batches == 1
+    writer.shutdown()
+
+
+def test_shutdown_drains_and_rejects_new_batches():
+    sink = BlockingSink()
+    sink.release.set()
+    writer = AsyncBatchWriter(sink)
+    for i in range(5):
+        writer.submit([i])
+    assert writer.shutdown()
+    assert sum(len(b) for b in sink.batches) == 5
+    assert not writer.submit([6])
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        AsyncBatchWriter(lambda batch: None, queue_full_policy="spill")
+
+
+def test_async_log_exporter():
+    record = LogRecord(
+        timestamp=1234567890,
+        severity_text="INFO",
+        severity_number=9,
+        body="Test message",
+        resource=None,
+        attributes={}
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, async_write=True, rolling=True)
+        for _ in range(10):
+            assert exporter.export([LogData(record, None)]) == LogExportResult.SUCCESS
+        assert exporter.force_flush()
+        (name,) = os.listdir(tmpdir)
+        with open(os.path.join(tmpdir, name)) as f:
+            assert len(f.read().splitlines()) == 10
+        exporter.shutdown()
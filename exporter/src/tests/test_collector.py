@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+import pytest
+
+from databricks_opentelemetry_exporter import collector
+from databricks_opentelemetry_exporter.collector import Node, collector_config, render
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "snapshots", "collector")
+
+# Snapshot name: (node, render keyword arguments)
+CASES = {
+    "driver-small": (Node(cores=4, memory_mib=16 * 1024, role="driver"), {}),
+    "driver-large": (Node(cores=32, memory_mib=256 * 1024, role="driver"), {}),
+    "worker-small": (Node(cores=4, memory_mib=16 * 1024, role="worker"), {}),
+    "worker-large": (
+        Node(cores=64, memory_mib=512 * 1024, role="worker"),
+        {"disable": ["process", "paging"], "debug": True},
+    ),
+    "worker-spark": (
+        Node(cores=8, memory_mib=64 * 1024, role="worker"),
+        {"enable": ["spark_metrics"], "disable": ["databricks_opentelemetry_exporter"]},
+    ),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_snapshot(name):
+    """Set UPDATE_SNAPSHOTS=1 to rewrite the snapshots after a deliberate change."""
+    node, kwargs = CASES[name]
+    rendered = render(node, **kwargs)
+    path = os.path.join(SNAPSHOT_DIR, f"{name}.yaml")
+    if os.environ.get("UPDATE_SNAPSHOTS"):
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(rendered)
+    with open(path) as f:
+        assert rendered == f.read()
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_valid_yaml(name):
+    yaml = pytest.importorskip("yaml")
+    node, kwargs = CASES[name]
+    config = collector_config(node, **kwargs)
+    assert yaml.safe_load(render(node, **kwargs)) == config
+    pipeline = config["service"]["pipelines"]["metrics"]
+    assert pipeline["processors"][0] == "memory_limiter"
+    assert pipeline["processors"][-1] == "batch"
+
+
+def test_sizing_bounds():
+    tiny = collector_config(Node(cores=1, memory_mib=1024, role="worker"))
+    huge = collector_config(Node(cores=448, memory_mib=12 * 1024 * 1024, role="driver"))
+    assert tiny["processors"]["memory_limiter"]["limit_mib"] == collector.MIN_LIMIT_MIB
+    assert huge["processors"]["memory_limiter"]["limit_mib"] == collector.MAX_LIMIT_MIB
+    assert tiny["processors"]["batch"]["send_batch_size"] == 512
+    assert huge["processors"]["batch"]["send_batch_size"] == 8192
+    for config in (tiny, huge):
+        queue = config["exporters"]["otlphttp"]["sending_queue"]
+        assert 10 <= queue["queue_size"] <= 1000
+        assert 2 <= queue["num_consumers"] <= 10
+
+
+def test_spark_scrapers_driver_only():
+    driver = collector_config(Node(cores=8, memory_mib=32 * 1024, role="driver"))
+    worker = collector_config(Node(cores=8, memory_mib=32 * 1024, role="worker"))
+    jobs = [
+        c["job_name"]
+        for c in driver["receivers"]["prometheus"]["config"]["scrape_configs"]
+    ]
+    assert "spark_metrics" in jobs
+    jobs = [
+        c["job_name"]
+        for c in worker["receivers"]["prometheus"]["config"]["scrape_configs"]
+    ]
+    assert jobs == ["databricks_opentelemetry_exporter"]
+
+
+def test_validation():
+    node = Node(cores=8, memory_mib=32 * 1024, role="worker")
+    with pytest.raises(ValueError, match="Unsupported scraper"):
+        collector_config(node, enable=["gpu"])
+    with pytest.raises(ValueError, match="Unsupported role"):
+        collector_config(node._replace(role="executor"))
+    with pytest.raises(ValueError, match="At least one scraper"):
+        collector_config(node, disable=collector.SCRAPERS)
+    # Without Prometheus jobs the receiver is left out
+    config = collector_config(node, disable=["databricks_opentelemetry_exporter"])
+    assert list(config["receivers"]) == ["hostmetrics"]
+
+
+def test_detect_node():
+    assert collector.detect_node({"DB_IS_DRIVER": "TRUE"}).role == "driver"
+    node = collector.detect_node({})
+    assert node.role == "worker"
+    assert node.cores >= 1
+    assert node.memory_mib > 0
+
+
+def test_main(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "config.yaml")
+        argv = ["--cores", "4", "--memory-mib", "16384", "--role", "worker"]
+        assert collector.main(argv + ["--output", path]) == 0
+        with open(path) as f:
+            assert f.read() == render(Node(4, 16384, "worker"))
+        assert os.listdir(tmpdir) == ["config.yaml"]
+    with pytest.raises(SystemExit):
+        collector.main(["--disable", "cpu,gpu"])
+    assert "Unsupported scraper" in capsys.readouterr().err
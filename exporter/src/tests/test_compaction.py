@@ -0,0 +1,274 @@
+import os
+import random
+import tempfile
+import time
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter import compaction
+from databricks_opentelemetry_exporter.compaction import COMPACTION_DIR, compact, recover
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.reader import read_directory, read_json_records
+from databricks_opentelemetry_exporter.util.index import find_files, read_index
+from databricks_opentelemetry_exporter.util.uuids import uuid7
+
+HOUR = 3600 * 1_000_000_000
+# 2024-05-01T13:00:00Z
+T0 = 1714568400 * 1_000_000_000
+
+
+def _trace_id(i):
+    return random.Random(i).getrandbits(128)
+
+
+def _log_data(timestamp, body, trace_id=0):
+    record = LogRecord(
+        timestamp=timestamp,
+        trace_id=trace_id,
+        span_id=1 if trace_id else 0,
+        trace_flags=0,
+        severity_number=SeverityNumber.INFO,
+        body=body,
+        resource=Resource({"service.name": "test"}),
+        attributes={"i": 1},
+    )
+    return LogData(record, InstrumentationScope("test"))
+
+
+def _export(directory, count, age_seconds=3600, **kwargs):
+    exporter = DatabricksVolumeLogExporter(directory, **kwargs)
+    # Exported out of time order, compaction sorts them
+    for i in reversed(range(count)):
+        exporter.export([_log_data(T0 + i * 1000, f"m{i}", trace_id=_trace_id(i))])
+    exporter.shutdown()
+    _age(directory, age_seconds)
+
+
+def _age(directory, age_seconds):
+    old = time.time() - age_seconds
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            os.utime(os.path.join(dirpath, name), (old, old))
+
+
+def _data_files(directory):
+    return sorted(find_files(directory))
+
+
+def _bodies(directory, **kwargs):
+    return [record["body"] for record in read_directory(directory, **kwargs)]
+
+
+def test_compact_merges_old_files_in_time_order():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 10)
+        old_files = set(_data_files(tmpdir))
+        DatabricksVolumeLogExporter(tmpdir).export([_log_data(T0 + 100, "new")])
+        (new_path,) = set(_data_files(tmpdir)) - old_files
+
+        outputs = compact(tmpdir, older_than_seconds=60)
+
+        assert len(outputs) == 1
+        assert _data_files(tmpdir) == sorted([outputs[0], new_path])
+        assert ".compacted.json" in outputs[0]
+        assert _bodies(tmpdir, max_workers=1)[:10] == [f"m{i}" for i in range(10)]
+        assert os.listdir(os.path.join(tmpdir, COMPACTION_DIR)) == [".lock"]
+        # Nothing left to merge
+        assert compact(tmpdir, older_than_seconds=60) == []
+
+
+def test_compact_respects_target_size():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 10)
+        size = os.path.getsize(_data_files(tmpdir)[0])
+        outputs = compact(tmpdir, older_than_seconds=60, target_file_bytes=size * 4)
+        assert len(outputs) == 3
+        assert sorted(_bodies(tmpdir)) == sorted(f"m{i}" for i in range(10))
+
+
+def test_compact_converts_compression():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 1)
+        (output,) = compact(tmpdir, older_than_seconds=60, compression="gzip")
+        assert output.endswith(".compacted.json.gz")
+        assert _bodies(tmpdir) == ["m0"]
+
+
+def test_compact_keeps_recent_and_snapshot_files():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 3, age_seconds=0)
+        with open(os.path.join(tmpdir, "0000.snapshot.json"), "w") as f:
+            f.write("{}\n")
+        _age(tmpdir, 3600)
+        os.utime(_data_files(tmpdir)[-1])
+        outputs = compact(tmpdir, older_than_seconds=60)
+        assert len(outputs) == 1
+        names = os.listdir(tmpdir)
+        assert "0000.snapshot.json" in names
+        assert len([n for n in names if n.endswith(".json")]) == 3
+
+
+def test_compact_partitioned_otlp_with_index():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, output_format="otlp", partition_by=True, index=True
+        )
+        for i in range(8):
+            exporter.export([_log_data(T0 + (i % 2) * HOUR + i, f"m{i}", trace_id=_trace_id(i))])
+        _age(tmpdir, 3600)
+
+        outputs = compact(tmpdir, older_than_seconds=60, compression="zstd")
+
+        assert len(outputs) == 2
+        assert [p.endswith(".compacted.binpb.zst") for p in outputs] == [True, True]
+        assert sorted(_bodies(tmpdir)) == sorted(f"m{i}" for i in range(8))
+        index = read_index(outputs[0])
+        assert index["records"] == 4
+        assert index["severity_counts"] == {"INFO": 4}
+        assert list(find_files(tmpdir, trace_id=_trace_id(2))) == [outputs[0]]
+        assert _bodies(tmpdir, trace_id=_trace_id(2)) == ["m2"]
+
+
+def test_compact_json_to_parquet():
+    pytest.importorskip("pyarrow.parquet")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 5, resource_mode="header")
+        (output,) = compact(tmpdir, older_than_seconds=60, output_format="parquet")
+        assert output.endswith(".compacted.parquet")
+        records = list(read_directory(tmpdir))
+        assert [r["body"] for r in records] == [f"m{i}" for i in range(5)]
+        assert records[0]["timestamp"] == T0
+        assert records[0]["severity_number"] == 9
+        assert records[0]["trace_id"] == f"{_trace_id(0):032x}"
+        assert records[0]["resource"] == {"service.name": "test"}
+
+
+def test_unsupported_conversion():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 2, output_format="otlp")
+        with pytest.raises(ValueError):
+            compact(tmpdir, older_than_seconds=60, output_format="json")
+
+
+def test_crash_before_publish_rolls_back(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 4)
+        inputs = _data_files(tmpdir)
+
+        def fail(*args):
+            raise OSError("crash")
+
+        monkeypatch.setattr(compaction.os, "rename", fail)
+        with pytest.raises(OSError):
+            compact(tmpdir, older_than_seconds=60)
+        work_dir = os.path.join(tmpdir, COMPACTION_DIR)
+        assert any(n.endswith(".journal.json") for n in os.listdir(work_dir))
+        monkeypatch.undo()
+
+        recover(tmpdir)
+        assert _data_files(tmpdir) == inputs
+        assert os.listdir(work_dir) == [".lock"]
+
+
+def test_crash_after_publish_completes(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 4)
+
+        def fail(*args):
+            raise OSError("crash")
+
+        monkeypatch.setattr(compaction, "_delete_inputs", fail)
+        with pytest.raises(OSError):
+            compact(tmpdir, older_than_seconds=60)
+        # Published, inputs not yet deleted
+        assert len(_data_files(tmpdir)) == 5
+        monkeypatch.undo()
+
+        # The next run finishes the interrupted compaction first
+        assert compact(tmpdir, older_than_seconds=60) == []
+        (output,) = _data_files(tmpdir)
+        assert ".compacted" in output
+        assert _bodies(tmpdir) == [f"m{i}" for i in range(4)]
+
+
+def test_concurrent_compaction_skips_locked_directory():
+    fcntl = pytest.importorskip("fcntl")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 3)
+        work_dir = os.path.join(tmpdir, COMPACTION_DIR)
+        os.makedirs(work_dir)
+        with open(os.path.join(work_dir, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            assert compact(tmpdir, older_than_seconds=60) == []
+        assert len(compact(tmpdir, older_than_seconds=60)) == 1
+
+
+def test_main(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 3)
+        assert compaction.main([tmpdir, "--older-than-seconds", "60"]) == 0
+        (line,) = capsys.readouterr().out.splitlines()
+        assert _data_files(tmpdir) == [line]
+
+
+def test_groups_split_at_snapshots():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir)
+        exporter.export([_log_data(T0, "before 1")])
+        exporter.export([_log_data(T0 + 1, "before 2")])
+        snapshot = f"{uuid7()}.snapshot.json"
+        with open(os.path.join(tmpdir, snapshot), "w") as f:
+            f.write("{}\n")
+        exporter.export([_log_data(T0 + 2, "after 1")])
+        exporter.export([_log_data(T0 + 3, "after 2")])
+        _age(tmpdir, 3600)
+
+        before, after = compact(tmpdir, older_than_seconds=60)
+
+        names = sorted(n for n in os.listdir(tmpdir) if n.endswith(".json"))
+        assert names == [os.path.basename(before), snapshot, os.path.basename(after)]
+        assert [r["body"] for r in read_json_records(before)] == ["before 1", "before 2"]
+        assert [r["body"] for r in read_json_records(after)] == ["after 1", "after 2"]
+
+
+@pytest.mark.parametrize("output_format", ["json", "parquet"])
+def test_merges_through_spilled_runs(monkeypatch, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(compaction, "_RUN_RECORDS", 3)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 10, index=True)
+        (output,) = compact(tmpdir, older_than_seconds=60, output_format=output_format)
+        assert _bodies(tmpdir) == [f"m{i}" for i in range(10)]
+        assert read_index(output)["records"] == 10
+        assert os.listdir(os.path.join(tmpdir, COMPACTION_DIR)) == [".lock"]
+
+
+def test_crash_before_publish_leaves_no_index(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 4, index=True)
+        inputs = sorted(os.listdir(tmpdir))
+
+        def fail(*args):
+            raise OSError("crash")
+
+        monkeypatch.setattr(compaction.os, "rename", fail)
+        with pytest.raises(OSError):
+            compact(tmpdir, older_than_seconds=60)
+        monkeypatch.undo()
+
+        recover(tmpdir)
+        assert sorted(os.listdir(tmpdir)) == sorted(inputs + [COMPACTION_DIR])
+
+
+def test_main_compression_choices(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _export(tmpdir, 3)
+        with pytest.raises(SystemExit):
+            compaction.main([tmpdir, "--compression", "snappy"])
+        assert "needs --output-format parquet" in capsys.readouterr().err
+        assert len(_data_files(tmpdir)) == 3
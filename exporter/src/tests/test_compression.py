@@ -0,0 +1,109 @@
+import gzip
+import json
+import os
+import tempfile
+import zlib
+
+import pytest
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from databricks_opentelemetry_exporter.logs.export import (
+    DatabricksVolumeLogExporter,
+    default_formatter
+)
+from databricks_opentelemetry_exporter.reader import read_json_records
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+from databricks_opentelemetry_exporter.util.compression import (
+    check_compression,
+    open_compressed,
+)
+
+
+def _log_batch():
+    record = LogRecord(
+        timestamp=1234567890,
+        severity_text="INFO",
+        severity_number=9,
+        body="Test message",
+        resource=None,
+        attributes={}
+    )
+    return [LogData(record, 1234567890)]
+
+
+def test_check_compression():
+    assert check_compression(None) == ""
+    assert check_compression("gzip") == ".gz"
+    with pytest.raises(ValueError):
+        check_compression("lz4")
+
+
+def test_gzip_flush_is_readable_before_close():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "a.json.gz")
+        f = open_compressed(path, "gzip")
+        f.write(b'{"a": 1}\n')
+        f.flush()
+        # A sync flush makes the data decodable without the gzip trailer
+        with open(path, "rb") as raw:
+            partial = zlib.decompressobj(wbits=31).decompress(raw.read())
+        assert partial == b'{"a": 1}\n'
+        f.close()
+        with gzip.open(path) as g:
+            assert g.read() == b'{"a": 1}\n'
+
+
+@pytest.mark.parametrize("rolling", [False, True])
+def test_log_exporter_gzip(rolling):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, default_formatter, rolling=rolling, compression="gzip"
+        )
+        assert exporter.export(_log_batch()) == LogExportResult.SUCCESS
+        assert exporter.export(_log_batch()) == LogExportResult.SUCCESS
+        exporter.shutdown()
+
+        files = os.listdir(tmpdir)
+        assert len(files) == (1 if rolling else 2)
+        lines = []
+        for name in files:
+            assert name.endswith(".json.gz")
+            with gzip.open(os.path.join(tmpdir, name), "rt") as f:
+                lines.extend(f.read().splitlines())
+        assert [json.loads(line)["body"] for line in lines] == ["Test message"] * 2
+
+
+def test_log_exporter_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, default_formatter, compression="zstd", compression_level=10
+        )
+        assert exporter.export(_log_batch()) == LogExportResult.SUCCESS
+
+        files = os.listdir(tmpdir)
+        assert len(files) == 1 and files[0].endswith(".json.zst")
+        with open(os.path.join(tmpdir, files[0]), "rb") as f:
+            content = zstandard.ZstdDecompressor().stream_reader(f).read()
+        assert json.loads(content)["body"] == "Test message"
+        (record,) = read_json_records(os.path.join(tmpdir, files[0]))
+        assert record["body"] == "Test message"
+
+
+def test_trace_exporter_gzip():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, compression="gzip")
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with provider.get_tracer(__name__).start_as_current_span("work"):
+            pass
+        provider.shutdown()
+
+        files = os.listdir(tmpdir)
+        assert len(files) == 1 and files[0].endswith(".json.gz")
+        with gzip.open(os.path.join(tmpdir, files[0]), "rt") as f:
+            assert "work" in f.read()
@@ -0,0 +1,216 @@
+import gzip
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+from opentelemetry.sdk.resources import Resource
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.util import durability as durability_module
+from databricks_opentelemetry_exporter.util.durability import DurabilityPolicy
+from databricks_opentelemetry_exporter.util.writer import RollingFileWriter
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(durability_module.os, "fsync", fsync)
+    return calls
+
+
+def _batch(n=1):
+    record = LogRecord(
+        timestamp=1234567890,
+        severity_text="INFO",
+        severity_number=9,
+        body="Test message",
+        resource=Resource({}),
+        attributes={}
+    )
+    return [LogData(record, None)] * n
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        DurabilityPolicy("sometimes")
+
+
+def test_log_exporter_defaults_to_fsync_per_batch(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir)
+        exporter.export(_batch())
+        exporter.export(_batch())
+        assert len(fsyncs) == 2
+
+
+def test_none_never_fsyncs(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, rolling=True, durability="none")
+        exporter.export(_batch())
+        exporter.shutdown()
+        assert fsyncs == []
+
+
+def test_rolling_writer_fsyncs_on_roll_by_default(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir, max_records=2)
+        for i in range(4):
+            writer.write(f'{{"a": {i}}}\n')
+        assert len(fsyncs) == 2
+        writer.close()
+        assert len(fsyncs) == 2
+
+
+def test_rolling_writer_per_batch(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir, durability="per-batch")
+        for i in range(3):
+            writer.write(f'{{"a": {i}}}\n')
+        assert len(fsyncs) == 3
+        writer.close()
+        assert len(fsyncs) == 3
+
+
+def test_interval_group_commits_by_bytes(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        policy = DurabilityPolicy("interval", interval_millis=60_000, interval_bytes=20)
+        writer = RollingFileWriter(tmpdir, durability=policy)
+        for i in range(6):
+            writer.write(f'{{"a": {i}}}\n')  # 9 bytes each
+        assert len(fsyncs) == 2
+        writer.close()
+        assert len(fsyncs) == 2
+
+
+def test_interval_syncs_when_time_is_due(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir, durability=DurabilityPolicy("interval", interval_millis=0))
+        writer.write('{"a": 1}\n')
+        writer.write('{"a": 2}\n')
+        assert len(fsyncs) == 2
+        # Nothing pending, so finalizing doesn't sync again
+        writer.close()
+        assert len(fsyncs) == 2
+
+
+def test_fsync_happens_after_compression_trailer(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        synced = []
+
+        def fsync(fd):
+            # The gzip stream is complete when the file is synced
+            path = os.path.join(tmpdir, os.listdir(tmpdir)[0])
+            with gzip.open(path) as f:
+                synced.append(f.read())
+
+        monkeypatch.setattr(durability_module.os, "fsync", fsync)
+        exporter = DatabricksVolumeLogExporter(tmpdir, compression="gzip")
+        exporter.export(_batch(2))
+        assert len(synced) == 1
+        assert synced[0].count(b"\n") == 2
+
+
+def test_policy_shared_between_exporters(fsyncs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        policy = DurabilityPolicy("per-batch")
+        first = DatabricksVolumeLogExporter(tmpdir, durability=policy)
+        second = DatabricksVolumeLogExporter(tmpdir, durability=policy)
+        first.export(_batch())
+        second.export(_batch())
+        assert policy.syncs == 2
+
+
+def test_per_batch_exports_sync_concurrently(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir)
+        # Both exports must be syncing at the same time to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        real_commit = exporter.durability.commit
+
+        def commit(file, nbytes):
+            barrier.wait()
+            real_commit(file, nbytes)
+
+        monkeypatch.setattr(exporter.durability, "commit", commit)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(exporter.export(_batch())))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [LogExportResult.SUCCESS] * 2
+        assert len(os.listdir(tmpdir)) == 2
+
+
+@pytest.fixture
+def synced_inodes(monkeypatch):
+    inodes = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        inodes.append(os.fstat(fd).st_ino)
+        real_fsync(fd)
+
+    monkeypatch.setattr(durability_module.os, "fsync", fsync)
+    return inodes
+
+
+def _inodes(directory):
+    paths = (os.path.join(directory, name) for name in os.listdir(directory))
+    return sorted(os.stat(path).st_ino for path in paths if os.path.isfile(path))
+
+
+def test_interval_syncs_files_closed_mid_interval(synced_inodes):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        policy = DurabilityPolicy("interval", interval_millis=60_000)
+        exporter = DatabricksVolumeLogExporter(tmpdir, durability=policy)
+        exporter.export(_batch())
+        exporter.export(_batch())
+        # Both files are closed but not synced yet
+        assert synced_inodes == []
+        policy.flush()
+        assert sorted(synced_inodes) == _inodes(tmpdir)
+        policy.flush()
+        assert len(synced_inodes) == 2
+
+
+def test_interval_syncs_every_pending_file_of_a_shared_policy(synced_inodes):
+    with tempfile.TemporaryDirectory() as first_dir:
+        second_dir = os.path.join(first_dir, "second")
+        os.mkdir(second_dir)
+        policy = DurabilityPolicy("interval", interval_millis=60_000)
+        first = DatabricksVolumeLogExporter(first_dir, durability=policy)
+        second = DatabricksVolumeLogExporter(second_dir, durability=policy)
+        first.export(_batch())
+        assert synced_inodes == []
+        # The second exporter's write makes the group commit due
+        policy.interval_bytes = 1
+        second.export(_batch())
+        assert sorted(synced_inodes) == sorted(_inodes(first_dir) + _inodes(second_dir))
+
+
+def test_interval_syncs_after_the_interval_without_further_writes(synced_inodes):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        policy = DurabilityPolicy("interval", interval_millis=50)
+        writer = RollingFileWriter(tmpdir, durability=policy)
+        writer.write('{"a": 1}\n')
+        deadline = time.monotonic() + 5
+        while not synced_inodes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(synced_inodes) == 1
+        writer.close()
+        assert sorted(synced_inodes) == _inodes(tmpdir)
@@ -0,0 +1,121 @@
+import json
+
+from opentelemetry import trace
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.util import ns_to_iso_str as sdk_ns_to_iso_str
+
+from databricks_opentelemetry_exporter.util import encoding
+from databricks_opentelemetry_exporter.util.encoding import (
+    encode_log_batch,
+    encode_metrics_data,
+    encode_span_batch,
+    log_record_to_dict,
+    metrics_data_to_dict,
+    ns_to_iso_str,
+    span_to_dict,
+)
+
+RESOURCE = Resource({"service.name": "databricks", "service.namespace": "acmecorp"})
+
+
+def _log_record(**kwargs):
+    defaults = dict(
+        timestamp=1_700_000_000_123_456_000,
+        observed_timestamp=1_700_000_000_223_456_000,
+        trace_id=0x5B8EFFF798038103D269B633813FC60C,
+        span_id=0xEEE19B7EC3C1B174,
+        trace_flags=1,
+        severity_text="INFO",
+        severity_number=9,
+        body="Test message",
+        resource=RESOURCE,
+        attributes={"a": 1, "b": [1, 2]},
+    )
+    defaults.update(kwargs)
+    return LogRecord(**defaults)
+
+
+def _roundtrip(obj):
+    return json.loads(json.dumps(obj))
+
+
+def test_ns_to_iso_str_matches_sdk():
+    for ns in (0, 1_234_567_890, 1_700_000_000_123_456_000, 1_700_000_000_999_999_000):
+        assert ns_to_iso_str(ns) == sdk_ns_to_iso_str(ns)
+    # Rounds to the nearest microsecond, carrying into the seconds
+    assert ns_to_iso_str(1_999_999_600) == "1970-01-01T00:00:02.000000Z"
+    assert ns_to_iso_str(None) is None
+
+
+def test_log_record_matches_to_json():
+    record = _log_record()
+    assert _roundtrip(log_record_to_dict(record)) == json.loads(record.to_json())
+
+
+def test_log_batch_is_compact_json_lines():
+    batch = [LogData(_log_record(body=f"message {i}"), None) for i in range(3)]
+    payload = encode_log_batch(batch)
+    lines = payload.decode("utf-8").split("\n")
+    assert lines[-1] == ""
+    assert [json.loads(line)["body"] for line in lines[:-1]] == [
+        "message 0", "message 1", "message 2"
+    ]
+    assert b"\n    " not in payload and b'", "' not in payload
+
+
+def test_log_batch_skips_unencodable_record(caplog, capsys):
+    class Broken:
+        @property
+        def log_record(self):
+            raise RuntimeError("boom")
+
+    payload = encode_log_batch([Broken(), LogData(_log_record(), None)])
+    assert len(payload.splitlines()) == 1
+    assert "Error encoding record: boom" in caplog.text
+    assert capsys.readouterr().out == ""
+
+
+def test_json_fallback_matches_orjson():
+    record = log_record_to_dict(_log_record(body="ünïcode"))
+    assert json.loads(encoding._json_dumps(record)) == json.loads(encoding.dumps(record))
+
+
+def test_span_matches_to_json():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(resource=RESOURCE)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+    # Whole microseconds, so the SDK's float based rounding is exact
+    ts = 1_700_000_000_000_000_000
+    parent = tracer.start_span("parent", start_time=ts)
+    with trace.use_span(parent, end_on_exit=False):
+        child = tracer.start_span("child", attributes={"k": "v"}, start_time=ts + 1000)
+        child.add_event("event", {"e": 1}, timestamp=ts + 2000)
+        child.end(end_time=ts + 3000)
+    parent.end(end_time=ts + 4000)
+    spans = exporter.get_finished_spans()
+
+    for span in spans:
+        assert _roundtrip(span_to_dict(span)) == json.loads(span.to_json())
+    lines = encode_span_batch(spans).splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["child", "parent"]
+
+
+def test_metrics_match_to_json():
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(resource=RESOURCE, metric_readers=[reader])
+    meter = provider.get_meter(__name__)
+    meter.create_counter("requests").add(3, {"route": "/"})
+    meter.create_histogram("latency").record(12.5)
+    meter.create_up_down_counter("inflight").add(-1)
+    data = reader.get_metrics_data()
+
+    assert metrics_data_to_dict(data) == json.loads(data.to_json())
+    assert json.loads(encode_metrics_data(data)) == json.loads(data.to_json())
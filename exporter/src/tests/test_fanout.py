@@ -0,0 +1,253 @@
+import gzip
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.proto.collector.logs.v1.logs_service_pb2 import (
+    ExportLogsServiceRequest,
+)
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter import fanout
+from databricks_opentelemetry_exporter.fanout import (
+    FanoutLogExporter,
+    FanoutSpanExporter,
+    OTLPHttpSink,
+    Sink,
+)
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.reader import read_directory
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+
+
+def _log_data(body):
+    record = LogRecord(
+        timestamp=1_700_000_000_000_000_000,
+        trace_id=0,
+        span_id=0,
+        trace_flags=0,
+        severity_number=SeverityNumber.INFO,
+        body=body,
+        resource=Resource({"service.name": "test"}),
+    )
+    return LogData(record, InstrumentationScope("test"))
+
+
+class _RecordingSink(Sink):
+    encoding = "otlp"
+
+    def __init__(self, delay=0.0, fail=False, **kwargs):
+        super().__init__("recording", **kwargs)
+        self.payloads = []
+        self.delay = delay
+        self.fail = fail
+
+    def send(self, batch, payload):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("sink is down")
+        self.payloads.append(payload)
+
+
+@pytest.fixture
+def tmpdir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+@pytest.fixture
+def encoder_calls(monkeypatch):
+    calls = []
+    encoders = {}
+    for signal, by_encoding in fanout._ENCODERS.items():
+        for encoding, encode in by_encoding.items():
+
+            def counted(batch, encode=encode, key=(signal, encoding)):
+                calls.append(key)
+                return encode(batch)
+
+            encoders.setdefault(signal, {})[encoding] = counted
+    monkeypatch.setattr(fanout, "_ENCODERS", encoders)
+    return calls
+
+
+def _bodies(directory, signal="logs"):
+    return sorted(r["body"] for r in read_directory(directory, signal=signal))
+
+
+def test_encodes_each_format_once(tmpdir, encoder_calls):
+    dirs = [os.path.join(tmpdir, name) for name in ("json", "otlp1", "otlp2")]
+    for directory in dirs:
+        os.makedirs(directory)
+    sink = _RecordingSink()
+    exporter = FanoutLogExporter(
+        [
+            DatabricksVolumeLogExporter(dirs[0]),
+            DatabricksVolumeLogExporter(dirs[1], output_format="otlp"),
+            DatabricksVolumeLogExporter(dirs[2], output_format="otlp"),
+            sink,
+        ]
+    )
+    assert exporter.export([_log_data("a"), _log_data("b")]).name == "SUCCESS"
+    assert exporter.force_flush()
+    assert sorted(encoder_calls) == [("logs", "json"), ("logs", "otlp")]
+    for directory in dirs:
+        assert _bodies(directory) == ["a", "b"]
+    (payload,) = sink.payloads
+    request = ExportLogsServiceRequest.FromString(payload)
+    records = request.resource_logs[0].scope_logs[0].log_records
+    assert [r.body.string_value for r in records] == ["a", "b"]
+    exporter.shutdown()
+
+
+def test_exporters_that_encode_themselves(tmpdir, encoder_calls):
+    exporter = FanoutLogExporter(
+        [DatabricksVolumeLogExporter(tmpdir, resource_mode="header")]
+    )
+    assert exporter.sinks[0].encoding is None
+    assert exporter.export([_log_data("a")]).name == "SUCCESS"
+    assert exporter.force_flush()
+    assert encoder_calls == []
+    assert _bodies(tmpdir) == ["a"]
+    with pytest.raises(ValueError):
+        exporter.sinks[0].exporter.export_encoded([_log_data("a")], b"")
+
+
+def test_failing_sink_is_isolated(tmpdir):
+    exporter = FanoutLogExporter(
+        [DatabricksVolumeLogExporter(tmpdir), _RecordingSink(fail=True)]
+    )
+    assert exporter.export([_log_data("a")]).name == "SUCCESS"
+    # The failure surfaces once the send has run
+    assert not exporter.force_flush()
+    assert exporter.force_flush()
+    assert _bodies(tmpdir) == ["a"]
+
+
+def test_slow_sink_does_not_block_export(tmpdir):
+    slow = _RecordingSink(delay=0.5, max_pending=1)
+    exporter = FanoutLogExporter([DatabricksVolumeLogExporter(tmpdir), slow])
+
+    start = time.monotonic()
+    assert exporter.export([_log_data("a")]).name == "SUCCESS"
+    # Still busy with the first batch: the second skips it
+    assert exporter.export([_log_data("b")]).name == "FAILURE"
+    assert time.monotonic() - start < 0.4
+
+    assert exporter.force_flush()
+    assert _bodies(tmpdir) == ["a", "b"]
+    assert len(slow.payloads) == 1
+    exporter.shutdown()
+
+
+def test_export_returns_before_sinks_finish(tmpdir):
+    release = threading.Event()
+
+    class _BlockedSink(_RecordingSink):
+        def send(self, batch, payload):
+            release.wait(5)
+            super().send(batch, payload)
+
+    blocked = _BlockedSink()
+    exporter = FanoutLogExporter([blocked])
+    for body in "abc":
+        assert exporter.export([_log_data(body)]).name == "SUCCESS"
+    assert blocked.payloads == []
+    assert not exporter.force_flush(50)
+    release.set()
+    assert exporter.force_flush()
+    assert len(blocked.payloads) == 3
+    exporter.shutdown()
+
+
+def test_sink_is_abstract():
+    with pytest.raises(TypeError):
+        Sink("incomplete")
+
+
+class _Collector(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self.requests.append((self.path, body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def collector():
+    _Collector.requests = []
+    server = HTTPServer(("127.0.0.1", 0), _Collector)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", _Collector.requests
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_otlp_http_sink(tmpdir, collector, compression):
+    endpoint, received = collector
+    exporter = FanoutLogExporter(
+        [
+            DatabricksVolumeLogExporter(tmpdir, output_format="otlp"),
+            OTLPHttpSink(endpoint, "logs", compression=compression),
+        ]
+    )
+    assert exporter.export([_log_data("a")]).name == "SUCCESS"
+    assert exporter.force_flush()
+    ((path, body),) = received
+    assert path == "/v1/logs"
+    request = ExportLogsServiceRequest.FromString(body)
+    assert request.resource_logs[0].scope_logs[0].log_records[0].body.string_value == "a"
+    assert _bodies(tmpdir) == ["a"]
+    exporter.shutdown()
+
+
+def test_otlp_http_sink_validation():
+    with pytest.raises(ValueError, match="Unsupported signal"):
+        OTLPHttpSink("http://localhost:4318", "profiles")
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        OTLPHttpSink("http://localhost:4318", "logs", compression="zstd")
+
+
+def test_span_fanout(tmpdir, collector, encoder_calls):
+    endpoint, received = collector
+    json_dir = os.path.join(tmpdir, "json")
+    otlp_dir = os.path.join(tmpdir, "otlp")
+    os.makedirs(json_dir)
+    os.makedirs(otlp_dir)
+    exporter = FanoutSpanExporter(
+        [
+            DatabricksVolumeTraceExporter(json_dir),
+            DatabricksVolumeTraceExporter(otlp_dir, output_format="otlp"),
+            OTLPHttpSink(endpoint, "traces"),
+        ]
+    )
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    with provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+
+    assert exporter.force_flush()
+    assert sorted(encoder_calls) == [("traces", "json"), ("traces", "otlp")]
+    for directory in (json_dir, otlp_dir):
+        (span,) = read_directory(directory, signal="traces")
+        assert span["name"] == "span"
+    ((path, _),) = received
+    assert path == "/v1/traces"
+    provider.shutdown()
@@ -0,0 +1,120 @@
+import json
+import os
+import random
+import tempfile
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+from databricks_opentelemetry_exporter.util.index import (
+    BloomFilter,
+    find_files,
+    index_path,
+    read_index,
+)
+
+
+def _log_data(timestamp, trace_id=0, severity_number=9, attributes=None):
+    record = LogRecord(
+        timestamp=timestamp,
+        trace_id=trace_id,
+        span_id=1 if trace_id else 0,
+        severity_number=severity_number,
+        body="message",
+        resource=Resource({}),
+        attributes=attributes or {},
+    )
+    return LogData(record, None)
+
+
+def _data_files(root):
+    return sorted(find_files(root))
+
+
+def test_bloom_filter_has_no_false_negatives():
+    ids = [random.getrandbits(128) for _ in range(1000)]
+    bloom = BloomFilter.for_capacity(len(ids))
+    for trace_id in ids:
+        bloom.add(trace_id)
+    bloom = BloomFilter.from_dict(json.loads(json.dumps(bloom.to_dict())))
+    assert all(trace_id in bloom for trace_id in ids)
+    false_positives = sum(random.getrandbits(128) in bloom for _ in range(10_000))
+    assert false_positives < 300
+
+
+def test_per_batch_file_index():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, index=True)
+        exporter.export([
+            _log_data(1000, trace_id=0xABC, attributes={"user": "a"}),
+            _log_data(3000, severity_number=17, attributes={"route": "/"}),
+        ])
+        (path,) = _data_files(tmpdir)
+        assert sorted(os.listdir(tmpdir)) == sorted([os.path.basename(path), "_index"])
+        index = read_index(path)
+        assert index["min_time_unix_nano"] == 1000
+        assert index["max_time_unix_nano"] == 3000
+        assert index["records"] == 2
+        assert index["severity_counts"] == {"INFO": 1, "ERROR": 1}
+        assert index["attribute_keys"] == ["route", "user"]
+        assert 0xABC in BloomFilter.from_dict(index["trace_id_bloom"])
+
+
+def test_find_files_by_trace_and_time():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, index=True)
+        for i in range(20):
+            exporter.export([_log_data(i * 1000, trace_id=i + 1)])
+        # A file without an index can't be ruled out
+        with open(os.path.join(tmpdir, "legacy.json"), "w") as f:
+            f.write("{}\n")
+
+        matches = list(find_files(tmpdir, trace_id=f"0x{5:032x}"))
+        assert os.path.join(tmpdir, "legacy.json") in matches
+        assert len(matches) <= 3
+        assert any(
+            json.loads(open(m).read()).get("trace_id") == f"0x{5:032x}" for m in matches
+        )
+
+        matches = list(find_files(tmpdir, start_time_ns=5000, end_time_ns=7000))
+        assert len(matches) == 3 + 1
+
+
+def test_rolling_writer_indexes_each_rolled_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, rolling=True, max_file_records=3, index=True, resource_mode="header"
+        )
+        for i in range(7):
+            exporter.export([_log_data(i, trace_id=i + 1)])
+        exporter.shutdown()
+        files = _data_files(tmpdir)
+        assert len(files) == 3
+        indexes = [read_index(path) for path in files]
+        assert sorted(index["records"] for index in indexes) == [1, 3, 3]
+        assert sum(index["records"] for index in indexes) == 7
+        for path, index in zip(files, indexes):
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+            trace_ids = [int(r["trace_id"], 16) for r in lines if "header" not in r]
+            bloom = BloomFilter.from_dict(index["trace_id_bloom"])
+            assert all(trace_id in bloom for trace_id in trace_ids)
+
+
+def test_trace_exporter_index():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, index=True)
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with provider.get_tracer(__name__).start_as_current_span("root") as span:
+            span.set_attribute("route", "/")
+        (path,) = _data_files(tmpdir)
+        assert os.path.exists(index_path(path))
+        index = read_index(path)
+        assert index["status_counts"] == {"UNSET": 1}
+        assert index["attribute_keys"] == ["route"]
+        assert list(find_files(tmpdir, trace_id=span.get_span_context().trace_id)) == [path]
@@ -0,0 +1,234 @@
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+from opentelemetry.sdk._logs import LoggingHandler
+
+from databricks_opentelemetry_exporter.main import (
+    SIGNALS,
+    TelemetryConfig,
+    init_telemetry,
+)
+from databricks_opentelemetry_exporter.reader import read_directory
+
+# Cumulative -X importtime cost of `import databricks_opentelemetry_exporter`,
+# in microseconds. It's around 1ms, the rest is headroom for slow machines.
+IMPORT_BUDGET_US = 50_000
+
+# Never imported by `import databricks_opentelemetry_exporter`
+HEAVY_MODULES = (
+    "opentelemetry.sdk",
+    "google.protobuf",
+    "requests",
+    "pyarrow",
+    "databricks.sdk",
+)
+
+
+@pytest.fixture
+def tmpdir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+def _run(code):
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=src,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout, result.stderr
+
+
+def _import_times(stderr):
+    """``{module: cumulative µs}`` from ``-X importtime`` output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time():
+    # Best of a few runs, a busy machine shouldn't fail the test
+    costs = []
+    for _ in range(3):
+        _, stderr = _run("import databricks_opentelemetry_exporter")
+        times = _import_times(stderr)
+        costs.append(times["databricks_opentelemetry_exporter"])
+        assert not [m for m in times if m.startswith(HEAVY_MODULES)]
+    assert min(costs) < IMPORT_BUDGET_US
+
+
+def test_imports_only_configured_signals(tmpdir):
+    stdout, _ = _run(
+        "import sys\n"
+        "from databricks_opentelemetry_exporter import init_telemetry\n"
+        f"init_telemetry(export_path={tmpdir!r}, signals=['logs'],"
+        " detect_resource=False)\n"
+        "print('\\n'.join(sys.modules))\n"
+    )
+    modules = set(stdout.split())
+    assert "databricks_opentelemetry_exporter.logs.export" in modules
+    for module in (
+        "databricks_opentelemetry_exporter.traces.export",
+        "databricks_opentelemetry_exporter.metrics.export",
+        "databricks_opentelemetry_exporter.resource.detector",
+        "databricks_opentelemetry_exporter.formats.parquet",
+        "google.protobuf",
+        "requests",
+    ):
+        assert module not in modules
+
+
+def test_config_from_env(tmpdir):
+    config = TelemetryConfig.from_env(
+        {
+            "DATABRICKS_OTEL_EXPORT_PATH": tmpdir,
+            "DATABRICKS_OTEL_TRACES_PATH": "/Volumes/main/default/traces",
+            "DATABRICKS_OTEL_SIGNALS": "logs, traces",
+            "DATABRICKS_OTEL_OUTPUT_FORMAT": "otlp",
+            "DATABRICKS_OTEL_COMPRESSION": "gzip",
+            "DATABRICKS_OTEL_DETECT_RESOURCE": "false",
+            "OTEL_SERVICE_NAME": "etl",
+        },
+        output_format="json",
+    )
+    assert config.signals == ("logs", "traces")
+    assert config.path("logs") == os.path.join(tmpdir, "logs")
+    assert config.path("traces") == "/Volumes/main/default/traces"
+    assert config.output_format == "json"
+    assert config.exporter_options == {"compression": "gzip"}
+    assert config.detect_resource is False
+    assert config.service_name == "etl"
+
+
+@pytest.mark.parametrize(
+    "environ",
+    [
+        {"DATABRICKS_OTEL_SIGNALS": "logs,profiles"},
+        {"DATABRICKS_OTEL_OUTPUT_FORMAT": "csv"},
+        {"DATABRICKS_OTEL_DETECT_RESOURCE": "maybe"},
+        {"DATABRICKS_OTEL_EXPORT_PATH": ""},
+    ],
+)
+def test_config_validation(environ):
+    environ = {"DATABRICKS_OTEL_EXPORT_PATH": "/tmp", **environ}
+    with pytest.raises(ValueError):
+        TelemetryConfig.from_env(environ)
+
+
+def test_init_telemetry(tmpdir):
+    telemetry = init_telemetry(
+        export_path=tmpdir,
+        detect_resource=False,
+        set_global=False,
+        logging_handler=False,
+        service_name="etl",
+    )
+    logger = logging.getLogger("test_init_telemetry")
+    logger.propagate = False
+    assert telemetry.handler is None
+
+    handler = LoggingHandler(logger_provider=telemetry.logger_provider)
+    logger.addHandler(handler)
+    try:
+        logger.warning("hello")
+    finally:
+        logger.removeHandler(handler)
+    with telemetry.tracer_provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    telemetry.meter_provider.get_meter(__name__).create_counter("requests").add(1)
+    assert telemetry.force_flush()
+    telemetry.shutdown()
+
+    assert sorted(os.listdir(tmpdir)) == sorted(SIGNALS)
+    (log,) = read_directory(os.path.join(tmpdir, "logs"), signal="logs")
+    assert log["body"] == "hello"
+    assert log["resource"]["attributes"]["service.name"] == "etl"
+    (span,) = read_directory(os.path.join(tmpdir, "traces"), signal="traces")
+    assert span["name"] == "span"
+    assert os.listdir(os.path.join(tmpdir, "metrics"))
+
+
+def _export_all(telemetry):
+    logger = logging.getLogger("test_init_telemetry")
+    logger.propagate = False
+    handler = LoggingHandler(logger_provider=telemetry.logger_provider)
+    logger.addHandler(handler)
+    try:
+        logger.warning("hello")
+    finally:
+        logger.removeHandler(handler)
+    with telemetry.tracer_provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    telemetry.meter_provider.get_meter(__name__).create_counter("requests").add(1)
+    telemetry.shutdown()
+
+
+def _suffixes(directory):
+    return {name.split(".", 1)[1] for name in os.listdir(directory)}
+
+
+def test_parquet_output_format(tmpdir):
+    pytest.importorskip("pyarrow.parquet")
+    telemetry = init_telemetry(
+        export_path=tmpdir,
+        output_format="parquet",
+        detect_resource=False,
+        set_global=False,
+        logging_handler=False,
+    )
+    _export_all(telemetry)
+    assert _suffixes(os.path.join(tmpdir, "logs")) == {"parquet"}
+    assert _suffixes(os.path.join(tmpdir, "traces")) == {"parquet"}
+    # Metrics fall back to JSON
+    assert "json" in _suffixes(os.path.join(tmpdir, "metrics"))
+    (log,) = read_directory(os.path.join(tmpdir, "logs"))
+    assert log["body"] == "hello"
+
+
+def test_options_go_to_exporters_accepting_them(tmpdir):
+    telemetry = init_telemetry(
+        export_path=tmpdir,
+        detect_resource=False,
+        set_global=False,
+        logging_handler=False,
+        exporter_options={"rolling": True, "compression": "gzip"},
+        signal_options={"metrics": {"output_format": "otlp"}},
+    )
+    _export_all(telemetry)
+    assert _suffixes(os.path.join(tmpdir, "logs")) == {"json.gz"}
+    assert _suffixes(os.path.join(tmpdir, "traces")) == {"json.gz"}
+    assert "binpb.gz" in _suffixes(os.path.join(tmpdir, "metrics"))
+    (span,) = read_directory(os.path.join(tmpdir, "traces"), signal="traces")
+    assert span["name"] == "span"
+
+
+def test_signal_options_validation(tmpdir):
+    with pytest.raises(ValueError, match="Unsupported metrics output_format"):
+        TelemetryConfig(
+            export_path=tmpdir,
+            signal_options={"metrics": {"output_format": "parquet"}},
+        )
+    with pytest.raises(ValueError, match="Unsupported signal"):
+        TelemetryConfig(export_path=tmpdir, signal_options={"profiles": {}})
+
+
+def test_unsupported_exporter_options(tmpdir):
+    with pytest.raises(ValueError, match="Unsupported exporter option: 'compresion'"):
+        TelemetryConfig(export_path=tmpdir, exporter_options={"compresion": "zstd"})
+    # Only the log exporter writes rolling files
+    with pytest.raises(ValueError, match="Unsupported exporter option: 'rolling'"):
+        TelemetryConfig(
+            export_path=tmpdir, signals=["traces"], exporter_options={"rolling": True}
+        )
+    TelemetryConfig(export_path=tmpdir, exporter_options={"rolling": True})
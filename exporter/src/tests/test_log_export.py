@@ -125,3 +125,58 @@ def test_exporter_handles_file_collision():
         files = os.listdir(tmpdir)
         assert len(files) == 2
         assert files[0] != files[1]
+
+def test_rolling_exporter_appends_batches():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, default_formatter, rolling=True, max_file_records=3
+        )
+
+        record = LogRecord(
+            timestamp=1234567890,
+            trace_id=None,
+            span_id=None,
+            trace_flags=None,
+            severity_text="INFO",
+            severity_number=9,
+            body="Test message",
+            resource=None,
+            attributes={}
+        )
+
+        batch = [LogData(record, 1234567890)] * 2
+        assert exporter.export(batch) == LogExportResult.SUCCESS
+        assert exporter.export(batch) == LogExportResult.SUCCESS
+        assert exporter.export(batch) == LogExportResult.SUCCESS
+        exporter.shutdown()
+
+        # 6 records with a 3 record limit: rolled after the 2nd and 3rd batch
+        files = os.listdir(tmpdir)
+        assert len(files) == 2
+        assert all(f.endswith(".json") for f in files)
+        lines = []
+        for name in files:
+            with open(os.path.join(tmpdir, name)) as f:
+                lines.extend(f.read().splitlines())
+        assert len(lines) == 6
+        assert all(json.loads(line)["body"] == "Test message" for line in lines)
+
+def test_rolling_exporter_force_flush_publishes_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, default_formatter, rolling=True)
+
+        record = LogRecord(
+            timestamp=1234567890,
+            severity_text="INFO",
+            severity_number=9,
+            body="Test message",
+            resource=None,
+            attributes={}
+        )
+        exporter.export([LogData(record, 1234567890)])
+        assert not any(f.endswith(".json") for f in os.listdir(tmpdir))
+
+        assert exporter.force_flush()
+        files = os.listdir(tmpdir)
+        assert len(files) == 1 and files[0].endswith(".json")
+        exporter.shutdown()
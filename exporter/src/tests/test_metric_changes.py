@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader, MetricExportResult
+
+from databricks_opentelemetry_exporter.metrics import export as metrics_export
+from databricks_opentelemetry_exporter.metrics.changes import SeriesTracker
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+
+
+def _points(path):
+    with open(path) as f:
+        data = json.loads(f.read())
+    return {
+        (metric["name"], tuple(sorted(point["attributes"].items()))): point.get("value")
+        for resource_metrics in data["resource_metrics"]
+        for scope_metrics in resource_metrics["scope_metrics"]
+        for metric in scope_metrics["metrics"]
+        for point in metric["data"]["data_points"]
+    }
+
+
+def _setup():
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader])
+    counter = provider.get_meter("test").create_counter("requests")
+    return reader, counter
+
+
+def test_change_only_skips_unchanged_series():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader, counter = _setup()
+        exporter = DatabricksVolumeMetricsExporter(metrics_dir=tmpdir, change_only=True)
+
+        counter.add(1, {"route": "/a"})
+        counter.add(1, {"route": "/b"})
+        exporter.export(reader.get_metrics_data())
+        (first,) = os.listdir(tmpdir)
+        assert first.endswith(".snapshot.json")
+
+        # Nothing changed, nothing written
+        exporter.export(reader.get_metrics_data())
+        assert len(os.listdir(tmpdir)) == 1
+
+        counter.add(1, {"route": "/b"})
+        exporter.export(reader.get_metrics_data())
+        (second,) = set(os.listdir(tmpdir)) - {first}
+        assert not second.endswith(".snapshot.json")
+        assert _points(os.path.join(tmpdir, second)) == {
+            ("requests", (("route", "/b"),)): 2
+        }
+
+
+def test_change_only_writes_periodic_snapshot():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader, counter = _setup()
+        exporter = DatabricksVolumeMetricsExporter(
+            metrics_dir=tmpdir, change_only=True, snapshot_interval_millis=0
+        )
+        counter.add(1, {"route": "/a"})
+        exporter.export(reader.get_metrics_data())
+        exporter.export(reader.get_metrics_data())
+        files = sorted(os.listdir(tmpdir))
+        assert len(files) == 2
+        assert all(f.endswith(".snapshot.json") for f in files)
+        assert _points(os.path.join(tmpdir, files[1])) == {
+            ("requests", (("route", "/a"),)): 1
+        }
+
+
+def test_tracker_is_bounded():
+    reader, counter = _setup()
+    tracker = SeriesTracker(max_series=10)
+    for i in range(50):
+        counter.add(1, {"id": i})
+    assert tracker.filter(reader.get_metrics_data(), full=True) is not None
+    tracker.commit()
+    assert len(tracker) == 10
+    # Evicted series count as changed again, but memory stays bounded
+    tracker.filter(reader.get_metrics_data())
+    tracker.commit()
+    assert len(tracker) == 10
+
+
+def test_failed_write_keeps_changes(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader, counter = _setup()
+        exporter = DatabricksVolumeMetricsExporter(metrics_dir=tmpdir, change_only=True)
+        counter.add(1, {"route": "/a"})
+        exporter.export(reader.get_metrics_data())
+        (first,) = os.listdir(tmpdir)
+
+        counter.add(1, {"route": "/a"})
+
+        def fail(*args, **kwargs):
+            raise OSError("volume unavailable")
+
+        with monkeypatch.context() as m:
+            m.setattr(metrics_export, "open_compressed", fail)
+            assert exporter.export(reader.get_metrics_data()) == MetricExportResult.FAILURE
+
+        # The point that failed to export is still new to the tracker
+        assert exporter.export(reader.get_metrics_data()) == MetricExportResult.SUCCESS
+        (second,) = set(os.listdir(tmpdir)) - {first}
+        assert _points(os.path.join(tmpdir, second)) == {
+            ("requests", (("route", "/a"),)): 2
+        }
+
+
+def test_failed_snapshot_is_retried(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader, counter = _setup()
+        exporter = DatabricksVolumeMetricsExporter(metrics_dir=tmpdir, change_only=True)
+        counter.add(1, {"route": "/a"})
+
+        def fail(*args, **kwargs):
+            raise OSError("volume unavailable")
+
+        with monkeypatch.context() as m:
+            m.setattr(metrics_export, "open_compressed", fail)
+            assert exporter.export(reader.get_metrics_data()) == MetricExportResult.FAILURE
+        exporter.export(reader.get_metrics_data())
+        (first,) = os.listdir(tmpdir)
+        assert first.endswith(".snapshot.json")
@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    HistogramDataPoint,
+)
+
+from databricks_opentelemetry_exporter.metrics.aggregation import merge_delta_points
+from databricks_opentelemetry_exporter.metrics.export import (
+    DatabricksVolumeMetricReader,
+    DatabricksVolumeMetricsExporter,
+)
+
+
+def _read_all(tmpdir):
+    files = sorted(os.listdir(tmpdir))
+    return [json.loads(open(os.path.join(tmpdir, f)).read()) for f in files]
+
+
+def _metrics(data):
+    return {
+        metric["name"]: metric
+        for resource_metrics in data["resource_metrics"]
+        for scope_metrics in resource_metrics["scope_metrics"]
+        for metric in scope_metrics["metrics"]
+    }
+
+
+def _reader(tmpdir, **kwargs):
+    exporter = DatabricksVolumeMetricsExporter(metrics_dir=tmpdir)
+    return DatabricksVolumeMetricReader(exporter=exporter, **kwargs)
+
+
+def test_reader_exports_on_every_collect_by_default():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader = _reader(tmpdir)
+        provider = MeterProvider(metric_readers=[reader])
+        counter = provider.get_meter("test").create_counter("requests")
+        for _ in range(3):
+            counter.add(1)
+            reader.collect()
+        assert len(os.listdir(tmpdir)) == 3
+        provider.shutdown()
+
+
+def test_delta_collections_are_summed_into_one_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader = _reader(tmpdir, export_interval_millis=60_000, temporality="delta")
+        provider = MeterProvider(metric_readers=[reader])
+        meter = provider.get_meter("test")
+        counter = meter.create_counter("requests")
+        histogram = meter.create_histogram("latency")
+        for i in range(5):
+            counter.add(2, {"route": "/a"})
+            counter.add(1, {"route": "/b"})
+            histogram.record(i)
+            reader.collect()
+        assert os.listdir(tmpdir) == []
+
+        reader.force_flush()
+        (data,) = _read_all(tmpdir)
+        metrics = _metrics(data)
+        requests = metrics["requests"]["data"]
+        assert requests["aggregation_temporality"] == AggregationTemporality.DELTA
+        values = {p["attributes"]["route"]: p["value"] for p in requests["data_points"]}
+        assert values == {"/a": 10, "/b": 5}
+        (point,) = metrics["latency"]["data"]["data_points"]
+        assert point["count"] == 5
+        assert point["sum"] == 10
+        assert (point["min"], point["max"]) == (0, 4)
+        provider.shutdown()
+
+
+def test_cumulative_collections_keep_latest_point():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader = _reader(tmpdir, export_interval_millis=60_000)
+        provider = MeterProvider(metric_readers=[reader])
+        counter = provider.get_meter("test").create_counter("requests")
+        for _ in range(4):
+            counter.add(3)
+            reader.collect()
+        provider.shutdown()
+
+        (data,) = _read_all(tmpdir)
+        (point,) = _metrics(data)["requests"]["data"]["data_points"]
+        assert point["value"] == 12
+
+
+def test_periodic_collection_and_export():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader = _reader(
+            tmpdir,
+            collect_interval_millis=20,
+            export_interval_millis=150,
+            temporality="delta",
+        )
+        provider = MeterProvider(metric_readers=[reader])
+        counter = provider.get_meter("test").create_counter("requests")
+        deadline = time.monotonic() + 0.5
+        added = 0
+        while time.monotonic() < deadline:
+            counter.add(1)
+            added += 1
+            time.sleep(0.005)
+        provider.shutdown()
+
+        files = _read_all(tmpdir)
+        # Far fewer files than the ~25 collections, and no counts lost
+        assert 1 <= len(files) <= 6
+        total = sum(
+            p["value"]
+            for data in files
+            for p in _metrics(data)["requests"]["data"]["data_points"]
+        )
+        assert total == added
+
+
+def test_invalid_temporality():
+    with pytest.raises(ValueError):
+        DatabricksVolumeMetricReader(
+            exporter=DatabricksVolumeMetricsExporter(metrics_dir="/tmp"),
+            temporality="sometimes",
+        )
+
+
+def test_histograms_with_different_bounds_are_not_merged():
+    a = HistogramDataPoint({}, 0, 1, 1, 1.0, [1, 0], [5.0], 1.0, 1.0)
+    b = HistogramDataPoint({}, 1, 2, 1, 7.0, [0, 1, 0], [5.0, 10.0], 7.0, 7.0)
+    assert merge_delta_points(a, b) is None
+    merged = merge_delta_points(a, a)
+    assert merged.count == 2 and list(merged.bucket_counts) == [2, 0]
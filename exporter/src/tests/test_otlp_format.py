@@ -0,0 +1,143 @@
+import io
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from opentelemetry.proto.collector.logs.v1.logs_service_pb2 import ExportLogsServiceRequest
+from opentelemetry.proto.collector.metrics.v1.metrics_service_pb2 import ExportMetricsServiceRequest
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader, MetricExportResult
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.formats import otlp
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+
+RESOURCE = Resource({"service.name": "databricks"})
+
+
+def _log_batch(body="Test message"):
+    record = LogRecord(
+        timestamp=1234567890,
+        trace_id=0,
+        span_id=0,
+        trace_flags=0,
+        severity_text="INFO",
+        severity_number=SeverityNumber.INFO,
+        body=body,
+        resource=RESOURCE,
+        attributes={"a": 1}
+    )
+    return [LogData(record, InstrumentationScope("test"))]
+
+
+def test_iter_messages_round_trip():
+    stream = io.BytesIO(otlp.frame(b"abc") + otlp.frame(b"") + otlp.frame(b"de"))
+    assert list(otlp.iter_messages(stream)) == [b"abc", b"", b"de"]
+
+
+def test_iter_messages_rejects_truncated_stream():
+    with pytest.raises(ValueError):
+        list(otlp.iter_messages(io.BytesIO(otlp.frame(b"abc")[:-1])))
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_log_exporter_otlp(compression):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, output_format="otlp", rolling=True, compression=compression
+        )
+        assert exporter.export(_log_batch("first")) == LogExportResult.SUCCESS
+        assert exporter.export(_log_batch("second")) == LogExportResult.SUCCESS
+        exporter.shutdown()
+
+        files = os.listdir(tmpdir)
+        assert len(files) == 1
+        assert files[0].endswith(".binpb" + (".gz" if compression else ""))
+
+        bodies = []
+        for message in otlp.read_file(os.path.join(tmpdir, files[0])):
+            request = ExportLogsServiceRequest.FromString(message)
+            resource_logs = request.resource_logs[0]
+            assert resource_logs.resource.attributes[0].value.string_value == "databricks"
+            bodies.extend(
+                r.body.string_value for r in resource_logs.scope_logs[0].log_records
+            )
+        assert bodies == ["first", "second"]
+
+
+def test_trace_exporter_otlp():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, output_format="otlp")
+        provider = TracerProvider(resource=RESOURCE)
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with provider.get_tracer(__name__).start_as_current_span("work"):
+            pass
+        provider.shutdown()
+
+        (name,) = os.listdir(tmpdir)
+        (message,) = otlp.read_file(os.path.join(tmpdir, name))
+        request = ExportTraceServiceRequest.FromString(message)
+        assert request.resource_spans[0].scope_spans[0].spans[0].name == "work"
+
+
+def test_metrics_exporter_otlp():
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(resource=RESOURCE, metric_readers=[reader])
+    provider.get_meter(__name__).create_counter("requests").add(3)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeMetricsExporter(tmpdir, output_format="otlp")
+        assert exporter.export(reader.get_metrics_data()) == MetricExportResult.SUCCESS
+
+        (name,) = os.listdir(tmpdir)
+        assert name.endswith(".binpb")
+        (message,) = otlp.read_file(os.path.join(tmpdir, name))
+        request = ExportMetricsServiceRequest.FromString(message)
+        metric = request.resource_metrics[0].scope_metrics[0].metrics[0]
+        assert metric.name == "requests"
+        assert metric.sum.data_points[0].as_int == 3
+
+
+def test_replay_posts_each_message():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append((self.path, self.headers["Content-Type"], body))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "logs.binpb")
+            with open(path, "wb") as f:
+                f.write(otlp.encode_log_batch(_log_batch("a")))
+                f.write(otlp.encode_log_batch(_log_batch("b")))
+
+            endpoint = f"http://127.0.0.1:{server.server_port}"
+            assert otlp.replay(path, endpoint, "logs") == 2
+    finally:
+        server.shutdown()
+
+    assert [r[0] for r in received] == ["/v1/logs", "/v1/logs"]
+    assert received[0][1] == "application/x-protobuf"
+    request = ExportLogsServiceRequest.FromString(received[1][2])
+    assert request.resource_logs[0].scope_logs[0].log_records[0].body.string_value == "b"
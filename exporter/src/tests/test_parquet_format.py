@@ -0,0 +1,142 @@
+import logging
+import os
+import tempfile
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.formats.parquet import LOG_SCHEMA, SPAN_SCHEMA
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.main import init_logging
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+from databricks_opentelemetry_exporter.reader import read_directory
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+
+RESOURCE = Resource({"service.name": "databricks"})
+
+
+def _log_data(body, **kwargs):
+    record = LogRecord(
+        timestamp=1_700_000_000_000_000_000,
+        observed_timestamp=1_700_000_000_000_001_000,
+        trace_id=0x5B8EFFF798038103D269B633813FC60C,
+        span_id=0xEEE19B7EC3C1B174,
+        trace_flags=1,
+        severity_text="WARN",
+        severity_number=SeverityNumber.WARN,
+        body=body,
+        resource=RESOURCE,
+        attributes={"str": "v", "int": 3, "list": [1, 2]},
+        **kwargs
+    )
+    return LogData(record, InstrumentationScope("scope", "1.0"))
+
+
+def test_log_exporter_parquet_row_groups():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, output_format="parquet")
+        exporter._writer.row_group_size = 2
+        for i in range(3):
+            assert exporter.export([_log_data(f"message {i}")]) == LogExportResult.SUCCESS
+        exporter.shutdown()
+
+        (name,) = os.listdir(tmpdir)
+        assert name.endswith(".parquet")
+        parquet_file = pq.ParquetFile(os.path.join(tmpdir, name))
+        assert parquet_file.metadata.num_row_groups == 2
+        table = parquet_file.read()
+        assert table.schema == LOG_SCHEMA
+
+        rows = table.to_pylist()
+        assert [r["body"] for r in rows] == ["message 0", "message 1", "message 2"]
+        row = rows[0]
+        assert row["severity_number"] == 13
+        assert row["trace_id"] == "5b8efff798038103d269b633813fc60c"
+        assert dict(row["attributes"]) == {"str": "v", "int": "3", "list": "[1,2]"}
+        assert dict(row["resource"])["service.name"] == "databricks"
+        assert row["scope_name"] == "scope"
+
+
+def test_log_exporter_parquet_force_flush_rolls():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, output_format="parquet")
+        exporter.export([_log_data("a")])
+        assert exporter.force_flush()
+        exporter.export([_log_data("b")])
+        exporter.shutdown()
+        assert sorted(
+            pq.read_table(os.path.join(tmpdir, n)).num_rows for n in os.listdir(tmpdir)
+        ) == [1, 1]
+
+
+def test_read_parquet_records():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, output_format="parquet")
+        later = _log_data("b")
+        later.log_record.timestamp += 1
+        exporter.export([_log_data("a"), later])
+        exporter.shutdown()
+        records = list(read_directory(tmpdir))
+        assert [r["body"] for r in records] == ["a", "b"]
+        assert records[0]["timestamp"] == 1_700_000_000_000_000_000
+        assert records[0]["attributes"]["int"] == "3"
+        records = read_directory(
+            tmpdir, start_time_ns=1_700_000_000_000_000_001, min_severity=13
+        )
+        assert [r["body"] for r in records] == ["b"]
+        records = read_directory(tmpdir, trace_id="5b8efff798038103d269b633813fc60c")
+        assert len(list(records)) == 2
+
+
+def test_trace_exporter_parquet():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, output_format="parquet")
+        provider = TracerProvider(resource=RESOURCE)
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer(__name__)
+        with tracer.start_as_current_span("parent"):
+            with tracer.start_as_current_span("child", attributes={"k": 1}) as span:
+                span.add_event("event")
+        provider.shutdown()
+
+        (name,) = os.listdir(tmpdir)
+        table = pq.read_table(os.path.join(tmpdir, name))
+        assert table.schema == SPAN_SCHEMA
+        assert table.column("start_time").type.unit == "ns"
+        child, parent = table.drop_columns(["start_time", "end_time"]).to_pylist()
+        assert child["parent_span_id"] == parent["span_id"]
+        assert child["trace_id"] == parent["trace_id"]
+        assert child["kind"] == "INTERNAL"
+        assert child["duration_ns"] >= 0
+        assert dict(child["attributes"]) == {"k": "1"}
+        assert '"name":"event"' in child["events"]
+
+
+def test_metrics_exporter_rejects_parquet():
+    with pytest.raises(ValueError):
+        DatabricksVolumeMetricsExporter("/tmp", output_format="parquet")
+
+
+def test_init_logging_selects_parquet():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        handler = init_logging(tmpdir, output_format="parquet")
+        try:
+            logger = logging.getLogger("test_init_logging_selects_parquet")
+            logger.warning("hello parquet")
+            handler._logger_provider.shutdown()
+        finally:
+            logging.getLogger().removeHandler(handler)
+
+        (name,) = os.listdir(tmpdir)
+        assert pq.read_table(os.path.join(tmpdir, name)).column("body").to_pylist() == [
+            "hello parquet"
+        ]
@@ -0,0 +1,131 @@
+import datetime
+import os
+import tempfile
+
+import pytest
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+from databricks_opentelemetry_exporter.util import partitioning
+from databricks_opentelemetry_exporter.util.partitioning import Partitioner
+
+HOUR_13 = int(datetime.datetime(2024, 5, 1, 13, 59, tzinfo=datetime.timezone.utc).timestamp()) * 10**9
+HOUR_14 = HOUR_13 + 2 * 60 * 10**9
+
+
+def _log_data(timestamp, body="message"):
+    record = LogRecord(
+        timestamp=timestamp,
+        severity_text="INFO",
+        severity_number=9,
+        body=body,
+        resource=Resource({}),
+        attributes={}
+    )
+    return LogData(record, None)
+
+
+def _files(root):
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root)
+        for dirpath, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def test_partition_path():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        partitioner = Partitioner(tmpdir, "logs", host="node-1")
+        path = partitioner.directory_for(HOUR_13)
+        assert path == os.path.join(
+            tmpdir, "signal=logs", "date=2024-05-01", "hour=13", "host=node-1"
+        )
+        assert os.path.isdir(path)
+
+        partitioner = Partitioner(tmpdir, "logs", partition_by=("date", "host"), host="a/b")
+        assert partitioner.directory_for(HOUR_13) == os.path.join(
+            tmpdir, "date=2024-05-01", "host=a_b"
+        )
+
+
+def test_partition_directory_created_once(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        calls = []
+        real_makedirs = os.makedirs
+
+        def makedirs(path, exist_ok=False):
+            calls.append(path)
+            real_makedirs(path, exist_ok=exist_ok)
+
+        monkeypatch.setattr(partitioning.os, "makedirs", makedirs)
+        partitioner = Partitioner(tmpdir, "logs")
+        for _ in range(3):
+            partitioner.directory_for(HOUR_13)
+            partitioner.directory_for(HOUR_14)
+        # os.makedirs recurses for missing parents, count the leaf calls only
+        assert len([c for c in calls if os.path.basename(c).startswith("host=")]) == 2
+
+
+def test_invalid_partition_field():
+    with pytest.raises(ValueError):
+        Partitioner("/tmp", "logs", partition_by=("minute",))
+
+
+def test_log_exporter_splits_batch_by_hour():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, partition_by=True)
+        exporter.export([_log_data(HOUR_13), _log_data(HOUR_14), _log_data(HOUR_13)])
+        files = _files(tmpdir)
+        assert len(files) == 2
+        assert [f.split(os.sep)[2] for f in files] == ["hour=13", "hour=14"]
+        with open(os.path.join(tmpdir, files[0])) as f:
+            assert len(f.readlines()) == 2
+
+
+def test_rolling_log_exporter_keeps_a_writer_per_partition():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, rolling=True, partition_by=("date", "hour")
+        )
+        for _ in range(3):
+            exporter.export([_log_data(HOUR_13), _log_data(HOUR_14)])
+        exporter.shutdown()
+        files = _files(tmpdir)
+        assert [os.path.dirname(f) for f in files] == [
+            os.path.join("date=2024-05-01", "hour=13"),
+            os.path.join("date=2024-05-01", "hour=14"),
+        ]
+        for name in files:
+            with open(os.path.join(tmpdir, name)) as f:
+                assert len(f.readlines()) == 3
+
+
+def test_trace_exporter_keeps_traces_in_one_partition():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, partition_by=("signal", "date"))
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with provider.get_tracer(__name__).start_as_current_span("root"):
+            pass
+        (name,) = _files(tmpdir)
+        assert name.startswith(os.path.join("signal=traces", "date="))
+
+
+def test_metrics_exporter_partitions_by_export_time():
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        provider.get_meter("test").create_counter("requests").add(1)
+        exporter = DatabricksVolumeMetricsExporter(metrics_dir=tmpdir, partition_by=True)
+        exporter.export(reader.get_metrics_data())
+        (name,) = _files(tmpdir)
+        assert name.startswith("signal=metrics" + os.sep)
@@ -0,0 +1,194 @@
+import os
+import tempfile
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.reader import (
+    file_format,
+    read_directory,
+    read_records,
+    record_severity,
+    record_time,
+    record_trace_id,
+)
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+from databricks_opentelemetry_exporter.util.index import find_files
+
+HOUR = 3600 * 1_000_000_000
+# 2024-05-01T13:00:00Z
+T0 = 1714568400 * 1_000_000_000
+
+
+def _log_data(timestamp, trace_id=0, severity_number=9, body="message"):
+    record = LogRecord(
+        timestamp=timestamp,
+        trace_id=trace_id,
+        span_id=1 if trace_id else 0,
+        trace_flags=0,
+        severity_number=SeverityNumber(severity_number),
+        body=body,
+        resource=Resource({"service.name": "test"}),
+        attributes={"n": 1},
+    )
+    return LogData(record, InstrumentationScope("test"))
+
+
+def _batch():
+    return [
+        _log_data(T0 + 1000, trace_id=0xABC, body="a"),
+        _log_data(T0 + 2000, severity_number=17, body="b"),
+        _log_data(T0 + 3000, severity_number=5, body="c"),
+    ]
+
+
+def _bodies(records):
+    return [record["body"] for record in records]
+
+
+def test_file_format():
+    assert file_format("a/b.json") == "json"
+    assert file_format("a/b.json.gz") == "json"
+    assert file_format("a/b.snapshot.json.zst") == "json"
+    assert file_format("a/b.binpb.gz") == "otlp"
+    assert file_format("a/b.parquet") == "parquet"
+    assert file_format("a/_index/b.json.index.json") == "json"
+    assert file_format("a/b.txt") is None
+
+
+@pytest.mark.parametrize("output_format", ["json", "otlp"])
+@pytest.mark.parametrize("compression", [None, "gzip"])
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_read_log_records_with_predicates(output_format, compression, use_mmap):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, output_format=output_format, compression=compression
+        )
+        exporter.export(_batch())
+        (path,) = find_files(tmpdir)
+
+        def read(**kwargs):
+            return _bodies(read_records(path, signal="logs", use_mmap=use_mmap, **kwargs))
+
+        assert read() == ["a", "b", "c"]
+        assert read(start_time_ns=T0 + 2000) == ["b", "c"]
+        assert read(start_time_ns=T0 + 1500, end_time_ns=T0 + 2500) == ["b"]
+        assert read(min_severity=9) == ["a", "b"]
+        assert read(trace_id=0xABC) == ["a"]
+        assert read(trace_id=f"{0xABC:032x}") == ["a"]
+        assert read(trace_id=0xABC, min_severity=17) == []
+
+        record = next(read_records(path, signal="logs", use_mmap=use_mmap))
+        assert record_time(record) == T0 + 1000
+        assert record_severity(record) == 9
+        assert record_trace_id(record) == 0xABC
+        assert record["attributes"] == {"n": 1}
+        assert record["resource"]["attributes"]["service.name"] == "test"
+
+
+def test_read_header_resource_mode_rejoins_resource():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, resource_mode="header")
+        exporter.export(_batch())
+        (path,) = find_files(tmpdir)
+        records = list(read_records(path, min_severity=9))
+        assert _bodies(records) == ["a", "b"]
+        assert all(
+            record["resource"]["attributes"]["service.name"] == "test"
+            for record in records
+        )
+
+
+@pytest.mark.parametrize("output_format", ["json", "otlp"])
+def test_read_span_records(output_format):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, output_format=output_format)
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer(__name__)
+        with tracer.start_as_current_span("root") as root:
+            with tracer.start_as_current_span("child"):
+                pass
+        with tracer.start_as_current_span("other"):
+            pass
+        trace_id = root.get_span_context().trace_id
+
+        names = sorted(
+            record["name"]
+            for record in read_directory(tmpdir, trace_id=trace_id, signal="traces")
+        )
+        assert names == ["child", "root"]
+        # JSON keeps microseconds
+        start = root.start_time // 1000 * 1000
+        names = sorted(
+            record["name"]
+            for record in read_directory(tmpdir, start_time_ns=start, signal="traces")
+        )
+        assert names == ["child", "other", "root"]
+
+
+def test_otlp_signal_is_required_outside_partitions():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, output_format="otlp")
+        exporter.export(_batch())
+        (path,) = find_files(tmpdir)
+        with pytest.raises(ValueError):
+            list(read_records(path))
+
+
+def test_read_empty_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "empty.json")
+        open(path, "wb").close()
+        assert list(read_records(path)) == []
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_read_partitioned_directory_in_order(max_workers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, output_format="otlp", partition_by=True
+        )
+        expected = []
+        for i in range(12):
+            body = f"m{i}"
+            exporter.export([_log_data(T0 + (i // 4) * HOUR + i, body=body)])
+            expected.append(body)
+
+        # OTLP signal comes from the signal= partition
+        records = read_directory(tmpdir, max_workers=max_workers)
+        assert _bodies(records) == expected
+
+        records = read_directory(
+            tmpdir,
+            start_time_ns=T0 + HOUR,
+            end_time_ns=T0 + 2 * HOUR - 1,
+            max_workers=max_workers,
+        )
+        assert _bodies(records) == expected[4:8]
+
+
+def test_partition_pruning_skips_other_hours():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, partition_by=["date", "hour"])
+        for i in range(3):
+            exporter.export([_log_data(T0 + i * HOUR)])
+        paths = list(find_files(tmpdir, start_time_ns=T0 + HOUR, end_time_ns=T0 + HOUR))
+        assert len(paths) == 1
+        assert os.path.join("date=2024-05-01", "hour=14") in paths[0]
+
+
+def test_read_directory_stops_early():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir)
+        for i in range(20):
+            exporter.export([_log_data(T0 + i, body=f"m{i}")])
+        records = read_directory(tmpdir, max_workers=2)
+        assert next(records)["body"] == "m0"
+        records.close()
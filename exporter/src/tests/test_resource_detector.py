@@ -0,0 +1,241 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from databricks_opentelemetry_exporter.resource.detector import DatabricksResourceDetector
+
+TOKEN = "fake-token"
+METADATA = {
+    "/latest/meta-data/placement/region": "us-west-2",
+    "/latest/meta-data/placement/availability-zone": "us-west-2a",
+    "/latest/meta-data/instance-type": "i3.xlarge",
+    "/latest/dynamic/instance-identity/document": json.dumps({"accountId": "123456789012"}),
+}
+
+
+class FakeIMDS(BaseHTTPRequestHandler):
+    delay = 0.0
+    requests = []
+    # Answer like the metadata service of another cloud
+    not_aws = False
+
+    def _reply(self, status, body=""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body.encode())
+        except BrokenPipeError:
+            # The client gave up on a slow response
+            pass
+
+    def do_PUT(self):
+        self.requests.append(self.path)
+        if self.path == "/latest/api/token" and not self.not_aws:
+            self._reply(200, TOKEN)
+        else:
+            self._reply(404)
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        time.sleep(self.delay)
+        if self.headers.get("X-aws-ec2-metadata-token") != TOKEN:
+            self._reply(401)
+        elif self.path in METADATA:
+            self._reply(200, METADATA[self.path])
+        else:
+            self._reply(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def imds():
+    handler = type(
+        "Handler", (FakeIMDS,), {"delay": 0.0, "requests": [], "not_aws": False}
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_detects_aws_and_os_attributes(imds):
+    _, endpoint = imds
+    detector = DatabricksResourceDetector(imds_endpoint=endpoint, cache_path=None)
+    attributes = detector.detect().attributes
+    assert attributes["cloud.provider"] == "aws"
+    assert attributes["cloud.region"] == "us-west-2"
+    assert attributes["cloud.availability_zone"] == "us-west-2a"
+    assert attributes["cloud.account.id"] == "123456789012"
+    assert attributes["host.type"] == "i3.xlarge"
+    assert attributes["host.name"]
+    assert attributes["os.type"]
+
+
+def test_metadata_requests_run_concurrently(imds):
+    handler, endpoint = imds
+    handler.delay = 0.3
+    detector = DatabricksResourceDetector(imds_endpoint=endpoint, timeout=1.0, cache_path=None)
+    start = time.monotonic()
+    attributes = detector.detect().attributes
+    # Four sequential requests would take 1.2s
+    assert time.monotonic() - start < 0.9
+    assert attributes["cloud.region"] == "us-west-2"
+
+
+def test_slow_imds_times_out(imds):
+    handler, endpoint = imds
+    handler.delay = 2.0
+    detector = DatabricksResourceDetector(imds_endpoint=endpoint, timeout=0.2, cache_path=None)
+    start = time.monotonic()
+    attributes = detector.detect().attributes
+    assert time.monotonic() - start < 1.5
+    assert "cloud.region" not in attributes
+    assert attributes["host.name"]
+
+
+def test_unreachable_imds_returns_local_attributes():
+    # Nothing listens on this port, so the token request fails right away
+    detector = DatabricksResourceDetector(
+        imds_endpoint="http://127.0.0.1:9", timeout=0.2, cache_path=None
+    )
+    attributes = detector.detect().attributes
+    assert "cloud.provider" not in attributes
+    assert attributes["os.type"]
+
+
+def test_result_is_cached_on_disk(imds):
+    handler, endpoint = imds
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, "resource.json")
+        first = DatabricksResourceDetector(imds_endpoint=endpoint, cache_path=cache_path)
+        assert first.detect().attributes["cloud.region"] == "us-west-2"
+        requests_made = len(handler.requests)
+        assert os.path.exists(cache_path)
+
+        # Another worker on the node reuses the cached detection
+        second = DatabricksResourceDetector(
+            imds_endpoint="http://127.0.0.1:9", cache_path=cache_path
+        )
+        assert second.detect().attributes["cloud.region"] == "us-west-2"
+        assert len(handler.requests) == requests_made
+
+
+def test_expired_cache_is_refreshed(imds):
+    handler, endpoint = imds
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, "resource.json")
+        with open(cache_path, "w") as f:
+            json.dump({"detected_at": 0, "attributes": {"cloud.region": "stale"}}, f)
+        detector = DatabricksResourceDetector(imds_endpoint=endpoint, cache_path=cache_path)
+        assert detector.detect().attributes["cloud.region"] == "us-west-2"
+
+
+def test_import_makes_no_requests(monkeypatch):
+    import importlib
+
+    import requests
+
+    import databricks_opentelemetry_exporter.resource.cloud.aws as aws
+    import databricks_opentelemetry_exporter.resource.os as resource_os
+
+    def fail(*args, **kwargs):
+        raise AssertionError("HTTP request made on import")
+
+    monkeypatch.setattr(requests, "get", fail)
+    monkeypatch.setattr(requests, "put", fail)
+    importlib.reload(aws)
+    importlib.reload(resource_os)
+
+
+def test_failed_detection_is_cached_briefly(imds, monkeypatch):
+    monkeypatch.setenv("DATABRICKS_RUNTIME_VERSION", "15.4")
+    _, endpoint = imds
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, "resource.json")
+        failed = DatabricksResourceDetector(
+            imds_endpoint="http://127.0.0.1:9", timeout=0.2, cache_path=cache_path
+        )
+        assert "cloud.region" not in failed.detect().attributes
+        with open(cache_path) as f:
+            cached = json.load(f)
+        assert cached["ttl_seconds"] == 60
+
+        # Still reused right away, but retried once the short TTL is over
+        detector = DatabricksResourceDetector(imds_endpoint=endpoint, cache_path=cache_path)
+        assert "cloud.region" not in detector.detect().attributes
+        cached["detected_at"] -= 61
+        with open(cache_path, "w") as f:
+            json.dump(cached, f)
+        assert detector.detect().attributes["cloud.region"] == "us-west-2"
+        with open(cache_path) as f:
+            assert json.load(f)["ttl_seconds"] == 3600
+
+
+@pytest.fixture
+def constant_modules():
+    import databricks_opentelemetry_exporter.resource.cloud.aws as aws
+    import databricks_opentelemetry_exporter.resource.os as resource_os
+
+    names = {"CLOUD_PROVIDER", "DATABRICKS_WORKSPACE_ID"}
+    names.update(aws._CONSTANTS, resource_os._CONSTANTS)
+
+    def forget():
+        for module in (aws, resource_os):
+            for name in names:
+                vars(module).pop(name, None)
+
+    forget()
+    yield aws, resource_os
+    forget()
+
+
+def test_module_constants(monkeypatch, constant_modules):
+    import platform
+
+    aws, resource_os = constant_modules
+    calls = []
+
+    def get_aws_attributes():
+        calls.append(1)
+        return {"cloud.provider": "aws", "cloud.region": "us-west-2"}
+
+    monkeypatch.setattr(aws, "get_aws_attributes", get_aws_attributes)
+    monkeypatch.setattr(
+        aws,
+        "_workspace_constants",
+        lambda: {"CLOUD_PROVIDER": "AWS", "DATABRICKS_WORKSPACE_ID": 1234},
+    )
+    assert aws.CLOUD_REGION == "us-west-2"
+    assert aws.HOST_TYPE is None
+    assert len(calls) == 1
+    assert aws.DATABRICKS_WORKSPACE_ID == 1234
+    assert aws.CLOUD_PROVIDER == "AWS"
+    assert resource_os.OS_TYPE == platform.system().lower()
+    assert resource_os.HOST_NAME == resource_os.get_host_name()
+    with pytest.raises(AttributeError):
+        aws.CLOUD_NAME
+
+
+def test_detection_off_aws_is_complete(imds, monkeypatch):
+    monkeypatch.delenv("DATABRICKS_RUNTIME_VERSION", raising=False)
+    handler, endpoint = imds
+    handler.not_aws = True
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, "resource.json")
+        detector = DatabricksResourceDetector(imds_endpoint=endpoint, cache_path=cache_path)
+        attributes = detector.detect().attributes
+        assert "cloud.provider" not in attributes
+        assert attributes["os.type"]
+        # The AWS and runtime sources answered with nothing, which isn't a failure
+        with open(cache_path) as f:
+            assert json.load(f)["ttl_seconds"] == 3600
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.reader import read_json_records
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+
+RESOURCE_A = Resource({"service.name": "a"})
+RESOURCE_B = Resource({"service.name": "b"})
+
+
+def _log_data(body, resource):
+    record = LogRecord(
+        timestamp=1234567890,
+        severity_text="INFO",
+        severity_number=9,
+        body=body,
+        resource=resource,
+        attributes={}
+    )
+    return LogData(record, None)
+
+
+def _read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_header_mode_writes_resource_once_per_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, resource_mode="header")
+        batch = [_log_data(f"m{i}", RESOURCE_A) for i in range(3)]
+        assert exporter.export(batch) == LogExportResult.SUCCESS
+
+        (name,) = os.listdir(tmpdir)
+        header, *records = _read_lines(os.path.join(tmpdir, name))
+        assert header == {"header": {"resource": {"attributes": {"service.name": "a"}, "schema_url": ""}}}
+        assert len(records) == 3
+        assert all("resource" not in r for r in records)
+
+
+def test_header_mode_rolling_repeats_header_on_change_and_roll():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, rolling=True, max_file_records=4, resource_mode="header"
+        )
+        exporter.export([_log_data("a1", RESOURCE_A), _log_data("a2", RESOURCE_A)])
+        exporter.export([_log_data("a3", RESOURCE_A), _log_data("b1", RESOURCE_B)])
+        exporter.export([_log_data("b2", RESOURCE_B)])
+        exporter.shutdown()
+
+        files = {}
+        for name in os.listdir(tmpdir):
+            lines = _read_lines(os.path.join(tmpdir, name))
+            files[lines[1]["body"]] = lines
+        first, second = files["a1"], files["b2"]
+        # One header per resource run, and a fresh header after rolling
+        assert [list(line) == ["header"] for line in first] == [True, False, False, False, True, False]
+        assert [list(line) == ["header"] for line in second] == [True, False]
+
+        records = [r for name in os.listdir(tmpdir) for r in read_json_records(os.path.join(tmpdir, name))]
+        by_body = {r["body"]: r["resource"]["attributes"]["service.name"] for r in records}
+        assert by_body == {"a1": "a", "a2": "a", "a3": "a", "b1": "b", "b2": "b"}
+
+
+def test_read_json_records_handles_inline_and_gzip():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeLogExporter(tmpdir, compression="gzip", resource_mode="header")
+        exporter.export([_log_data("m", RESOURCE_B)])
+        inline = DatabricksVolumeLogExporter(tmpdir)
+        inline.export([_log_data("n", RESOURCE_A)])
+
+        records = {
+            r["body"]: r["resource"]["attributes"]["service.name"]
+            for name in os.listdir(tmpdir)
+            for r in read_json_records(os.path.join(tmpdir, name))
+        }
+        assert records == {"m": "b", "n": "a"}
+
+
+def test_trace_exporter_header_mode():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, resource_mode="header")
+        provider = TracerProvider(resource=RESOURCE_A)
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with provider.get_tracer(__name__).start_as_current_span("work"):
+            pass
+        provider.shutdown()
+
+        (name,) = os.listdir(tmpdir)
+        header, span = _read_lines(os.path.join(tmpdir, name))
+        assert "header" in header and "resource" not in span
+        (record,) = read_json_records(os.path.join(tmpdir, name))
+        assert record["name"] == "work"
+        assert record["resource"]["attributes"]["service.name"] == "a"
+
+
+def test_header_mode_rejects_other_formats():
+    with pytest.raises(ValueError):
+        DatabricksVolumeLogExporter("/tmp", output_format="otlp", resource_mode="header")
+    with pytest.raises(ValueError):
+        DatabricksVolumeLogExporter("/tmp", formatter=str, resource_mode="header")
+    with pytest.raises(ValueError):
+        DatabricksVolumeLogExporter("/tmp", resource_mode="sidecar")
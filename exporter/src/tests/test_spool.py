@@ -0,0 +1,208 @@
+import os
+import tempfile
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.reader import read_directory
+from databricks_opentelemetry_exporter.spool import SpoolClient, SpoolServer
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+
+
+def _log_data(body):
+    record = LogRecord(
+        timestamp=1_700_000_000_000_000_000,
+        trace_id=0,
+        span_id=0,
+        trace_flags=0,
+        severity_number=SeverityNumber.INFO,
+        body=body,
+        resource=Resource({"service.name": "test"}),
+    )
+    return LogData(record, InstrumentationScope("test"))
+
+
+def _visible_files(directory):
+    return sorted(n for n in os.listdir(directory) if not n.startswith((".", "_")))
+
+
+def _bodies(directory):
+    return sorted(r["body"] for r in read_directory(directory, signal="logs"))
+
+
+@pytest.fixture
+def tmpdir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+@pytest.fixture
+def socket_path(tmpdir):
+    return os.path.join(tmpdir, "spool.sock")
+
+
+@pytest.mark.parametrize("output_format", ["json", "otlp"])
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_exporters_share_one_file(tmpdir, socket_path, output_format, compression):
+    log_dir = os.path.join(tmpdir, "logs")
+    os.mkdir(log_dir)
+    with SpoolServer(socket_path, [tmpdir]) as server:
+        exporters = [
+            DatabricksVolumeLogExporter(
+                log_dir,
+                output_format=output_format,
+                compression=compression,
+                spool=SpoolClient(socket_path),
+            )
+            for _ in range(3)
+        ]
+        for i, exporter in enumerate(exporters):
+            exporter.export([_log_data(f"m{i}a"), _log_data(f"m{i}b")])
+            exporter.export([_log_data(f"m{i}c")])
+        # Nothing is published until the server rolls the file
+        assert _visible_files(log_dir) == []
+        server.flush()
+        assert server.batches == 6
+        assert server.records == 9
+        assert len(_visible_files(log_dir)) == 1
+        for exporter in exporters:
+            exporter.shutdown()
+    assert _bodies(log_dir) == sorted(f"m{i}{c}" for i in range(3) for c in "abc")
+
+
+def test_header_resource_mode(tmpdir, socket_path):
+    with SpoolServer(socket_path, [tmpdir]):
+        exporter = DatabricksVolumeLogExporter(
+            tmpdir, resource_mode="header", spool=socket_path
+        )
+        exporter.export([_log_data("a")])
+        exporter.export([_log_data("b")])
+    (record, _) = read_directory(tmpdir)
+    assert record["resource"]["attributes"] == {"service.name": "test"}
+
+
+def test_falls_back_without_server(tmpdir, socket_path):
+    client = SpoolClient(socket_path, retry_seconds=60)
+    exporter = DatabricksVolumeLogExporter(tmpdir, spool=client)
+    exporter.export([_log_data("a")])
+    exporter.export([_log_data("b")])
+    assert len(_visible_files(tmpdir)) == 2
+    assert not client.available()
+    assert _bodies(tmpdir) == ["a", "b"]
+
+
+def test_falls_back_when_server_stops(tmpdir, socket_path):
+    log_dir = os.path.join(tmpdir, "logs")
+    os.mkdir(log_dir)
+    exporter = DatabricksVolumeLogExporter(
+        log_dir, spool=SpoolClient(socket_path, retry_seconds=0)
+    )
+    with SpoolServer(socket_path, [tmpdir]):
+        exporter.export([_log_data("spooled")])
+    exporter.export([_log_data("direct")])
+    # Reconnects once the server is back
+    with SpoolServer(socket_path, [tmpdir]) as server:
+        exporter.export([_log_data("spooled again")])
+        assert server.batches == 1
+    assert _bodies(log_dir) == ["direct", "spooled", "spooled again"]
+    assert len(_visible_files(log_dir)) == 3
+
+
+def test_rejected_batches_are_written_directly(tmpdir, socket_path):
+    allowed = os.path.join(tmpdir, "allowed")
+    other = os.path.join(tmpdir, "other")
+    os.mkdir(allowed)
+    os.mkdir(other)
+    with SpoolServer(socket_path, allowed_directories=[allowed]) as server:
+        DatabricksVolumeLogExporter(allowed, spool=socket_path).export([_log_data("a")])
+        DatabricksVolumeLogExporter(other, spool=socket_path).export([_log_data("b")])
+        assert server.batches == 1
+        assert len(_visible_files(other)) == 1
+    assert _bodies(allowed) == ["a"]
+    assert _bodies(other) == ["b"]
+
+
+def test_reconnects_after_fork(tmpdir, socket_path):
+    with SpoolServer(socket_path, [tmpdir]) as server:
+        client = SpoolClient(socket_path)
+        exporter = DatabricksVolumeLogExporter(tmpdir, spool=client)
+        exporter.export([_log_data("a")])
+        connection = client._socket
+        # As seen from a forked child
+        client._pid = -1
+        exporter.export([_log_data("b")])
+        assert client._socket is not connection
+        assert server.batches == 2
+
+
+def test_trace_exporter(tmpdir, socket_path):
+    with SpoolServer(socket_path, [tmpdir]) as server:
+        exporter = DatabricksVolumeTraceExporter(tmpdir, spool=socket_path)
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer(__name__)
+        for name in ("a", "b", "c"):
+            with tracer.start_as_current_span(name):
+                pass
+        assert server.records == 3
+    assert len(_visible_files(tmpdir)) == 1
+    names = sorted(r["name"] for r in read_directory(tmpdir))
+    assert names == ["a", "b", "c"]
+
+
+def test_stale_socket_is_replaced(tmpdir, socket_path):
+    open(socket_path, "w").close()
+    with SpoolServer(socket_path, [tmpdir]):
+        with pytest.raises(OSError):
+            SpoolServer(socket_path, [tmpdir]).start()
+    assert not os.path.exists(socket_path)
+
+
+def test_unsupported_options(tmpdir):
+    with pytest.raises(ValueError):
+        DatabricksVolumeLogExporter(tmpdir, output_format="parquet", spool=True)
+    with pytest.raises(ValueError):
+        DatabricksVolumeTraceExporter(tmpdir, index=True, spool=True)
+
+
+def test_server_defaults(tmpdir, socket_path):
+    with pytest.raises(ValueError, match="allowed_directories"):
+        SpoolServer(socket_path)
+    with SpoolServer(socket_path, [tmpdir]):
+        assert os.stat(socket_path).st_mode & 0o777 == 0o660
+
+
+def test_symlinks_out_of_allowed_directories_are_rejected(tmpdir, socket_path):
+    allowed = os.path.join(tmpdir, "allowed")
+    other = os.path.join(tmpdir, "other")
+    os.mkdir(allowed)
+    os.mkdir(other)
+    link = os.path.join(allowed, "link")
+    os.symlink(other, link)
+    with SpoolServer(socket_path, [allowed]) as server:
+        DatabricksVolumeLogExporter(link, spool=socket_path).export([_log_data("a")])
+        assert server.batches == 0
+    assert _bodies(other) == ["a"]
+
+
+def test_oversized_batches_are_rejected(tmpdir, socket_path):
+    client = SpoolClient(socket_path)
+    with SpoolServer(socket_path, [tmpdir], max_batch_bytes=1000) as server:
+        exporter = DatabricksVolumeLogExporter(tmpdir, spool=client)
+        exporter.export([_log_data("x" * 2000)])
+        connection = client._socket
+        # The connection stays up and the next batch is spooled
+        exporter.export([_log_data("small")])
+        assert client._socket is connection
+        assert server.batches == 1
+        server.max_header_bytes = 10
+        exporter.export([_log_data("long header")])
+        assert client._socket is connection
+        assert server.batches == 1
+    assert _bodies(tmpdir) == ["long header", "small", "x" * 2000]
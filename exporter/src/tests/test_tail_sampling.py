@@ -0,0 +1,175 @@
+import time
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+from databricks_opentelemetry_exporter.traces.sampling import (
+    TailSamplingSpanProcessor,
+    attribute_rule,
+    latency_rule,
+    probabilistic_rule,
+)
+
+
+class CountingExporter(InMemorySpanExporter):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.batches = []
+
+    def export(self, spans):
+        self.calls += 1
+        self.batches.append([span.context.trace_id for span in spans])
+        return super().export(spans)
+
+
+class FailingExporter(CountingExporter):
+    def export(self, spans):
+        super().export(spans)
+        return SpanExportResult.FAILURE
+
+
+def _setup(exporter=None, **kwargs):
+    exporter = exporter or CountingExporter()
+    kwargs.setdefault("export_interval_millis", 60_000)
+    processor = TailSamplingSpanProcessor(exporter, **kwargs)
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider.get_tracer(__name__), processor, exporter
+
+
+def _trace(tracer, error=False, children=2, attributes=None):
+    with tracer.start_as_current_span("root", attributes=attributes) as root:
+        for i in range(children):
+            with tracer.start_as_current_span(f"child {i}") as child:
+                if error and i == children - 1:
+                    child.set_status(Status(StatusCode.ERROR))
+    return root.get_span_context().trace_id
+
+
+def test_keeps_only_error_traces_and_exports_them_together():
+    tracer, processor, exporter = _setup()
+    kept = [_trace(tracer, error=True) for _ in range(3)]
+    for _ in range(5):
+        _trace(tracer)
+    processor.force_flush()
+
+    spans = exporter.get_finished_spans()
+    assert {span.context.trace_id for span in spans} == set(kept)
+    assert len(spans) == 9
+    assert exporter.calls == 1
+    # Spans of a trace are adjacent
+    trace_ids = [span.context.trace_id for span in spans]
+    assert trace_ids == sorted(trace_ids, key=trace_ids.index)
+    assert (processor.kept_traces, processor.dropped_traces) == (3, 5)
+
+
+def test_attribute_and_latency_rules():
+    tracer, processor, exporter = _setup(
+        rules=[attribute_rule("customer", {"vip"}), latency_rule(50)]
+    )
+    vip = _trace(tracer, attributes={"customer": "vip"})
+    _trace(tracer, attributes={"customer": "regular"})
+    with tracer.start_as_current_span("slow") as slow:
+        time.sleep(0.06)
+    processor.force_flush()
+    assert {s.context.trace_id for s in exporter.get_finished_spans()} == {
+        vip,
+        slow.get_span_context().trace_id,
+    }
+
+
+def test_probabilistic_rule_is_deterministic():
+    tracer, processor, exporter = _setup(rules=[probabilistic_rule(0.25)])
+    for _ in range(400):
+        _trace(tracer, children=0)
+    processor.force_flush()
+    kept = {s.context.trace_id for s in exporter.get_finished_spans()}
+    assert 50 < len(kept) < 150
+    rule = probabilistic_rule(0.25)
+    assert all(rule([s]) for s in exporter.get_finished_spans())
+
+
+def test_incomplete_trace_is_decided_after_timeout():
+    tracer, processor, exporter = _setup(
+        decision_wait_millis=50, export_interval_millis=20
+    )
+    root = tracer.start_span("root")
+    with tracer.start_as_current_span(
+        "child", context=trace.set_span_in_context(root)
+    ) as child:
+        child.set_status(Status(StatusCode.ERROR))
+    assert exporter.get_finished_spans() == ()
+    time.sleep(0.3)
+    assert len(exporter.get_finished_spans()) == 1
+    root.end()
+    processor.shutdown()
+
+
+def test_memory_budget_decides_oldest_traces_early():
+    tracer, processor, exporter = _setup(max_buffered_spans=5)
+    parents = [tracer.start_span("root") for _ in range(4)]
+    for parent in parents:
+        with tracer.start_as_current_span(
+            "child", context=trace.set_span_in_context(parent)
+        ) as child:
+            child.set_status(Status(StatusCode.ERROR))
+    for _ in range(3):
+        with tracer.start_as_current_span(
+            "child", context=trace.set_span_in_context(parents[-1])
+        ):
+            pass
+    assert processor._buffered_spans <= 5
+    # Late spans of a kept trace follow the decision
+    for parent in parents:
+        parent.end()
+    processor.force_flush()
+    assert len(exporter.get_finished_spans()) == 4 + 4 + 3
+    processor.shutdown()
+
+
+def test_export_queue_is_bounded():
+    tracer, processor, exporter = _setup(max_queue_size=5)
+    kept = _trace(tracer, error=True)
+    for _ in range(2):
+        _trace(tracer, error=True)
+    assert processor.dropped_spans == 6
+    processor.force_flush()
+    assert {s.context.trace_id for s in exporter.get_finished_spans()} == {kept}
+    processor.shutdown()
+
+
+def test_exports_are_chunked_at_trace_boundaries():
+    tracer, processor, exporter = _setup(max_export_batch_size=4)
+    small = [_trace(tracer, error=True) for _ in range(3)]
+    large = _trace(tracer, error=True, children=5)
+    processor.force_flush()
+    assert all(len(batch) <= 4 for batch in exporter.batches)
+    assert sum(len(batch) for batch in exporter.batches) == 15
+    # Only the trace larger than a batch is split
+    for trace_id in small:
+        assert sum(trace_id in batch for batch in exporter.batches) == 1
+    assert sum(large in batch for batch in exporter.batches) == 2
+    processor.shutdown()
+
+
+def test_full_batch_is_exported_before_the_interval():
+    tracer, processor, exporter = _setup(max_export_batch_size=3)
+    _trace(tracer, error=True)
+    deadline = time.monotonic() + 5
+    while not exporter.calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(exporter.get_finished_spans()) == 3
+    processor.shutdown()
+
+
+def test_export_failures_are_surfaced():
+    tracer, processor, exporter = _setup(exporter=FailingExporter())
+    _trace(tracer, error=True)
+    assert not processor.force_flush()
+    assert processor.failed_spans == 3
+    assert processor.force_flush()
+    processor.shutdown()
@@ -0,0 +1,180 @@
+import os
+import tempfile
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.logs import export as log_export
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+from databricks_opentelemetry_exporter.util.wal import WriteAheadQueue
+
+
+def _log_data(body):
+    record = LogRecord(
+        timestamp=1_700_000_000_000_000_000,
+        trace_id=0,
+        span_id=0,
+        trace_flags=0,
+        severity_number=SeverityNumber.INFO,
+        body=body,
+        resource=Resource({"service.name": "test"}),
+    )
+    return LogData(record, InstrumentationScope("test"))
+
+
+@pytest.fixture
+def tmpdir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+@pytest.fixture
+def reader():
+    return InMemoryMetricReader()
+
+
+@pytest.fixture
+def meter_provider(reader):
+    provider = MeterProvider(metric_readers=[reader])
+    yield provider
+    provider.shutdown()
+
+
+def _points(reader):
+    """``{name: {attributes: point}}`` of the exporters' own metrics."""
+    points = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                by_attributes = points.setdefault(metric.name, {})
+                for point in metric.data.data_points:
+                    by_attributes[tuple(sorted(point.attributes.items()))] = point
+    return points
+
+
+def _value(points, name, **attributes):
+    return points[name][tuple(sorted(attributes.items()))].value
+
+
+def test_log_exporter(tmpdir, reader, meter_provider):
+    exporter = DatabricksVolumeLogExporter(tmpdir, meter_provider=meter_provider)
+    exporter.export([_log_data("a"), _log_data("b")])
+    exporter.export([_log_data("c")])
+
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.records", signal="logs") == 3
+    assert _value(points, "databricks.exporter.files", signal="logs") == 2
+    nbytes = sum(os.path.getsize(os.path.join(tmpdir, n)) for n in os.listdir(tmpdir))
+    assert _value(points, "databricks.exporter.bytes", signal="logs") == nbytes
+    durations = points["databricks.exporter.export.duration"]
+    (success,) = durations.values()
+    assert dict(success.attributes) == {"signal": "logs", "outcome": "success"}
+    assert success.count == 2
+    phases = {
+        dict(point.attributes)["phase"]: point.count
+        for point in points["databricks.exporter.phase.duration"].values()
+    }
+    assert phases == {"serialize": 2, "write": 2, "fsync": 2}
+
+
+def test_rolled_files_counted_when_published(tmpdir, reader, meter_provider):
+    exporter = DatabricksVolumeLogExporter(
+        tmpdir, rolling=True, meter_provider=meter_provider
+    )
+    exporter.export([_log_data("a")])
+    exporter.export([_log_data("b")])
+    assert "databricks.exporter.files" not in _points(reader)
+    exporter.force_flush()
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.files", signal="logs") == 1
+    assert _value(points, "databricks.exporter.records", signal="logs") == 2
+
+
+def test_collisions(tmpdir, reader, meter_provider, monkeypatch):
+    names = iter(["taken", "taken", "free"])
+    monkeypatch.setattr(log_export, "uuid7", lambda: next(names))
+    exporter = DatabricksVolumeLogExporter(tmpdir, meter_provider=meter_provider)
+    exporter.export([_log_data("a")])
+    exporter.export([_log_data("b")])
+    assert sorted(os.listdir(tmpdir)) == ["free.json", "taken.json"]
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.collisions", signal="logs") == 1
+
+
+def test_failures(tmpdir, reader, meter_provider):
+    missing = os.path.join(tmpdir, "missing")
+    metrics_exporter = DatabricksVolumeMetricsExporter(
+        missing, meter_provider=meter_provider
+    )
+    assert metrics_exporter.export(reader.get_metrics_data()).name == "FAILURE"
+    trace_exporter = DatabricksVolumeTraceExporter(
+        missing, meter_provider=meter_provider
+    )
+    with TracerProvider().get_tracer(__name__).start_as_current_span("span") as span:
+        pass
+    assert trace_exporter.export([span]).name == "FAILURE"
+
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.failures", signal="metrics") == 1
+    assert _value(points, "databricks.exporter.failures", signal="traces") == 1
+    durations = points["databricks.exporter.export.duration"]
+    assert {dict(p.attributes)["outcome"] for p in durations.values()} == {"failure"}
+
+
+def test_queue_size_and_drops(tmpdir, reader, meter_provider):
+    missing = os.path.join(tmpdir, "missing")
+    wal = WriteAheadQueue(
+        os.path.join(tmpdir, "wal"), max_entries=2, initial_backoff_seconds=60
+    )
+    # A queue shared by exporters is reported once
+    exporters = [
+        DatabricksVolumeLogExporter(
+            missing, disable_file_check=True, wal=wal, meter_provider=meter_provider
+        )
+        for _ in range(2)
+    ]
+    for i in range(3):
+        exporters[0].export([_log_data(f"m{i}")])
+
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.queue.size", signal="logs", queue="wal") == 2
+    assert _value(points, "databricks.exporter.dropped", signal="logs", queue="wal") == 1
+    assert "databricks.exporter.failures" not in points
+    wal.shutdown(drain=False)
+
+
+def test_async_queue(tmpdir, reader, meter_provider):
+    exporter = DatabricksVolumeLogExporter(
+        tmpdir, async_write=True, meter_provider=meter_provider
+    )
+    exporter.export([_log_data("a")])
+    exporter.force_flush()
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.queue.size", signal="logs", queue="async") == 0
+    assert _value(points, "databricks.exporter.records", signal="logs") == 1
+    exporter.shutdown()
+
+
+def test_no_output_per_batch(tmpdir, reader, meter_provider, capsys):
+    trace_exporter = DatabricksVolumeTraceExporter(tmpdir, meter_provider=meter_provider)
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(trace_exporter))
+    with provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    metrics_exporter = DatabricksVolumeMetricsExporter(
+        tmpdir, meter_provider=meter_provider
+    )
+    metrics_exporter.export(reader.get_metrics_data())
+    assert capsys.readouterr().out == ""
+    points = _points(reader)
+    assert _value(points, "databricks.exporter.files", signal="traces") == 1
+    assert _value(points, "databricks.exporter.files", signal="metrics") == 1
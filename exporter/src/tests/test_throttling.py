@@ -0,0 +1,210 @@
+import logging
+import os
+import tempfile
+import time
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import (
+    LogData,
+    LoggingHandler,
+    LogRecord,
+    LogRecordProcessor,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.logs import throttling
+from databricks_opentelemetry_exporter.logs.throttling import (
+    RATE_LIMITED_COUNT,
+    REPEAT_COUNT,
+    REPEAT_FIRST_TIMESTAMP,
+    REPEAT_LAST_TIMESTAMP,
+    ThrottlingLogRecordProcessor,
+)
+from databricks_opentelemetry_exporter.main import init_telemetry
+from databricks_opentelemetry_exporter.reader import read_directory
+
+
+def _log_data(body, timestamp=1, severity=SeverityNumber.INFO, logger="test"):
+    record = LogRecord(
+        timestamp=timestamp,
+        trace_id=0,
+        span_id=0,
+        trace_flags=0,
+        severity_number=severity,
+        body=body,
+        resource=Resource({"service.name": "test"}),
+    )
+    return LogData(record, InstrumentationScope(logger))
+
+
+class _Recorder(LogRecordProcessor):
+    def __init__(self):
+        self.records = []
+        self.flushed = 0
+
+    def emit(self, log_data):
+        self.records.append(log_data.log_record)
+
+    def force_flush(self, timeout_millis=30000):
+        self.flushed += 1
+        return True
+
+    def shutdown(self):
+        pass
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time_ns(self):
+        return int(self.now * 1e9)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(throttling, "time", clock)
+    return clock
+
+
+def test_template():
+    assert throttling.template("task 12 of 400 failed at 0x7f3a") == (
+        "task <*> of <*> failed at <*>"
+    )
+    assert throttling.template("id 0b7e0c2a-1f4e-4f6b-9b6a-2c1d3e4f5a6b") == "id <*>"
+
+
+def test_collapses_repeats():
+    recorder = _Recorder()
+    processor = ThrottlingLogRecordProcessor(recorder, rate_per_second=None)
+    for i in range(1000):
+        processor.emit(_log_data(f"retrying partition {i}", timestamp=100 + i))
+    processor.emit(_log_data("something else"))
+    assert [r.body for r in recorder.records] == [
+        "retrying partition 0",
+        "something else",
+    ]
+
+    assert processor.force_flush()
+    summary = recorder.records[-1]
+    assert summary.body == "retrying partition 999"
+    assert summary.attributes[REPEAT_COUNT] == 999
+    assert summary.attributes[REPEAT_FIRST_TIMESTAMP] == 101
+    assert summary.attributes[REPEAT_LAST_TIMESTAMP] == 1099
+    assert processor.suppressed == 999
+    assert recorder.flushed == 1
+    processor.shutdown()
+
+
+def test_repeats_differ_by_severity_and_logger():
+    recorder = _Recorder()
+    processor = ThrottlingLogRecordProcessor(recorder, rate_per_second=None)
+    processor.emit(_log_data("disk full"))
+    processor.emit(_log_data("disk full", severity=SeverityNumber.ERROR))
+    processor.emit(_log_data("disk full", logger="other"))
+    assert len(recorder.records) == 3
+    processor.shutdown()
+
+
+def test_window_ends():
+    recorder = _Recorder()
+    processor = ThrottlingLogRecordProcessor(
+        recorder, rate_per_second=None, repeat_window_millis=50
+    )
+    for i in range(3):
+        processor.emit(_log_data(f"poll {i}"))
+    deadline = time.monotonic() + 5
+    while len(recorder.records) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert recorder.records[1].attributes[REPEAT_COUNT] == 2
+
+    # A new burst starts with a record that passes
+    processor.emit(_log_data("poll 3"))
+    assert recorder.records[2].body == "poll 3"
+    assert REPEAT_COUNT not in (recorder.records[2].attributes or {})
+    processor.shutdown()
+
+
+def test_rate_limit(clock):
+    recorder = _Recorder()
+    processor = ThrottlingLogRecordProcessor(
+        recorder, rate_per_second=10, burst=5, repeat_window_millis=None
+    )
+    for i in range(20):
+        processor.emit(_log_data(f"message {'x' * i}"))
+    assert len(recorder.records) == 5
+    assert processor.rate_limited == 15
+
+    clock.now += 0.1
+    processor.emit(_log_data("after a while"))
+    assert recorder.records[-1].attributes[RATE_LIMITED_COUNT] == 15
+    processor.emit(_log_data("and another"))
+    assert len(recorder.records) == 6
+
+    # Loggers have buckets of their own
+    processor.emit(_log_data("other logger", logger="other"))
+    assert len(recorder.records) == 7
+
+
+def test_severity_rates(clock):
+    recorder = _Recorder()
+    processor = ThrottlingLogRecordProcessor(
+        recorder,
+        rate_per_second=1,
+        severity_rates={SeverityNumber.ERROR: None},
+        repeat_window_millis=None,
+    )
+    for i in range(10):
+        processor.emit(_log_data(f"info {'x' * i}"))
+        processor.emit(_log_data(f"error {'x' * i}", severity=SeverityNumber.ERROR2))
+    severities = [r.severity_number for r in recorder.records]
+    assert severities.count(SeverityNumber.INFO) == 1
+    assert severities.count(SeverityNumber.ERROR2) == 10
+
+
+def test_bounded_state(clock):
+    recorder = _Recorder()
+    processor = ThrottlingLogRecordProcessor(recorder, max_keys=3)
+    for i in range(10):
+        body = f"template {chr(ord('a') + i)}"
+        processor.emit(_log_data(body, logger=body))
+        processor.emit(_log_data(body, logger=body))
+    assert len(processor._bursts) == 3
+    assert len(processor._buckets) == 3
+    # Evicted bursts were reported
+    summaries = [r for r in recorder.records if REPEAT_COUNT in (r.attributes or {})]
+    assert len(summaries) == 7
+    processor.shutdown()
+    assert len(recorder.records) == 20
+
+
+def test_logging_handler():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        telemetry = init_telemetry(
+            export_path=tmpdir,
+            signals=["logs"],
+            detect_resource=False,
+            set_global=False,
+            logging_handler=False,
+            log_throttling={"rate_per_second": 100},
+        )
+        logger = logging.getLogger("test_throttling")
+        logger.propagate = False
+        handler = LoggingHandler(logger_provider=telemetry.logger_provider)
+        logger.addHandler(handler)
+        try:
+            for i in range(10_000):
+                logger.warning("retrying task %d", i)
+        finally:
+            logger.removeHandler(handler)
+        telemetry.shutdown()
+
+        records = list(read_directory(os.path.join(tmpdir, "logs"), signal="logs"))
+        assert [r["body"] for r in records] == ["retrying task 0", "retrying task 9999"]
+        assert records[1]["attributes"][REPEAT_COUNT] == 9999
@@ -1,6 +1,11 @@
-import pytest
-from databricks_opentelemetry_exporter.util.uuids import uuid7
+import os
 import re
+import threading
+import time
+
+import pytest
+from databricks_opentelemetry_exporter.util import uuids
+from databricks_opentelemetry_exporter.util.uuids import uuid7, uuid7_batch
 
 
 def test_uuid7_format():
@@ -36,3 +41,63 @@ def test_uuid7_variant():
     uuid = uuid7()
     variant_char = uuid[19]
     assert variant_char in '89ab', f"UUID variant {variant_char} is not correct"
+
+
+def test_uuid7_strictly_increasing_within_millisecond():
+    uuids = [uuid7() for _ in range(10_000)]
+    assert uuids == sorted(uuids)
+    assert len(set(uuids)) == len(uuids)
+
+
+def test_uuid7_batch_increasing_and_follows_previous():
+    first = uuid7()
+    batch = uuid7_batch(5000)
+    assert len(batch) == 5000
+    assert [first] + batch == sorted([first] + batch)
+    assert len(set(batch)) == len(batch)
+    assert uuid7() > batch[-1]
+
+
+def test_uuid7_monotonic_across_threads():
+    results = []
+
+    def generate():
+        results.append([uuid7() for _ in range(2000)])
+
+    threads = [threading.Thread(target=generate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [u for chunk in results for u in chunk]
+    assert len(set(ids)) == len(ids)
+    for chunk in results:
+        assert chunk == sorted(chunk)
+
+
+def test_uuid7_monotonic_when_clock_goes_backwards(monkeypatch):
+    first = uuid7()
+    now = time.time_ns()
+    monkeypatch.setattr(uuids, "_time_ns", lambda: now - 10_000_000_000)
+    second = uuid7()
+    assert second > first
+    # More than 4096 IDs on the stale timestamp still sort after each other
+    batch = uuid7_batch(5000)
+    assert [second] + batch == sorted([second] + batch)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_uuid7_after_fork():
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, uuid7().encode())
+        os._exit(0)
+    os.close(write_fd)
+    parent = uuid7()
+    with os.fdopen(read_fd) as f:
+        child = f.read()
+    os.waitpid(pid, 0)
+    assert re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-7', child)
+    assert child != parent
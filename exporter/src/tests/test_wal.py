@@ -0,0 +1,326 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from databricks_opentelemetry_exporter.logs.export import DatabricksVolumeLogExporter
+from databricks_opentelemetry_exporter.metrics.export import DatabricksVolumeMetricsExporter
+from databricks_opentelemetry_exporter.reader import read_directory, read_records
+from databricks_opentelemetry_exporter.traces.export import DatabricksVolumeTraceExporter
+from databricks_opentelemetry_exporter.util.wal import WriteAheadQueue
+
+
+def _log_data(body):
+    record = LogRecord(
+        timestamp=1_700_000_000_000_000_000,
+        trace_id=0,
+        span_id=0,
+        trace_flags=0,
+        severity_number=SeverityNumber.INFO,
+        body=body,
+        resource=Resource({"service.name": "test"}),
+    )
+    return LogData(record, InstrumentationScope("test"))
+
+
+def _visible_files(directory):
+    return sorted(n for n in os.listdir(directory) if not n.startswith((".", "_")))
+
+
+class _Volume:
+    """A volume directory that can be unmounted and remounted."""
+
+    def __init__(self, path):
+        self.path = path
+        os.mkdir(path)
+
+    def unmount(self):
+        os.rename(self.path, self.path + ".unmounted")
+
+    def mount(self):
+        os.rename(self.path + ".unmounted", self.path)
+
+
+@pytest.fixture
+def tmpdir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+@pytest.fixture
+def volume(tmpdir):
+    return _Volume(os.path.join(tmpdir, "volume"))
+
+
+@pytest.fixture
+def wal(tmpdir):
+    # Retries only when the tests ask for them
+    queue = WriteAheadQueue(os.path.join(tmpdir, "wal"), initial_backoff_seconds=60)
+    yield queue
+    queue.shutdown(drain=False)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+@pytest.mark.parametrize("rolling", [False, True])
+def test_log_batches_survive_outage(volume, wal, compression, rolling):
+    exporter = DatabricksVolumeLogExporter(
+        volume.path, compression=compression, rolling=rolling, wal=wal
+    )
+    exporter.export([_log_data("before")])
+    exporter.force_flush()
+    volume.unmount()
+    assert exporter.export([_log_data("a"), _log_data("b")]).name == "SUCCESS"
+    assert exporter.export([_log_data("c")]).name == "SUCCESS"
+    assert len(wal) == 2
+    assert not exporter.force_flush()
+
+    volume.mount()
+    assert exporter.force_flush()
+    assert len(wal) == 0
+    assert wal.drained == 2
+    bodies = sorted(r["body"] for r in read_directory(volume.path))
+    assert bodies == ["a", "b", "before", "c"]
+
+
+def test_fails_without_wal(volume):
+    exporter = DatabricksVolumeLogExporter(volume.path)
+    volume.unmount()
+    assert exporter.export([_log_data("a")]).name == "FAILURE"
+
+
+def test_trace_and_metric_files_keep_their_names(tmpdir, volume, wal):
+    trace_exporter = DatabricksVolumeTraceExporter(
+        volume.path, output_format="otlp", wal=wal
+    )
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(trace_exporter))
+    metrics_exporter = DatabricksVolumeMetricsExporter(
+        volume.path, change_only=True, wal=wal
+    )
+    reader = InMemoryMetricReader()
+    MeterProvider(metric_readers=[reader]).get_meter("test").create_counter("c").add(1)
+
+    volume.unmount()
+    with provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    assert metrics_exporter.export(reader.get_metrics_data()).name == "SUCCESS"
+    volume.mount()
+    assert wal.drain()
+
+    (metrics_file, trace_file) = sorted(_visible_files(volume.path), key=lambda n: n[-5:])
+    assert trace_file.endswith(".binpb")
+    assert metrics_file.endswith(".snapshot.json")
+    records = read_records(os.path.join(volume.path, trace_file), signal="traces")
+    assert [r["name"] for r in records] == ["span"]
+    provider.shutdown()
+
+
+def test_background_retry_with_backoff(tmpdir, volume):
+    wal = WriteAheadQueue(
+        os.path.join(tmpdir, "wal"), initial_backoff_seconds=0.05, max_backoff_seconds=0.2
+    )
+    exporter = DatabricksVolumeLogExporter(volume.path, wal=wal)
+    volume.unmount()
+    exporter.export([_log_data("a")])
+    time.sleep(0.3)
+    assert len(wal) == 1
+    volume.mount()
+    deadline = time.monotonic() + 5
+    # Entries being written are claimed and no longer counted, wait for the write
+    while not wal.drained and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(wal) == 0
+    assert [r["body"] for r in read_directory(volume.path)] == ["a"]
+    exporter.shutdown()
+
+
+def test_evicts_oldest_first(tmpdir, wal):
+    missing = os.path.join(tmpdir, "missing")
+    wal.max_entries = 3
+    for i in range(5):
+        wal.put(missing, f"{i}.json", b"x" * 10)
+    assert len(wal) == 3
+    assert wal.evicted == 2
+    assert sorted(os.listdir(wal.directory)) == ["2.json.wal", "3.json.wal", "4.json.wal"]
+
+    wal.max_bytes = 1
+    wal.put(missing, "5.json", b"x")
+    assert len(wal) == 0
+
+
+def test_failing_directory_doesnt_block_others(tmpdir, volume, wal):
+    missing = os.path.join(tmpdir, "missing")
+    wal.put(missing, "0.json", b"a\n")
+    wal.put(volume.path, "1.json", b"b\n")
+    assert not wal.drain()
+    assert os.listdir(wal.directory) == ["0.json.wal"]
+    assert _visible_files(volume.path) == ["1.json"]
+
+
+def test_queue_survives_restart(tmpdir, volume):
+    wal_dir = os.path.join(tmpdir, "wal")
+    volume.unmount()
+    first = WriteAheadQueue(wal_dir, initial_backoff_seconds=60)
+    first.put(volume.path, "0.json", b"a\n")
+    first.shutdown()
+    volume.mount()
+
+    second = WriteAheadQueue(wal_dir, initial_backoff_seconds=60)
+    assert second.drain()
+    second.shutdown()
+    assert _visible_files(volume.path) == ["0.json"]
+
+
+def test_releases_claims_of_dead_processes(tmpdir, volume, wal):
+    wal.put(os.path.join(tmpdir, "missing"), "0.json", b"a\n")
+    wal.put(volume.path, "1.json", b"b\n")
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    entry = os.path.join(wal.directory, "1.json.wal")
+    os.rename(entry, f"{entry}.claimed-{child.pid}")
+    # Claimed by a live process
+    os.rename(
+        os.path.join(wal.directory, "0.json.wal"),
+        os.path.join(wal.directory, f"0.json.wal.claimed-{os.getpid()}"),
+    )
+    wal.drain()
+    assert _visible_files(volume.path) == ["1.json"]
+    assert os.listdir(wal.directory) == [f"0.json.wal.claimed-{os.getpid()}"]
+
+
+def test_unsupported_options(tmpdir):
+    with pytest.raises(ValueError):
+        DatabricksVolumeLogExporter(tmpdir, output_format="parquet", wal=tmpdir)
+    with pytest.raises(ValueError):
+        DatabricksVolumeTraceExporter(tmpdir, output_format="parquet", wal=tmpdir)
+
+
+def test_put_keeps_running_totals(tmpdir, wal, monkeypatch):
+    missing = os.path.join(tmpdir, "missing")
+    listings = []
+    entries = wal._entries
+    monkeypatch.setattr(wal, "_entries", lambda: listings.append(1) or entries())
+    wal.max_entries = 3
+    for i in range(3):
+        wal.put(missing, f"{i}.json", b"x" * 10)
+    assert not listings
+    wal.put(missing, "3.json", b"x" * 10)
+    assert listings
+    assert wal.evicted == 1
+    assert len(wal) == 3
+
+
+def test_retries_are_committed_with_the_exporters_durability(tmpdir, volume):
+    exporter = DatabricksVolumeLogExporter(
+        volume.path, durability="per-batch", wal=os.path.join(tmpdir, "wal")
+    )
+    assert exporter._wal.durability is exporter.durability
+    volume.unmount()
+    exporter.export([_log_data("a")])
+    volume.mount()
+    syncs = exporter.durability.syncs
+    assert exporter.force_flush()
+    assert exporter.durability.syncs == syncs + 1
+    exporter.shutdown()
+
+
+def _fail_once(policy, monkeypatch, after=0):
+    """Make the ``after``-th next write of ``policy`` fail once it reached the file."""
+    calls = []
+    after_write = policy.after_write
+
+    def fail(file, nbytes):
+        calls.append(1)
+        if len(calls) == after + 1:
+            raise OSError("Input/output error")
+        after_write(file, nbytes)
+
+    monkeypatch.setattr(policy, "after_write", fail)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_failed_rolling_write_is_not_duplicated(volume, wal, compression, monkeypatch):
+    exporter = DatabricksVolumeLogExporter(
+        volume.path, compression=compression, rolling=True, wal=wal
+    )
+    exporter.export([_log_data("before")])
+    _fail_once(exporter.durability, monkeypatch)
+    assert exporter.export([_log_data("a"), _log_data("b")]).name == "SUCCESS"
+    assert len(wal) == 1
+    exporter.export([_log_data("after")])
+    assert exporter.force_flush()
+    bodies = sorted(r["body"] for r in read_directory(volume.path))
+    assert bodies == ["a", "after", "b", "before"]
+    exporter.shutdown()
+
+
+def test_only_unwritten_chunks_are_queued(volume, wal, monkeypatch):
+    exporter = DatabricksVolumeLogExporter(
+        volume.path, rolling=True, resource_mode="header", wal=wal
+    )
+    other = _log_data("b")
+    other.log_record.resource = Resource({"service.name": "other"})
+    _fail_once(exporter.durability, monkeypatch, after=1)
+    assert exporter.export([_log_data("a"), other]).name == "SUCCESS"
+    assert len(wal) == 1
+    assert exporter.force_flush()
+    records = list(read_directory(volume.path))
+    assert sorted(r["body"] for r in records) == ["a", "b"]
+    resources = {r["body"]: r["resource"]["attributes"]["service.name"] for r in records}
+    assert resources == {"a": "test", "b": "other"}
+    exporter.shutdown()
+
+
+def test_failed_trace_write_leaves_no_partial_file(volume, monkeypatch):
+    exporter = DatabricksVolumeTraceExporter(volume.path)
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    def commit(file, nbytes):
+        raise OSError("Input/output error")
+
+    monkeypatch.setattr(exporter.durability, "commit", commit)
+    with provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    assert _visible_files(volume.path) == []
+    provider.shutdown()
+
+
+def test_backoff_jitter_doesnt_compound(tmpdir, monkeypatch):
+    from databricks_opentelemetry_exporter.util import wal as wal_module
+
+    monkeypatch.setattr(wal_module.random, "uniform", lambda low, high: high)
+    queue = WriteAheadQueue(
+        os.path.join(tmpdir, "wal"), initial_backoff_seconds=1, max_backoff_seconds=100
+    )
+    waits = []
+
+    class Wakeup:
+        def wait(self, timeout):
+            waits.append(timeout)
+            if len(waits) == 4:
+                queue._stop.set()
+
+        def clear(self):
+            pass
+
+        def set(self):
+            pass
+
+    queue._wakeup = Wakeup()
+    monkeypatch.setattr(queue, "drain", lambda: False)
+    queue._run()
+    # Each wait is jittered around 1, 2, 4 and 8 seconds
+    assert waits == pytest.approx([1.2, 2.4, 4.8, 9.6])
+    queue.shutdown(drain=False)
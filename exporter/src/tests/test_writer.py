@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+
+import pytest
+
+from databricks_opentelemetry_exporter.util.writer import RollingFileWriter
+
+
+def test_rolling_writer_appends_to_one_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir)
+        writer.write('{"a": 1}\n')
+        writer.write('{"a": 2}\n')
+
+        # Only the hidden in-progress file exists until the writer is flushed
+        files = os.listdir(tmpdir)
+        assert len(files) == 1
+        assert files[0].startswith(".") and files[0].endswith(".inprogress")
+
+        writer.close()
+        files = os.listdir(tmpdir)
+        assert len(files) == 1
+        assert files[0].endswith(".json")
+        with open(os.path.join(tmpdir, files[0])) as f:
+            assert f.read() == '{"a": 1}\n{"a": 2}\n'
+
+
+def test_rolling_writer_rolls_on_record_count():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir, max_records=2)
+        for i in range(5):
+            writer.write(f'{{"a": {i}}}\n')
+        writer.close()
+        assert len(os.listdir(tmpdir)) == 3
+
+
+def test_rolling_writer_rolls_on_size():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir, max_bytes=10)
+        writer.write("x" * 10 + "\n")
+        writer.write("y\n")
+        writer.close()
+        files = os.listdir(tmpdir)
+        assert len(files) == 2
+        contents = set()
+        for name in files:
+            with open(os.path.join(tmpdir, name)) as f:
+                contents.add(f.read())
+        assert contents == {"x" * 10 + "\n", "y\n"}
+
+
+def test_rolling_writer_rolls_on_age():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir, max_age_seconds=0.05)
+        writer.write("x\n")
+        time.sleep(0.2)
+        # The age timer finalizes the file without another write
+        files = os.listdir(tmpdir)
+        assert len(files) == 1 and files[0].endswith(".json")
+        writer.write("y\n")
+        writer.close()
+        assert len(os.listdir(tmpdir)) == 2
+
+
+def test_rolling_writer_rejects_writes_after_close():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        writer = RollingFileWriter(tmpdir)
+        writer.close()
+        with pytest.raises(ValueError):
+            writer.write("x\n")
+        assert os.listdir(tmpdir) == []